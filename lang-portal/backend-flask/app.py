@@ -2,12 +2,16 @@ from flask import Flask, g
 from flask_cors import CORS
 
 from lib.db import Db
+from lib.group_bundles import GroupBundleCache
+from lib.response_cache import ResponseCache
 
 import routes.words
 import routes.groups
 import routes.study_sessions
 import routes.dashboard
 import routes.study_activities
+import routes.cache
+import routes.history
 
 def get_allowed_origins(app):
     try:
@@ -31,15 +35,27 @@ def get_allowed_origins(app):
 def create_app(test_config=None):
     app = Flask(__name__)
     
-    if test_config is None:
-        app.config.from_mapping(
-            DATABASE='instance/words.db'
-        )
-    else:
+    app.config.from_mapping(
+        DATABASE='instance/words.db',
+        DB_POOL_SIZE=8,  # Idle connections kept open between requests (0 disables pooling)
+        DB_CACHED_STATEMENTS=256,  # Prepared statements cached per connection
+        DB_PRAGMAS=None,  # Pragmas for every connection, None uses lib.db.DEFAULT_PRAGMAS
+        RESPONSE_CACHE_SIZE=1024,  # Cached GET responses (0 disables the response cache)
+        GROUP_BUNDLE_CACHE_SIZE=64,  # Groups whose /words/raw bundle is kept in memory (0 disables it)
+        ASGI_THREADS=32  # Threads running the Flask views when served through asgi.py
+    )
+    if test_config is not None:
         app.config.update(test_config)
     
     # Initialize database first since we need it for CORS configuration
-    app.db = Db(database=app.config['DATABASE'])
+    app.db = Db(
+        database=app.config['DATABASE'],
+        pool_size=app.config['DB_POOL_SIZE'],
+        cached_statements=app.config['DB_CACHED_STATEMENTS'],
+        pragmas=app.config['DB_PRAGMAS']
+    )
+    app.response_cache = ResponseCache(max_entries=app.config['RESPONSE_CACHE_SIZE'])
+    app.group_bundles = GroupBundleCache(max_entries=app.config['GROUP_BUNDLE_CACHE_SIZE'])
     
     # Get allowed origins from study_activities table
     allowed_origins = get_allowed_origins(app)
@@ -68,6 +84,8 @@ def create_app(test_config=None):
     routes.study_sessions.load(app)
     routes.dashboard.load(app)
     routes.study_activities.load(app)
+    routes.cache.load(app)
+    routes.history.load(app)
     
     return app
 
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qs
+
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+from app import create_app, get_allowed_origins
+from lib.async_db import AsyncDb
+from lib.group_bundles import (
+    BUNDLE_WORDS_QUERY, SESSION_STATS_QUERY, TOTALS_QUERY, bundle_from_rows, choose_encoding, etag, render_payload
+)
+
+# ASGI entry point for the lang-portal API, for running under an ASGI server:
+#
+#   uvicorn asgi:app --port 5000
+#
+# Every route is the same Flask view as in app.py, run on a thread pool, so
+# the JSON contracts are identical. GET /groups/<id>/words/raw, which every
+# study activity launch loads, is served natively instead: its reads go
+# through the aiosqlite pool (lib/async_db.py) into the same group bundle
+# cache (lib/group_bundles.py) as the Flask view, so no worker thread is held
+# while it waits on SQLite, and compressed or not, the response is the same.
+
+RAW_WORDS_PATH = re.compile(r'^/groups/(\d+)/words/raw$')
+# Request bodies bigger than this are spooled to a temporary file
+WSGI_BODY_MEMORY_BYTES = 65536
+
+class ThreadPoolWsgi:
+    """Serves a WSGI application to ASGI http requests, each call on a
+    thread of its own pool, so slow requests don't hold up the others"""
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        with SpooledTemporaryFile(max_size=WSGI_BODY_MEMORY_BYTES) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            loop = asyncio.get_running_loop()
+
+            def send_from_thread(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            await loop.run_in_executor(self.executor, self.run, scope, body, send_from_thread)
+
+    def run(self, scope, body, send):
+        # On a pool thread: runs the application and sends its response. The
+        # headers go out with the first non-empty chunk of the body, so an
+        # application can still replace them until then.
+        response = {'started': False}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response['started']:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            }
+
+        result = self.wsgi_application(wsgi_environ(scope, body), start_response)
+        try:
+            for data in result:
+                if data:
+                    if not response['started']:
+                        response['started'] = True
+                        send(response['start'])
+                    send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            if not response['started']:
+                send(response['start'])
+            send({'type': 'http.response.body'})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+def wsgi_environ(scope, body):
+    # PEP 3333 environ for an ASGI http scope: strings hold the raw bytes
+    # decoded as latin-1, and repeated headers are joined with commas
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+    path_info = scope['path'].encode('utf-8').decode('latin-1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    if 'CONTENT_LENGTH' not in environ:
+        # A chunked request: the body has been read in full, so its length is
+        # known, and WSGI applications only read a body with a length
+        environ['CONTENT_LENGTH'] = str(body.seek(0, 2))
+        body.seek(0)
+    return environ
+
+def dumps(data):
+    # Same output as Flask's jsonify, so both servers return identical bytes
+    return json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+def cors_headers(allowed_origins, scope):
+    origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+    if '*' in allowed_origins:
+        return [(b'access-control-allow-origin', b'*')]
+    if origin in allowed_origins:
+        return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+    return []
+
+async def send_response(send, status, body, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [(b'content-length', str(len(body)).encode('latin-1'))]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_json(send, status, data, headers):
+    # Same bytes as Flask's jsonify
+    body = (dumps(data) + '\n').encode('utf-8')
+    await send_response(send, status, body, [(b'content-type', b'application/json')] + headers)
+
+# GET /groups/<id>/words/raw, with the same payload and headers as
+# routes/groups.py:get_group_words_raw. The reads go through the aiosqlite
+# pool into the bundle cache the Flask view uses too; only compressing a
+# body that isn't cached yet runs on a thread.
+async def serve_group_words_raw(flask_app, app_db, scope, send, id, headers):
+    args = parse_qs(scope['query_string'].decode('latin-1'), keep_blank_values=True)
+    session_id = args['session_id'][0] if 'session_id' in args else None
+    request_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+    bundles = flask_app.group_bundles
+
+    try:
+        async with app_db.connection() as connection:
+            # First, check if the group exists
+            async with connection.execute('SELECT id, name, membership_version FROM groups WHERE id = ?', (id,)) as cursor:
+                group = await cursor.fetchone()
+            if not group:
+                return await send_json(send, 404, {"error": "Group not found"}, headers)
+
+            # If session_id is provided, verify it exists and belongs to this group
+            if session_id:
+                async with connection.execute('''
+                    SELECT id FROM study_sessions
+                    WHERE id = ? AND group_id = ?
+                ''', (session_id, id)) as cursor:
+                    if not await cursor.fetchone():
+                        return await send_json(send, 404, {"error": "Invalid session ID for this group"}, headers)
+
+            bundle = bundles.cached(id, group['membership_version'])
+            hit = bundle is not None
+            if not hit:
+                async with connection.execute(BUNDLE_WORDS_QUERY, (id,)) as cursor:
+                    bundle = bundle_from_rows(await cursor.fetchall())
+                bundles.store(id, group['membership_version'], bundle)
+            async with connection.execute(TOTALS_QUERY, (id,)) as cursor:
+                totals = await cursor.fetchall()
+            sessions = []
+            if session_id:
+                async with connection.execute(SESSION_STATS_QUERY, (session_id,)) as cursor:
+                    sessions = await cursor.fetchall()
+
+        body = render_payload(bundle, group, session_id, totals, sessions)
+        encoding = choose_encoding(parse_accept_header(request_headers.get('accept-encoding')))
+        body_etag = etag(body, encoding)
+        headers = headers + [
+            (b'etag', quote_etag(body_etag).encode('latin-1')),
+            (b'vary', b'Accept-Encoding'),
+            (b'cache-control', b'no-cache'),
+            (b'x-cache', b'HIT' if hit else b'MISS')
+        ]
+        if parse_etags(request_headers.get('if-none-match')).contains(body_etag):
+            return await send_response(send, 304, b'', headers)
+        if encoding:
+            body = await asyncio.get_running_loop().run_in_executor(
+                None, bundles.compressed, body, encoding, body_etag
+            )
+            headers.append((b'content-encoding', encoding.encode('latin-1')))
+        await send_response(send, 200, body, [(b'content-type', b'application/json')] + headers)
+    except Exception as e:
+        await send_json(send, 500, {"error": str(e)}, headers)
+
+def create_asgi_app(flask_app=None):
+    flask_app = flask_app or create_app()
+    wsgi = ThreadPoolWsgi(flask_app, threads=flask_app.config['ASGI_THREADS'])
+    app_db = AsyncDb(
+        database=flask_app.config['DATABASE'],
+        pool_size=flask_app.config['DB_POOL_SIZE'],
+        pragmas=flask_app.config['DB_PRAGMAS']
+    )
+    allowed_origins = get_allowed_origins(flask_app)
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await app_db.close()
+                    wsgi.executor.shutdown(wait=False)
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        match = RAW_WORDS_PATH.match(scope['path'])
+        if match and scope['method'] == 'GET':
+            return await serve_group_words_raw(
+                flask_app, app_db, scope, send, int(match.group(1)), cors_headers(allowed_origins, scope)
+            )
+        await wsgi(scope, receive, send)
+
+    app.flask_app = flask_app
+    return app
+
+app = create_asgi_app()
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5000)
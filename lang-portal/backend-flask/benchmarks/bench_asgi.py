@@ -0,0 +1,146 @@
+# Compare request latency of the Flask app (threaded WSGI server, as
+# `python app.py` runs it) and the ASGI app (asgi.py under uvicorn) at 100
+# and 1,000 concurrent clients.
+#
+# Each server runs in its own process over the same throwaway database, with
+# the response cache off so every request reaches SQLite. Every client opens
+# a connection per request and cycles through PATHS.
+#
+# Run from lang-portal/backend-flask:
+#
+#   python -m benchmarks.bench_asgi --clients 100 1000
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import create_app
+from benchmarks.bench_search import synthetic_words
+from lib.importer import import_words
+
+PATHS = [
+  '/groups/{group_id}/words/raw',
+  '/groups',
+  '/words?page=2',
+  '/groups/1/words',
+  '/api/study-sessions'
+]
+
+SERVERS = ['flask', 'asgi']
+
+def build_database(database, words):
+  app = create_app({'DATABASE': database})
+  app.db.init(app)
+  with app.app_context():
+    with app.db.write() as cursor:
+      import_words(cursor, synthetic_words(words), group_name='Synthetic')
+      cursor.execute("SELECT id FROM groups WHERE name = 'Synthetic'")
+      group_id = cursor.fetchone()[0]
+      for _ in range(20):
+        cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, 1)', (group_id,))
+  return group_id
+
+def serve(server, database, port):
+  app = create_app({'DATABASE': database, 'RESPONSE_CACHE_SIZE': 0})
+  if server == 'flask':
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+  else:
+    import uvicorn
+    from asgi import create_asgi_app
+    uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port, log_level='warning')
+
+def free_port():
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    try:
+      socket.create_connection(('127.0.0.1', port), timeout=1).close()
+      return
+    except OSError:
+      time.sleep(0.1)
+  raise RuntimeError(f'Server on port {port} did not start')
+
+async def fetch(port, path):
+  reader, writer = await asyncio.open_connection('127.0.0.1', port)
+  writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode('ascii'))
+  await writer.drain()
+  response = await reader.read()
+  writer.close()
+  return int(response.split(b' ', 2)[1])
+
+async def client(port, paths, requests, offset, timings, errors):
+  for i in range(requests):
+    path = paths[(offset + i) % len(paths)]
+    started = time.perf_counter()
+    try:
+      status = await fetch(port, path)
+    except (OSError, IndexError, ValueError):
+      status = None
+    if status == 200:
+      timings.append((time.perf_counter() - started) * 1000)
+    else:
+      errors.append(status)
+
+async def load(port, paths, clients, requests):
+  timings, errors = [], []
+  started = time.perf_counter()
+  await asyncio.gather(*[
+    client(port, paths, requests, i, timings, errors) for i in range(clients)
+  ])
+  return timings, errors, time.perf_counter() - started
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--clients', type=int, nargs='+', default=[100, 1000])
+  parser.add_argument('--requests', type=int, default=10, help='requests per client')
+  parser.add_argument('--words', type=int, default=2000, help='words in the group served by /words/raw')
+  parser.add_argument('--serve', choices=SERVERS, help=argparse.SUPPRESS)
+  parser.add_argument('--database', help=argparse.SUPPRESS)
+  parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.serve:
+    return serve(args.serve, args.database, args.port)
+
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'words.db')
+    group_id = build_database(database, args.words)
+    paths = [path.format(group_id=group_id) for path in PATHS]
+
+    for server in SERVERS:
+      port = free_port()
+      process = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.bench_asgi',
+        '--serve', server, '--database', database, '--port', str(port)
+      ])
+      try:
+        wait_for_port(port)
+        for clients in args.clients:
+          timings, errors, seconds = asyncio.run(load(port, paths, clients, args.requests))
+          timings.sort()
+          p99 = timings[int(len(timings) * 0.99) - 1] if timings else float('nan')
+          print(
+            f'{server:>6} {clients:>5} clients: '
+            f'p50 {statistics.median(timings) if timings else float("nan"):8.1f} ms  '
+            f'p99 {p99:8.1f} ms  '
+            f'{len(timings) / seconds:7.1f} req/s  {len(errors)} errors'
+          )
+      finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == '__main__':
+  main()
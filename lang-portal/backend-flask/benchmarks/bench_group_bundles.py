@@ -0,0 +1,73 @@
+# Benchmark GET /groups/<id>/words/raw, the payload every study activity
+# launch loads, on a large group with and without the group bundle cache
+# (lib/group_bundles.py), uncompressed and gzip-compressed.
+#
+# Run from lang-portal/backend-flask:
+#
+#   python -m benchmarks.bench_group_bundles --words 5000
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from benchmarks.bench_search import synthetic_words
+from lib.importer import import_words
+from lib.reviews import record_reviews
+
+CONFIGS = {
+  'no bundle cache': {'GROUP_BUNDLE_CACHE_SIZE': 0},
+  'bundle cache': {}
+}
+
+def build_database(database, words, reviewed):
+  app = create_app({'DATABASE': database})
+  app.db.init(app)
+  with app.app_context():
+    with app.db.write() as cursor:
+      import_words(cursor, synthetic_words(words), group_name='Synthetic')
+      cursor.execute("SELECT id FROM groups WHERE name = 'Synthetic'")
+      group_id = cursor.fetchone()[0]
+      cursor.execute('SELECT word_id FROM word_groups WHERE group_id = ?', (group_id,))
+      word_ids = [row[0] for row in cursor.fetchall()]
+      cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, 1)', (group_id,))
+      session_id = cursor.lastrowid
+    with app.db.write() as cursor:
+      rng = random.Random(0)
+      record_reviews(cursor, session_id, [(word_id, rng.random() < 0.7) for word_id in rng.sample(word_ids, reviewed)])
+  return group_id, session_id
+
+def time_request(client, path, headers, runs):
+  timings = []
+  for _ in range(runs):
+    started = time.perf_counter()
+    response = client.get(path, headers=headers)
+    timings.append((time.perf_counter() - started) * 1000)
+  if response.status_code != 200:
+    raise RuntimeError(f'{path} returned {response.status_code}')
+  timings.sort()
+  return statistics.median(timings), timings[int(len(timings) * 0.99) - 1], len(response.data)
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--words', type=int, default=5000)
+  parser.add_argument('--reviewed', type=int, default=500, help='words of the group with reviews')
+  parser.add_argument('--runs', type=int, default=100)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'words.db')
+    group_id, session_id = build_database(database, args.words, args.reviewed)
+    path = f'/groups/{group_id}/words/raw?session_id={session_id}'
+
+    for name, config in CONFIGS.items():
+      client = create_app(dict(config, DATABASE=database, RESPONSE_CACHE_SIZE=0)).test_client()
+      for encoding in ['identity', 'gzip']:
+        p50, p99, size = time_request(client, path, {'Accept-Encoding': encoding}, args.runs)
+        print(f'{name:>16} {encoding:>8}: p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  {size / 1000:7.1f} kB')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,95 @@
+# Benchmark the study history export (GET /api/export) and import
+# (lib/history.py) on a synthetic review history.
+#
+# Generates --reviews review items (see bench_timeseries), streams the export
+# through the Flask route as NDJSON and gzip, measures peak Python memory,
+# then imports the gzip export into a fresh database and checks that the
+# rebuilt rollups match the original ones.
+#
+# Run from lang-portal/backend-flask:
+#
+#   python -m benchmarks.bench_history --reviews 2000000
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from app import create_app
+from benchmarks.bench_timeseries import create_groups, generate_history
+from lib.history import import_history, read_history
+from lib.reviews import rebuild_rollups
+
+ROLLUP_QUERIES = [
+  'SELECT word_id, correct_count, wrong_count, last_reviewed FROM word_reviews ORDER BY word_id',
+  'SELECT * FROM study_session_summaries ORDER BY study_session_id',
+  'SELECT * FROM daily_review_stats ORDER BY group_id, day',
+  # Words never reviewed are due from whenever the schedules were rebuilt
+  'SELECT * FROM word_schedules WHERE last_reviewed_at IS NOT NULL ORDER BY group_id, word_id'
+]
+
+def rollups(app):
+  with app.app_context():
+    cursor = app.db.cursor()
+    return [[tuple(row) for row in cursor.execute(query).fetchall()] for query in ROLLUP_QUERIES]
+
+def export(app, export_format, path):
+  client = app.test_client()
+  started = time.perf_counter()
+  response = client.get(f'/api/export?format={export_format}', buffered=False)
+  size = 0
+  with open(path, 'wb') as file:
+    for chunk in response.response:
+      file.write(chunk)
+      size += len(chunk)
+  response.close()
+  return size, time.perf_counter() - started
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--reviews', type=int, default=2000000)
+  parser.add_argument('--days', type=int, default=365)
+  parser.add_argument('--groups', type=int, default=20)
+  parser.add_argument('--sessions-per-day', type=int, default=50)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    source = create_app({'DATABASE': os.path.join(directory, 'source.db'), 'RESPONSE_CACHE_SIZE': 0})
+    source.db.init(source)
+    with source.app_context():
+      with source.db.write() as cursor:
+        start_day = date.today() - timedelta(days=args.days - 1)
+        generate_history(cursor, args.reviews, args.days, args.groups, args.sessions_per_day, start_day)
+        rebuild_rollups(cursor)
+    print(f'Generated {args.reviews:,} reviews')
+
+    export_path = os.path.join(directory, 'history.ndjson.gz')
+    for export_format, path in [('ndjson', os.path.join(directory, 'history.ndjson')), ('gzip', export_path)]:
+      size, seconds = export(source, export_format, path)
+      print(f'Exported {export_format:>6}: {size / 1e6:6.1f} MB in {seconds:5.1f}s ({args.reviews / seconds:,.0f} reviews/s)')
+
+    # Again with tracemalloc on, which slows the export down several times over
+    tracemalloc.start()
+    export(source, 'gzip', export_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'Peak Python memory during a gzip export: {peak / 1e6:.1f} MB')
+
+    # The target needs the same groups as the source, with the same ids
+    target = create_app({'DATABASE': os.path.join(directory, 'target.db'), 'RESPONSE_CACHE_SIZE': 0})
+    target.db.init(target)
+    with target.app_context():
+      with target.db.write() as cursor:
+        create_groups(cursor, args.groups)
+        stats = import_history(cursor, read_history(export_path))
+    rows = stats['sessions'] + stats['reviews']
+    print(
+      f'Imported {rows:,} rows in {stats["seconds"]:.1f}s ({rows / stats["seconds"]:,.0f} rows/s, '
+      f'rollups included)'
+    )
+    print('Rollups match' if rollups(source) == rollups(target) else 'Rollups DIFFER')
+
+if __name__ == '__main__':
+  main()
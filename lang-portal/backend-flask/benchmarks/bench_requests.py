@@ -0,0 +1,97 @@
+# Measure requests/sec of the read endpoints with and without the pooled
+# connection layer (connection pool, WAL and tuned pragmas) and the response
+# cache.
+#
+# Run from lang-portal/backend-flask:
+#
+#   python -m benchmarks.bench_requests --threads 8 --duration 5
+
+import argparse
+import http.client
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+
+PATHS = [
+  '/words?page=2',
+  '/words/1',
+  '/groups',
+  '/groups/1/words',
+  '/groups/1/words/raw',
+  '/api/study-sessions',
+  '/dashboard/stats',
+  '/dashboard/recent-session'
+]
+
+CONFIGS = {
+  # What every request did before: open a fresh connection with default pragmas
+  'connect per request': {'DB_POOL_SIZE': 0, 'DB_PRAGMAS': {}, 'RESPONSE_CACHE_SIZE': 0},
+  'pooled + WAL': {'RESPONSE_CACHE_SIZE': 0},
+  'pooled + WAL + cache': {}
+}
+
+def build_app(database, config):
+  app = create_app(dict(config, DATABASE=database))
+  app.db.init(app)
+  with app.app_context():
+    # A little history so the session and dashboard queries have rows to read
+    with app.db.write() as cursor:
+      for _ in range(20):
+        cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+  return app
+
+def client(port, deadline, counts, index):
+  done = 0
+  while time.monotonic() < deadline:
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', PATHS[done % len(PATHS)])
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    if response.status != 200:
+      raise RuntimeError(f'{PATHS[done % len(PATHS)]} returned {response.status}')
+    done += 1
+  counts[index] = done
+
+def run(config, threads, duration):
+  with tempfile.TemporaryDirectory() as directory:
+    app = build_app(os.path.join(directory, 'words.db'), config)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    counts = [0] * threads
+    deadline = time.monotonic() + duration
+    workers = [
+      threading.Thread(target=client, args=(server.server_port, deadline, counts, i))
+      for i in range(threads)
+    ]
+    for worker in workers:
+      worker.start()
+    for worker in workers:
+      worker.join()
+
+    server.shutdown()
+    return sum(counts) / duration
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--threads', type=int, default=8)
+  parser.add_argument('--duration', type=float, default=5.0)
+  args = parser.parse_args()
+
+  # Keep the per-request access log out of the results
+  logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+  for name, config in CONFIGS.items():
+    requests_per_second = run(config, args.threads, args.duration)
+    print(f'{name:>20}: {requests_per_second:8.1f} requests/sec')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,76 @@
+# Benchmark GET /words/search against a synthetic vocabulary.
+#
+# Builds a throwaway database with --words generated Spanish-looking words
+# (1M by default), loads them with the bulk importer and then times prefix,
+# accent-insensitive and misspelled queries through the Flask route.
+#
+# Run from lang-portal/backend-flask:
+#
+#   python -m benchmarks.bench_search --words 1000000
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from lib.importer import import_words
+
+SYLLABLES = ['ca', 'ción', 'de', 'lo', 'ma', 'ñe', 'ri', 'to', 'sa', 'bu', 'é', 'gue', 'pla', 'tí', 'mos', 'ar']
+ENGLISH = ['song', 'house', 'river', 'light', 'green', 'walk', 'bread', 'sleep', 'north', 'glass']
+
+QUERIES = {
+  'prefix': 'cade',
+  'accent-insensitive': 'cacion',
+  'short prefix': 'ri',
+  'multi-term': 'song riv',
+  'misspelled': 'placaxion'
+}
+
+def synthetic_words(count, seed=0):
+  rng = random.Random(seed)
+  for i in range(count):
+    spanish = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    yield {
+      'spanish': f'{spanish}{i}',
+      'pronunciation': spanish.upper(),
+      'english': f'{rng.choice(ENGLISH)} {rng.choice(ENGLISH)}',
+      'parts_of_speech': {'type': 'noun'}
+    }
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--words', type=int, default=1000000)
+  parser.add_argument('--runs', type=int, default=50)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    app = create_app({'DATABASE': os.path.join(directory, 'words.db')})
+    with app.app_context():
+      cursor = app.db.cursor()
+      app.db.setup_tables(cursor)
+      # Built before the load so the importer exercises its deferred rebuild
+      app.db.setup_indexes(cursor)
+      started = time.monotonic()
+      with app.db.write() as cursor:
+        import_words(cursor, synthetic_words(args.words), group_name='Synthetic')
+      print(f'Loaded and indexed {args.words:,} words in {time.monotonic() - started:.1f}s')
+
+    client = app.test_client()
+    for name, q in QUERIES.items():
+      timings = []
+      for _ in range(args.runs):
+        started = time.perf_counter()
+        response = client.get('/words/search', query_string={'q': q})
+        timings.append((time.perf_counter() - started) * 1000)
+      body = response.get_json()
+      timings.sort()
+      print(
+        f'{name:>20} q={q!r:<12} {body["match"] or "none":>8} {body["total"]:>6} hits  '
+        f'p50 {statistics.median(timings):7.2f} ms  p99 {timings[int(len(timings) * 0.99) - 1]:7.2f} ms'
+      )
+
+if __name__ == '__main__':
+  main()
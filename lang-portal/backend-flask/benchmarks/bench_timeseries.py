@@ -0,0 +1,136 @@
+# Benchmark GET /dashboard/timeseries over a synthetic review history.
+#
+# Builds a throwaway database, generates --reviews review items (10M by
+# default) spread over --days days, --groups groups and their study sessions,
+# builds daily_review_stats from them, then times typical timeseries queries
+# through the Flask route. For comparison it also times the same 30-day
+# aggregate computed straight from word_review_items.
+#
+# Run from lang-portal/backend-flask:
+#
+#   python -m benchmarks.bench_timeseries --reviews 10000000
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app import create_app
+from lib.reviews import rebuild_daily_stats
+
+def create_groups(cursor, groups):
+  # Synthetic groups holding every word; returns the first group's id
+  cursor.execute('SELECT COUNT(*) FROM words')
+  word_count = cursor.fetchone()[0]
+  cursor.executemany('INSERT INTO groups (name) VALUES (?)', [(f'Synthetic {i}',) for i in range(groups)])
+  cursor.execute("SELECT MIN(id) FROM groups WHERE name LIKE 'Synthetic %'")
+  first_group_id = cursor.fetchone()[0]
+  cursor.execute('''
+    INSERT INTO word_groups (word_id, group_id)
+    SELECT words.id, groups.id FROM words, groups WHERE groups.id >= ?
+  ''', (first_group_id,))
+  cursor.execute('UPDATE groups SET words_count = ? WHERE id >= ?', (word_count, first_group_id))
+  return first_group_id
+
+def generate_history(cursor, reviews, days, groups, sessions_per_day, start_day):
+  # Groups, then sessions spread evenly over the days, then reviews spread
+  # over the sessions with random words and roughly 70% correct answers
+  first_group_id = create_groups(cursor, groups)
+  cursor.execute('SELECT COUNT(*) FROM words')
+  word_count = cursor.fetchone()[0]
+
+  session_count = days * sessions_per_day
+  cursor.execute('''
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+    INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+    SELECT ? + i % ?, 1, datetime(?, '+' || (i * 86400 / ?) || ' seconds') FROM n
+  ''', (session_count, first_group_id, groups, start_day.isoformat(), sessions_per_day))
+  cursor.execute('SELECT MIN(id) FROM study_sessions')
+  first_session_id = cursor.fetchone()[0]
+
+  cursor.execute('''
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+    SELECT
+      1 + abs(random()) % ?,
+      ? + i * ? / ?,
+      abs(random()) % 10 < 7,
+      datetime(?, '+' || ((i * ? / ?) * 86400 / ? + i % 600) || ' seconds')
+    FROM n
+  ''', (
+    reviews, word_count, first_session_id, session_count, reviews,
+    start_day.isoformat(), session_count, reviews, sessions_per_day
+  ))
+
+def time_request(client, path, runs):
+  timings = []
+  for _ in range(runs):
+    started = time.perf_counter()
+    response = client.get(path)
+    timings.append((time.perf_counter() - started) * 1000)
+  if response.status_code != 200:
+    raise RuntimeError(f'{path} returned {response.status_code}: {response.get_json()}')
+  timings.sort()
+  return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--reviews', type=int, default=10000000)
+  parser.add_argument('--days', type=int, default=730)
+  parser.add_argument('--groups', type=int, default=50)
+  parser.add_argument('--sessions-per-day', type=int, default=100)
+  parser.add_argument('--runs', type=int, default=50)
+  args = parser.parse_args()
+
+  end_day = date.today()
+  start_day = end_day - timedelta(days=args.days - 1)
+
+  with tempfile.TemporaryDirectory() as directory:
+    app = create_app({'DATABASE': os.path.join(directory, 'words.db'), 'RESPONSE_CACHE_SIZE': 0})
+    app.db.init(app)
+    with app.app_context():
+      started = time.monotonic()
+      with app.db.write() as cursor:
+        generate_history(cursor, args.reviews, args.days, args.groups, args.sessions_per_day, start_day)
+      print(f'Generated {args.reviews:,} reviews in {time.monotonic() - started:.1f}s')
+
+      started = time.monotonic()
+      with app.db.write() as cursor:
+        rebuild_daily_stats(cursor)
+        cursor.execute('SELECT COUNT(*) FROM daily_review_stats')
+        rollup_rows = cursor.fetchone()[0]
+      print(f'Built {rollup_rows:,} daily_review_stats rows in {time.monotonic() - started:.1f}s')
+
+      cursor = app.db.cursor()
+      cursor.execute("SELECT MIN(id) FROM groups WHERE name LIKE 'Synthetic %'")
+      group_id = cursor.fetchone()[0]
+
+    client = app.test_client()
+    year_ago = (end_day - timedelta(days=364)).isoformat()
+    queries = {
+      'last 30 days': '/dashboard/timeseries',
+      'last 30 days, one group': f'/dashboard/timeseries?group_id={group_id}',
+      'one year by week': f'/dashboard/timeseries?bucket=week&from={year_ago}',
+      'one year by day, one group': f'/dashboard/timeseries?from={year_ago}&group_id={group_id}',
+      'whole history by week': f'/dashboard/timeseries?bucket=week&from={start_day.isoformat()}'
+    }
+    for name, path in queries.items():
+      p50, p99 = time_request(client, path, args.runs)
+      print(f'{name:>28}  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms')
+
+    with app.app_context():
+      cursor = app.db.cursor()
+      started = time.perf_counter()
+      cursor.execute('''
+        SELECT date(created_at), COUNT(*), SUM(correct)
+        FROM word_review_items
+        WHERE created_at >= ?
+        GROUP BY date(created_at)
+      ''', ((end_day - timedelta(days=29)).isoformat(),))
+      cursor.fetchall()
+      print(f'{"30 days from review items":>28}  {(time.perf_counter() - started) * 1000:7.0f} ms (one run)')
+
+if __name__ == '__main__':
+  main()
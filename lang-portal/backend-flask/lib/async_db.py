@@ -0,0 +1,57 @@
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+from lib.db import DEFAULT_PRAGMAS
+
+# aiosqlite connection pool for the routes the ASGI app (asgi.py) serves
+# natively. Each aiosqlite connection runs its queries on its own thread, so
+# the event loop never blocks on SQLite. The pool is bounded: when every
+# connection is busy, requests wait for one to be released instead of
+# opening more threads. Reads only; writes still go through Db.write().
+
+class AsyncDb:
+  def __init__(self, database='instance/words.db', pool_size=8, pragmas=None):
+    self.database = database
+    self.pool_size = pool_size
+    self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    self.idle = []
+    # Created on first use, inside the server's event loop. A semaphore
+    # rather than a queue, so waiting requests are served in arrival order.
+    self.slots = None
+
+  async def connect(self):
+    connection = await aiosqlite.connect(self.database)
+    connection.row_factory = sqlite3.Row
+    for name, value in self.pragmas.items():
+      await connection.execute(f'PRAGMA {name} = {value}')
+    return connection
+
+  # async with app_db.connection() as connection: ...
+  @asynccontextmanager
+  async def connection(self):
+    # With a pool size of 0 every request opens and closes its own connection
+    if self.pool_size <= 0:
+      connection = await self.connect()
+      try:
+        yield connection
+      finally:
+        await connection.close()
+      return
+
+    if self.slots is None:
+      self.slots = asyncio.Semaphore(self.pool_size)
+    async with self.slots:
+      connection = self.idle.pop() if self.idle else await self.connect()
+      try:
+        yield connection
+      finally:
+        if connection.in_transaction:
+          await connection.rollback()
+        self.idle.append(connection)
+
+  async def close(self):
+    while self.idle:
+      await self.idle.pop().close()
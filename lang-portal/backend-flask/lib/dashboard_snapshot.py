@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+
+# The dashboard_snapshot table caches the /dashboard/stats numbers in a single
+# row. Writes keep it up to date incrementally (apply_reviews,
+# apply_session_created), so the endpoint reads one row instead of running
+# full-table aggregates on every page load. refresh_snapshot recomputes
+# everything from scratch and is used after bulk changes (imports, reset).
+
+# A word is mastered with at least 5 attempts and an 80% success rate
+MASTERY_MIN_ATTEMPTS = 5
+MASTERY_SUCCESS_RATE = 0.8
+
+def is_mastered(correct_count, wrong_count):
+  attempts = correct_count + wrong_count
+  return attempts >= MASTERY_MIN_ATTEMPTS and correct_count * 1.0 / attempts >= MASTERY_SUCCESS_RATE
+
+def refresh_snapshot(cursor):
+  cursor.execute('SELECT COUNT(*) FROM words')
+  total_vocabulary = cursor.fetchone()[0]
+
+  cursor.execute('''
+    SELECT
+      COUNT(*),
+      COALESCE(SUM(correct_count), 0),
+      COALESCE(SUM(correct_count + wrong_count), 0),
+      COALESCE(SUM(
+        CASE WHEN correct_count + wrong_count >= ?
+        AND correct_count * 1.0 / (correct_count + wrong_count) >= ? THEN 1 ELSE 0 END
+      ), 0)
+    FROM word_reviews
+    WHERE correct_count + wrong_count > 0
+  ''', (MASTERY_MIN_ATTEMPTS, MASTERY_SUCCESS_RATE))
+  total_words_studied, correct_reviews, total_reviews, mastered_words = cursor.fetchone()
+
+  cursor.execute('SELECT COUNT(*), MAX(date(created_at)) FROM study_sessions')
+  total_sessions, last_study_date = cursor.fetchone()
+
+  # Count the study days that directly follow another study day (the first
+  # study day counts too). apply_session_created extends this incrementally.
+  cursor.execute('''
+    WITH daily_sessions AS (
+      SELECT DISTINCT date(created_at) as study_date
+      FROM study_sessions
+    ),
+    streak_calc AS (
+      SELECT
+        study_date,
+        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
+      FROM daily_sessions
+    )
+    SELECT COUNT(*)
+    FROM streak_calc
+    WHERE days_diff = 1 OR days_diff IS NULL
+  ''')
+  current_streak = cursor.fetchone()[0]
+
+  cursor.execute('''
+    INSERT OR REPLACE INTO dashboard_snapshot (
+      id, total_vocabulary, total_words_studied, mastered_words, correct_reviews, total_reviews,
+      total_sessions, active_groups, current_streak, last_study_date, computed_at
+    ) VALUES (1, ?, ?, ?, ?, ?, ?, 0, ?, ?, NULL)
+  ''', (
+    total_vocabulary, total_words_studied, mastered_words, correct_reviews, total_reviews,
+    total_sessions, current_streak, last_study_date
+  ))
+  refresh_active_groups(cursor)
+
+# active_groups depends on the current date, so it is recomputed whenever the
+# snapshot is read on a later day than it was computed
+def refresh_active_groups(cursor):
+  cursor.execute('''
+    UPDATE dashboard_snapshot SET
+      active_groups = (
+        SELECT COUNT(DISTINCT group_id)
+        FROM study_sessions
+        WHERE created_at >= date('now', '-30 days')
+      ),
+      computed_at = CURRENT_TIMESTAMP
+    WHERE id = 1
+  ''')
+
+# Return the snapshot row if it is present and current, or None if it has to
+# be (re)computed with get_snapshot on a write cursor
+def read_snapshot(cursor):
+  cursor.execute('SELECT * FROM dashboard_snapshot WHERE id = 1')
+  snapshot = cursor.fetchone()
+  if snapshot and snapshot['computed_at'][:10] == datetime.now(timezone.utc).strftime('%Y-%m-%d'):
+    return snapshot
+  return None
+
+def get_snapshot(cursor, refresh=False):
+  cursor.execute('SELECT * FROM dashboard_snapshot WHERE id = 1')
+  snapshot = cursor.fetchone()
+
+  if refresh or not snapshot:
+    refresh_snapshot(cursor)
+  elif snapshot['computed_at'][:10] != datetime.now(timezone.utc).strftime('%Y-%m-%d'):
+    refresh_active_groups(cursor)
+  else:
+    return snapshot
+
+  cursor.execute('SELECT * FROM dashboard_snapshot WHERE id = 1')
+  return cursor.fetchone()
+
+# Called with each reviewed word's counts before and after the update. If the
+# snapshot hasn't been built yet the UPDATE is a no-op and the next read
+# computes it from scratch.
+def apply_reviews(cursor, word_counts):
+  words_studied = mastered = correct_reviews = total_reviews = 0
+  for (correct_before, wrong_before), (correct_after, wrong_after) in word_counts:
+    if correct_before + wrong_before == 0:
+      words_studied += 1
+    mastered += is_mastered(correct_after, wrong_after) - is_mastered(correct_before, wrong_before)
+    correct_reviews += correct_after - correct_before
+    total_reviews += (correct_after + wrong_after) - (correct_before + wrong_before)
+
+  cursor.execute('''
+    UPDATE dashboard_snapshot SET
+      total_words_studied = total_words_studied + ?,
+      mastered_words = mastered_words + ?,
+      correct_reviews = correct_reviews + ?,
+      total_reviews = total_reviews + ?
+    WHERE id = 1
+  ''', (words_studied, mastered, correct_reviews, total_reviews))
+
+# Called right after a study session row has been inserted
+def apply_session_created(cursor, session_id, group_id):
+  # The group only becomes active if it had no other session in the window
+  cursor.execute('''
+    SELECT 1 FROM study_sessions
+    WHERE group_id = ? AND created_at >= date('now', '-30 days') AND id != ?
+    LIMIT 1
+  ''', (group_id, session_id))
+  newly_active = 0 if cursor.fetchone() else 1
+
+  cursor.execute('''
+    UPDATE dashboard_snapshot SET
+      total_sessions = total_sessions + 1,
+      active_groups = active_groups + ?,
+      current_streak = CASE
+        WHEN last_study_date IS NULL THEN 1
+        WHEN julianday(date('now')) - julianday(last_study_date) = 1 THEN current_streak + 1
+        ELSE current_streak
+      END,
+      last_study_date = date('now')
+    WHERE id = 1
+  ''', (newly_active,))
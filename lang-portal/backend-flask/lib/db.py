@@ -1,16 +1,87 @@
 import sqlite3
 import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from flask import g
 
+from lib.importer import import_words, read_words
+from lib.migrations import stamp_migrations
+from lib.search import rebuild_search_index
+
+# Pragmas applied to every pooled connection. WAL lets readers run while a
+# write is in progress, and NORMAL sync is durable in WAL mode except against
+# power loss. cache_size is negative so it is measured in KiB (64 MiB).
+DEFAULT_PRAGMAS = {
+  'journal_mode': 'WAL',
+  'synchronous': 'NORMAL',
+  'cache_size': -64000,
+  'mmap_size': 268435456,
+  'temp_store': 'MEMORY',
+  'busy_timeout': 5000
+}
+
 class Db:
-  def __init__(self, database='instance/words.db'):
+  # Cached counts also expire, so writes made by another process (e.g. the
+  # import tasks) show up without restarting the server
+  COUNT_CACHE_TTL = 60
+
+  def __init__(self, database='instance/words.db', pool_size=8, cached_statements=256, pragmas=None):
     self.database = database
-    self.connection = None
+    self.cached_statements = cached_statements
+    self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    # Idle connections kept open between requests. With a pool size of 0
+    # every request opens and closes its own connection.
+    self.pool = queue.LifoQueue(maxsize=pool_size) if pool_size > 0 else None
+    # Writes go through one dedicated connection, serialised by the lock, so
+    # concurrent writers queue up here instead of failing with SQLITE_BUSY
+    self.writer = None
+    self.write_lock = threading.Lock()
+    # Cached COUNT(*) results for listing totals, keyed by (table, *scope)
+    self.count_cache = {}
+    # Cached set of word ids and when it was loaded, used to validate review
+    # batches in memory
+    self.word_id_cache = None
+
+  def connect(self):
+    # cached_statements sizes sqlite3's per-connection prepared statement
+    # cache, so the routes' fixed queries are only compiled once per connection
+    connection = sqlite3.connect(
+      self.database,
+      check_same_thread=False,
+      cached_statements=self.cached_statements
+    )
+    connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+    for name, value in self.pragmas.items():
+      connection.execute(f'PRAGMA {name} = {value}')
+    return connection
 
+  def acquire(self):
+    if self.pool is not None:
+      try:
+        return self.pool.get_nowait()
+      except queue.Empty:
+        pass
+    return self.connect()
+
+  def release(self, connection):
+    # Discard anything the request left uncommitted before reusing the connection
+    if connection.in_transaction:
+      connection.rollback()
+    if self.pool is not None:
+      try:
+        self.pool.put_nowait(connection)
+        return
+      except queue.Full:
+        pass
+    connection.close()
+
+  # The request's read connection, checked out of the pool on first use and
+  # returned by close() when the app context is torn down
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
-      g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      g.db = self.acquire()
     return g.db
 
   def commit(self):
@@ -24,7 +95,71 @@ class Db:
   def close(self):
     db = g.pop('db', None)
     if db is not None:
-      db.close()
+      self.release(db)
+
+  # Run a write transaction on the writer connection:
+  #
+  #   with app.db.write() as cursor:
+  #     cursor.execute(...)
+  #
+  # Commits when the block exits and rolls back if it raises.
+  @contextmanager
+  def write(self):
+    with self.write_lock:
+      if self.writer is None:
+        self.writer = self.connect()
+      cursor = self.writer.cursor()
+      try:
+        yield cursor
+        self.writer.commit()
+      except BaseException:
+        self.writer.rollback()
+        raise
+
+  # Return a COUNT(*) from the cache, running the query only on a miss.
+  # Used by the cursor-paginated listings so deep pages never rescan the table.
+  def cached_count(self, key, query, params=()):
+    cached = self.count_cache.get(key)
+    if cached is not None and time.monotonic() - cached[1] < self.COUNT_CACHE_TTL:
+      return cached[0]
+    cursor = self.cursor()
+    cursor.execute(query, params)
+    count = cursor.fetchone()[0]
+    self.count_cache[key] = (count, time.monotonic())
+    return count
+
+  # Drop cached counts for a table after it has been written to
+  def invalidate_counts(self, table):
+    for key in [key for key in self.count_cache if key[0] == table]:
+      self.count_cache.pop(key, None)
+
+  # Drop the cached word ids after words have been added or deleted
+  def invalidate_word_ids(self):
+    self.word_id_cache = None
+
+  # Return the ids in `word_ids` that exist in the words table. Known ids are
+  # checked against an in-memory set; only unknown ones (e.g. words imported by
+  # another process since the set was loaded) go back to the database. The set
+  # is reloaded after COUNT_CACHE_TTL, so words deleted by another process
+  # stop being accepted too.
+  def existing_word_ids(self, word_ids):
+    if self.word_id_cache is None or time.monotonic() - self.word_id_cache[1] >= self.COUNT_CACHE_TTL:
+      cursor = self.cursor()
+      cursor.execute('SELECT id FROM words')
+      self.word_id_cache = ({row[0] for row in cursor.fetchall()}, time.monotonic())
+    known = self.word_id_cache[0]
+
+    existing = {word_id for word_id in word_ids if word_id in known}
+    unknown = list(set(word_ids) - existing)
+    # Stay well under SQLite's bound parameter limit
+    for start in range(0, len(unknown), 500):
+      chunk = unknown[start:start + 500]
+      cursor = self.cursor()
+      cursor.execute(f"SELECT id FROM words WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+      found = {row[0] for row in cursor.fetchall()}
+      known.update(found)
+      existing.update(found)
+    return existing
 
   # Function to load SQL from a file
   def sql(self, filepath):
@@ -43,32 +178,42 @@ class Db:
     test_cursor.execute("PRAGMA database_list;")  # Lists active databases
     print("Active databases:", test_cursor.fetchall())
     print("Running setup_tables...")
-    cursor.execute(self.sql('setup/create_table_words.sql'))
-    print("create_table_words.sql executed")
-    self.get().commit()
 
-    cursor.execute(self.sql('setup/create_table_word_reviews.sql'))
-    print("create_table_word_reviews.sql executed")
+    # Create every table in one transaction rather than committing per file
+    cursor.execute('BEGIN')
+    for filename in [
+      'setup/create_table_words.sql',
+      'setup/create_table_word_reviews.sql',
+      'setup/create_table_word_review_items.sql',
+      'setup/create_table_groups.sql',
+      'setup/create_table_word_groups.sql',
+      'setup/create_table_study_activities.sql',
+      'setup/create_table_study_sessions.sql',
+      'setup/create_table_study_session_word_reviews.sql',
+      'setup/create_table_study_session_summaries.sql',
+      'setup/create_table_daily_review_stats.sql',
+      'setup/create_table_dashboard_snapshot.sql'
+    ]:
+      cursor.execute(self.sql(filename))
+      print(f"{filename} executed")
     self.get().commit()
 
-    cursor.execute(self.sql('setup/create_table_word_review_items.sql'))
-    print("create_table_word_review_items.sql executed")
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_groups.sql'))
-    self.get().commit()
+  # Indexes are created after the seed data is loaded, so they are built once
+  # over the full tables instead of being updated row by row
+  def setup_indexes(self,cursor):
+    cursor.executescript('BEGIN;' + self.sql('setup/create_indexes.sql') + 'COMMIT;')
+    print("setup/create_indexes.sql executed")
 
-    cursor.execute(self.sql('setup/create_table_word_groups.sql'))
-    print("create_table_word_groups.sql executed")
+    cursor.executescript('BEGIN;' + self.sql('setup/create_words_search.sql') + 'COMMIT;')
+    rebuild_search_index(cursor)
     self.get().commit()
+    print("setup/create_words_search.sql executed")
 
-    cursor.execute(self.sql('setup/create_table_study_activities.sql'))
-    print("create_table_study_activities.sql executed")
-    self.get().commit()
+    cursor.executescript('BEGIN;' + self.sql('setup/create_word_schedules.sql') + 'COMMIT;')
+    print("setup/create_word_schedules.sql executed")
 
-    cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
-    print("create_table_study_sessions.sql executed")
-    self.get().commit()
+    cursor.executescript('BEGIN;' + self.sql('setup/create_group_membership_triggers.sql') + 'COMMIT;')
+    print("setup/create_group_membership_triggers.sql executed")
 
   def import_study_activities_json(self,cursor,data_json_path):
     study_actvities = self.load_json(data_json_path)
@@ -79,49 +224,12 @@ class Db:
     self.get().commit()
 
   def import_word_json(self,cursor,group_name,data_json_path):
-      # Insert a new group
-      cursor.execute('''
-        INSERT INTO groups (name) VALUES (?)
-      ''', (group_name,))
+      stats = import_words(cursor, read_words(data_json_path, 'json'), group_name=group_name)
       self.get().commit()
+      self.count_cache.clear()
+      self.invalidate_word_ids()
 
-      # Get the ID of the group
-      cursor.execute('SELECT id FROM groups WHERE name = ?', (group_name,))
-      core_verbs_group_id = cursor.fetchone()[0]
-
-      # Insert some sample words (verbs) from JSON file and associate with the group
-      words = self.load_json(data_json_path)
-      
-      # breakpoint()
-      # print('words', words)
-
-      for word in words:
-        # Insert the word into the words table
-        cursor.execute('''
-          INSERT INTO words (spanish, pronunciation, english, parts_of_speech) VALUES (?, ?, ?, ?)
-        ''', (word['spanish'], word['pronunciation'], word['english'], json.dumps(word['parts_of_speech'])))
-        
-        # Get the last inserted word's ID
-        word_id = cursor.lastrowid
-
-        # Insert the word-group relationship into word_groups table
-        cursor.execute('''
-          INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
-        ''', (word_id, core_verbs_group_id))
-      self.get().commit()
-
-      # Update the words_count in the groups table by counting all words in the group
-      cursor.execute('''
-        UPDATE groups
-        SET words_count = (
-          SELECT COUNT(*) FROM word_groups WHERE group_id = ?
-        )
-        WHERE id = ?
-      ''', (core_verbs_group_id, core_verbs_group_id))
-
-      self.get().commit()
-
-      print(f"Successfully added {len(words)} verbs to the '{group_name}' group.")
+      print(f"Successfully added {stats['words_read']} words to the '{group_name}' group.")
 
   # Initialize the database with sample data
   def init(self, app):
@@ -144,5 +252,11 @@ class Db:
         data_json_path='seed/study_activities.json'
       )
 
+      self.setup_indexes(cursor)
+
+      # The setup files are the latest schema, so no migration needs to run
+      stamp_migrations(cursor)
+      self.get().commit()
+
 # Create an instance of the Db class
 db = Db()
@@ -0,0 +1,25 @@
+# groups.words_count is kept exact by the word_groups triggers
+# (sql/setup/create_group_membership_triggers.sql). These check it against
+# word_groups and repair any drift, e.g. from memberships written while the
+# triggers were missing (before migration 0007, or by hand). Every group is
+# counted in one grouped pass over the word_groups primary key, then only the
+# drifted groups are updated.
+
+def group_count_drift(cursor):
+  # Returns [(group_id, name, words_count, actual)] for every group whose
+  # counter is wrong
+  cursor.execute('''
+    SELECT g.id, g.name, g.words_count, COALESCE(counts.actual, 0)
+    FROM groups g
+    LEFT JOIN (
+      SELECT group_id, COUNT(*) AS actual FROM word_groups GROUP BY group_id
+    ) counts ON counts.group_id = g.id
+    WHERE g.words_count IS NOT COALESCE(counts.actual, 0)
+    ORDER BY g.id
+  ''')
+  return [tuple(row) for row in cursor.fetchall()]
+
+def repair_group_counts(cursor, drift):
+  cursor.executemany('UPDATE groups SET words_count = ? WHERE id = ?', [
+    (actual, group_id) for group_id, _, _, actual in drift
+  ])
@@ -0,0 +1,198 @@
+import gzip
+import json
+import time
+import zlib
+from datetime import datetime, timezone
+
+from lib.reviews import rebuild_rollups
+
+# Export and import of the study history (study_sessions and
+# word_review_items) as NDJSON, one record per line:
+#
+#   {"type": "export", "version": 1, "exported_at": "..."}
+#   {"type": "study_session", "id": 1, "group_id": 1, "study_activity_id": 1, "created_at": "..."}
+#   {"type": "review", "id": 1, "study_session_id": 1, "word_id": 3, "correct": true, "created_at": "..."}
+#
+# Sessions come before the reviews that reference them. Ids are kept, so the
+# words, groups and study activities of the importing database must have the
+# same ids as in the exporting one (as they do for databases initialised from
+# the same seed data). Both directions stream: the export reads rows with
+# fetchmany and the import writes them with executemany in chunks, so neither
+# holds the history in memory. The rollups are derived data and aren't
+# exported; the import rebuilds them.
+
+EXPORT_VERSION = 1
+EXPORT_FETCH_SIZE = 5000
+# Bytes of NDJSON gathered before a chunk is sent to the client
+EXPORT_CHUNK_BYTES = 1 << 16
+DEFAULT_CHUNK_SIZE = 5000
+
+# wbits 16 + 15 makes zlib write a gzip header and trailer
+GZIP_WBITS = 31
+
+def export_records(cursor):
+  # Yields the export's records. Runs in a read transaction so sessions and
+  # reviews come from the same snapshot, even if reviews are recorded meanwhile.
+  cursor.execute('BEGIN')
+  try:
+    yield {
+      'type': 'export',
+      'version': EXPORT_VERSION,
+      'exported_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    cursor.execute('SELECT id, group_id, study_activity_id, created_at FROM study_sessions ORDER BY id')
+    while True:
+      rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+      if not rows:
+        break
+      for id, group_id, study_activity_id, created_at in rows:
+        yield {
+          'type': 'study_session',
+          'id': id,
+          'group_id': group_id,
+          'study_activity_id': study_activity_id,
+          'created_at': created_at
+        }
+
+    cursor.execute('SELECT id, study_session_id, word_id, correct, created_at FROM word_review_items ORDER BY id')
+    while True:
+      rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+      if not rows:
+        break
+      for id, study_session_id, word_id, correct, created_at in rows:
+        yield {
+          'type': 'review',
+          'id': id,
+          'study_session_id': study_session_id,
+          'word_id': word_id,
+          'correct': bool(correct),
+          'created_at': created_at
+        }
+  finally:
+    cursor.connection.rollback()
+
+def ndjson_chunks(records, chunk_bytes=EXPORT_CHUNK_BYTES):
+  # Encode records as NDJSON, joined into chunks of about chunk_bytes
+  lines, size = [], 0
+  for record in records:
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    lines.append(line)
+    size += len(line)
+    if size >= chunk_bytes:
+      yield ''.join(lines).encode('utf-8')
+      lines, size = [], 0
+  if lines:
+    yield ''.join(lines).encode('utf-8')
+
+def gzip_chunks(chunks, level=6):
+  # Compress a stream of byte chunks into one gzip stream, chunk by chunk
+  compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+  for chunk in chunks:
+    compressed = compressor.compress(chunk)
+    if compressed:
+      yield compressed
+  yield compressor.flush()
+
+def read_history(path):
+  # Yields the records of an export file, gzip-compressed or not
+  with open(path, 'rb') as file:
+    compressed = file.read(2) == b'\x1f\x8b'
+  opener = gzip.open if compressed else open
+  with opener(path, 'rt', encoding='utf-8') as file:
+    for line in file:
+      line = line.strip()
+      if line:
+        yield json.loads(line)
+
+def import_history(cursor, records, chunk_size=DEFAULT_CHUNK_SIZE):
+  # Load exported records into a database without study history, then rebuild
+  # the rollups. Runs inside the caller's transaction (starting one if
+  # needed); the caller commits. Returns load statistics.
+  started_at = time.monotonic()
+  if not cursor.connection.in_transaction:
+    cursor.execute('BEGIN')
+
+  cursor.execute('SELECT EXISTS (SELECT 1 FROM study_sessions) OR EXISTS (SELECT 1 FROM word_review_items)')
+  if cursor.fetchone()[0]:
+    raise ValueError('The database already has study history; reset it before importing')
+
+  # The indexes are rebuilt once at the end instead of row by row
+  cursor.execute('''
+    SELECT name, sql FROM sqlite_master
+    WHERE type = 'index' AND tbl_name IN ('study_sessions', 'word_review_items') AND sql IS NOT NULL
+  ''')
+  deferred_indexes = cursor.fetchall()
+  for name, _ in deferred_indexes:
+    cursor.execute(f'DROP INDEX "{name}"')
+
+  session_rows = []
+  review_rows = []
+  stats = {'sessions': 0, 'reviews': 0}
+
+  def flush():
+    cursor.executemany('''
+      INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, ?, ?, ?)
+    ''', session_rows)
+    cursor.executemany('''
+      INSERT INTO word_review_items (id, study_session_id, word_id, correct, created_at) VALUES (?, ?, ?, ?, ?)
+    ''', review_rows)
+    stats['sessions'] += len(session_rows)
+    stats['reviews'] += len(review_rows)
+    session_rows.clear()
+    review_rows.clear()
+
+  header = None
+  for line_number, record in enumerate(records, start=1):
+    record_type = record.get('type') if isinstance(record, dict) else None
+    if header is None:
+      if record_type != 'export':
+        raise ValueError('Not a study history export: the first record must be the export header')
+      if record.get('version') != EXPORT_VERSION:
+        raise ValueError(f"Unsupported export version: {record.get('version')!r}")
+      header = record
+      continue
+
+    try:
+      if record_type == 'study_session':
+        session_rows.append((
+          record['id'], record['group_id'], record['study_activity_id'], record['created_at']
+        ))
+      elif record_type == 'review':
+        review_rows.append((
+          record['id'], record['study_session_id'], record['word_id'], bool(record['correct']), record['created_at']
+        ))
+      else:
+        raise ValueError(f'unknown record type {record_type!r}')
+    except KeyError as e:
+      raise ValueError(f'Record {line_number}: missing {e.args[0]!r}')
+    except ValueError as e:
+      raise ValueError(f'Record {line_number}: {e}')
+
+    if len(session_rows) + len(review_rows) >= chunk_size:
+      flush()
+  flush()
+
+  if header is None:
+    raise ValueError('Empty export')
+
+  for _, sql in deferred_indexes:
+    cursor.execute(sql)
+
+  # Ids are kept, so everything they point to must exist here too
+  cursor.execute('''
+    SELECT
+      (SELECT COUNT(*) FROM study_sessions WHERE group_id NOT IN (SELECT id FROM groups)),
+      (SELECT COUNT(*) FROM study_sessions WHERE study_activity_id NOT IN (SELECT id FROM study_activities)),
+      (SELECT COUNT(*) FROM word_review_items WHERE word_id NOT IN (SELECT id FROM words)),
+      (SELECT COUNT(*) FROM word_review_items WHERE study_session_id NOT IN (SELECT id FROM study_sessions))
+  ''')
+  missing = dict(zip(['groups', 'study activities', 'words', 'study sessions'], cursor.fetchone()))
+  problems = [f'{count} rows reference missing {name}' for name, count in missing.items() if count]
+  if problems:
+    raise ValueError('Export does not match this database: ' + ', '.join(problems))
+
+  rebuild_rollups(cursor)
+
+  stats['seconds'] = time.monotonic() - started_at
+  return stats
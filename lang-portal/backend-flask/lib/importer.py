@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+import time
+
+from lib.dashboard_snapshot import refresh_snapshot
+from lib.search import drop_search_triggers, rebuild_search_index
+
+# Streaming bulk importer for word lists.
+#
+# Words are read one at a time from JSON (an array of word objects), NDJSON or
+# CSV files, so the file is never held in memory (only the keys used to
+# deduplicate words and group memberships are). They are written with
+# executemany in chunks inside a single transaction. The indexes on words and
+# word_groups, and the search index and group membership triggers, are dropped
+# for the load and rebuilt once at the end. A word that appears in several
+# groups (or is already in the database) is stored once and only gains a
+# word_groups row.
+
+DEFAULT_CHUNK_SIZE = 5000
+
+def iter_json_array(file, read_size=1 << 16):
+  decoder = json.JSONDecoder()
+  buffer = file.read(read_size)
+  eof = not buffer
+  position = 0
+  started = False
+
+  while True:
+    # Skip whitespace and separators, reading more input when the buffer runs out
+    while True:
+      while position < len(buffer) and buffer[position] in ' \t\r\n,':
+        position += 1
+      if position < len(buffer) or eof:
+        break
+      buffer = file.read(read_size)
+      eof = not buffer
+      position = 0
+
+    if position >= len(buffer):
+      raise ValueError('Unexpected end of JSON input')
+
+    if not started:
+      if buffer[position] != '[':
+        raise ValueError('Expected a JSON array of words')
+      started = True
+      position += 1
+      continue
+
+    if buffer[position] == ']':
+      return
+
+    try:
+      item, end = decoder.raw_decode(buffer, position)
+    except json.JSONDecodeError:
+      if eof:
+        raise
+      item, end = None, None
+
+    # Only trust a value that ends before the buffer does; otherwise it may
+    # have been cut off mid-read, so read more and try again
+    if end is None or (end == len(buffer) and not eof):
+      chunk = file.read(read_size)
+      eof = not chunk
+      buffer = buffer[position:] + chunk
+      position = 0
+      continue
+
+    yield item
+    position = end
+
+def iter_ndjson(file):
+  for line in file:
+    line = line.strip()
+    if line:
+      yield json.loads(line)
+
+def iter_csv(file):
+  # Columns: spanish, pronunciation, english, parts_of_speech (a JSON string)
+  # and optionally group (several groups separated by '|')
+  for row in csv.DictReader(file):
+    if row.get('parts_of_speech'):
+      row['parts_of_speech'] = json.loads(row['parts_of_speech'])
+    if row.get('group'):
+      row['group'] = row['group'].split('|')
+    yield row
+
+READERS = {
+  'json': iter_json_array,
+  'ndjson': iter_ndjson,
+  'jsonl': iter_ndjson,
+  'csv': iter_csv
+}
+
+def read_words(path, file_format=None):
+  file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+  if file_format not in READERS:
+    raise ValueError(f"Unsupported word list format: {file_format}")
+  with open(path, 'r', encoding='utf-8', newline='') as file:
+    yield from READERS[file_format](file)
+
+def word_groups_of(word, default_group):
+  groups = word.get('group') or word.get('groups') or default_group
+  if not groups:
+    raise ValueError(f"No group given for word {word.get('spanish')!r}")
+  return [groups] if isinstance(groups, str) else groups
+
+def import_words(cursor, words, group_name=None, chunk_size=DEFAULT_CHUNK_SIZE, defer_indexes=True):
+  # Import an iterable of word dicts. Each word goes into `group_name` unless
+  # it names its own group(s). Runs inside the caller's transaction (starting
+  # one if needed); the caller commits. Returns load statistics.
+  started_at = time.monotonic()
+  if not cursor.connection.in_transaction:
+    cursor.execute('BEGIN')
+
+  deferred_indexes = []
+  deferred_triggers = []
+  deferred_membership_triggers = []
+  if defer_indexes:
+    cursor.execute('''
+      SELECT name, sql FROM sqlite_master
+      WHERE type = 'index' AND tbl_name IN ('words', 'word_groups') AND sql IS NOT NULL
+    ''')
+    deferred_indexes = cursor.fetchall()
+    for name, _ in deferred_indexes:
+      cursor.execute(f'DROP INDEX "{name}"')
+    deferred_triggers = drop_search_triggers(cursor)
+    # Every group the load touches gets its membership_version bumped once below
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'group_membership_%'")
+    deferred_membership_triggers = cursor.fetchall()
+    for name, _ in deferred_membership_triggers:
+      cursor.execute(f'DROP TRIGGER "{name}"')
+
+  # Existing words and groups, so re-imports and shared words are deduplicated
+  cursor.execute('SELECT id, spanish, english FROM words')
+  word_ids = {(spanish, english): word_id for word_id, spanish, english in cursor.fetchall()}
+  cursor.execute('SELECT id, name FROM groups')
+  group_ids = {name: group_id for group_id, name in cursor.fetchall()}
+  cursor.execute('SELECT COALESCE(MAX(id), 0) FROM words')
+  next_word_id = cursor.fetchone()[0] + 1
+
+  cursor.execute('SELECT word_id, group_id FROM word_groups')
+  memberships = {(word_id, group_id) for word_id, group_id in cursor.fetchall()}
+  touched_groups = set()
+  word_rows = []
+  membership_rows = []
+  stats = {'words_read': 0, 'words_inserted': 0, 'duplicates': 0, 'memberships_inserted': 0}
+
+  def flush():
+    cursor.executemany('''
+      INSERT INTO words (id, spanish, pronunciation, english, parts_of_speech) VALUES (?, ?, ?, ?, ?)
+    ''', word_rows)
+    cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', membership_rows)
+    stats['words_inserted'] += len(word_rows)
+    stats['memberships_inserted'] += len(membership_rows)
+    word_rows.clear()
+    membership_rows.clear()
+
+  for word in words:
+    stats['words_read'] += 1
+
+    key = (word['spanish'], word['english'])
+    word_id = word_ids.get(key)
+    if word_id is None:
+      word_id = next_word_id
+      next_word_id += 1
+      word_ids[key] = word_id
+      word_rows.append((
+        word_id, word['spanish'], word.get('pronunciation'), word['english'],
+        json.dumps(word.get('parts_of_speech') or {})
+      ))
+    else:
+      stats['duplicates'] += 1
+
+    for name in word_groups_of(word, group_name):
+      if name not in group_ids:
+        cursor.execute('INSERT INTO groups (name) VALUES (?)', (name,))
+        group_ids[name] = cursor.lastrowid
+      group_id = group_ids[name]
+      touched_groups.add(group_id)
+      if (word_id, group_id) not in memberships:
+        memberships.add((word_id, group_id))
+        membership_rows.append((word_id, group_id))
+
+    if len(word_rows) >= chunk_size or len(membership_rows) >= chunk_size:
+      flush()
+  flush()
+
+  # Rebuild the indexes once over the loaded data instead of row by row
+  for _, sql in deferred_indexes:
+    cursor.execute(sql)
+  if deferred_triggers:
+    rebuild_search_index(cursor)
+    for sql in deferred_triggers:
+      cursor.execute(sql)
+  for _, sql in deferred_membership_triggers:
+    cursor.execute(sql)
+
+  # Update the words_count in the groups table by counting all words in the group
+  cursor.executemany('''
+    UPDATE groups
+    SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = ?),
+      membership_version = membership_version + 1
+    WHERE id = ?
+  ''', [(group_id, group_id) for group_id in touched_groups])
+
+  refresh_snapshot(cursor)
+
+  stats['seconds'] = time.monotonic() - started_at
+  return stats
@@ -0,0 +1,188 @@
+import importlib.util
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# Versioned schema migrations (run with `python migrate.py` or `invoke migrate`).
+#
+# Migrations live in sql/migrations as NNNN_name.sql or NNNN_name.py and are
+# applied in version order. Applied versions are recorded in
+# schema_migrations, so each one runs once.
+#
+# A .sql migration runs in a single transaction together with the row that
+# records it. A .py migration defines migrate(migration) and opens its own
+# short transactions through the Migration object, so it can backfill large
+# tables in batches (Migration.backfill) while the app keeps serving. If it is
+# interrupted it runs again from the start, so it must be safe to re-run.
+#
+# A fresh database is created from sql/setup, which is always the latest
+# schema, and stamp_migrations marks every migration as applied. So a schema
+# change goes both in sql/setup and in a new migration.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sql', 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+
+DEFAULT_BATCH_SIZE = 10000
+# Pause between backfill batches, giving the app's writers a turn at the lock
+DEFAULT_PAUSE = 0.05
+
+def split_statements(sql):
+  # Split a script into statements; complete_statement knows that the
+  # semicolons inside a trigger body don't end it
+  statements, statement = [], ''
+  for line in sql.splitlines(keepends=True):
+    statement += line
+    if sqlite3.complete_statement(statement):
+      statements.append(statement.strip())
+      statement = ''
+  leftover = '\n'.join(line for line in statement.splitlines() if not line.strip().startswith('--'))
+  if leftover.strip():
+    raise ValueError(f'Incomplete SQL statement: {leftover.strip()[:80]}')
+  return statements
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+  # Returns [(version, name, path)] in version order
+  migrations = {}
+  for filename in sorted(os.listdir(directory)):
+    match = MIGRATION_FILE.match(filename)
+    if not match:
+      continue
+    version = int(match.group(1))
+    if version in migrations:
+      raise ValueError(f'Duplicate migration version {version}: {filename} and {migrations[version][1]}')
+    migrations[version] = (version, filename, os.path.join(directory, filename))
+  return [migrations[version] for version in sorted(migrations)]
+
+def ensure_migrations_table(cursor):
+  cursor.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version INTEGER PRIMARY KEY,
+      name TEXT NOT NULL,
+      applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+  ''')
+
+def applied_versions(cursor):
+  ensure_migrations_table(cursor)
+  cursor.execute('SELECT version FROM schema_migrations')
+  return {row[0] for row in cursor.fetchall()}
+
+def record_migration(cursor, version, name):
+  cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (version, name))
+
+# Mark every migration as applied; used by Db.init, which builds the latest
+# schema directly. Runs in the caller's transaction.
+def stamp_migrations(cursor, directory=MIGRATIONS_DIR):
+  applied = applied_versions(cursor)
+  for version, name, _ in discover_migrations(directory):
+    if version not in applied:
+      record_migration(cursor, version, name)
+
+class Migration:
+  def __init__(self, connection, version, name, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE):
+    self.connection = connection
+    self.version = version
+    self.name = name
+    self.batch_size = batch_size
+    self.pause = pause
+
+  # BEGIN IMMEDIATE takes the write lock up front, so a migration waits for
+  # the app's writers (up to busy_timeout) rather than failing halfway through
+  @contextmanager
+  def transaction(self):
+    cursor = self.connection.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+      yield cursor
+      cursor.execute('COMMIT')
+    except BaseException:
+      cursor.execute('ROLLBACK')
+      raise
+
+  # Run a script (e.g. a file from sql/setup) in one transaction
+  def execute_script(self, sql):
+    with self.transaction() as cursor:
+      for statement in split_statements(sql):
+        cursor.execute(statement)
+
+  # Run `sql` (a statement or a list of them) over `table` in rowid ranges, one
+  # short transaction per batch. Each statement takes the range as two
+  # parameters: rowid > ? AND rowid <= ?. A statement can also be a function,
+  # called with the cursor and the range, for work SQL can't do. It keeps
+  # going until it reaches the end of the table, so rows the app inserts
+  # while the backfill runs are covered too. Pass `until` to stop at a fixed
+  # rowid instead, e.g. where a trigger takes over. Returns the last rowid.
+  def backfill(self, table, sql, batch_size=None, until=None):
+    statements = sql if isinstance(sql, list) else [sql]
+    batch_size = batch_size or self.batch_size
+    last_id = 0
+    started_at = time.monotonic()
+    while True:
+      with self.transaction() as cursor:
+        if until is None:
+          cursor.execute(f'SELECT MAX(rowid) FROM {table}')
+          end_id = cursor.fetchone()[0] or 0
+        else:
+          end_id = until
+        if last_id >= end_id:
+          break
+        batch_end = min(last_id + batch_size, end_id)
+        for statement in statements:
+          if callable(statement):
+            statement(cursor, last_id, batch_end)
+          else:
+            cursor.execute(statement, (last_id, batch_end))
+      last_id = batch_end
+      print(f"  {self.name}: {table} backfilled up to rowid {last_id} ({time.monotonic() - started_at:.1f}s)")
+      time.sleep(self.pause)
+    return last_id
+
+def connect(database, pragmas):
+  # Autocommit mode: migrations manage their own transactions
+  connection = sqlite3.connect(database, isolation_level=None)
+  connection.row_factory = sqlite3.Row
+  for name, value in pragmas.items():
+    connection.execute(f'PRAGMA {name} = {value}')
+  return connection
+
+def load_python_migration(path):
+  spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+def apply_migration(connection, version, name, path, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE):
+  migration = Migration(connection, version, name, batch_size=batch_size, pause=pause)
+  if path.endswith('.sql'):
+    with open(path, 'r') as file:
+      statements = split_statements(file.read())
+    with migration.transaction() as cursor:
+      for statement in statements:
+        cursor.execute(statement)
+      record_migration(cursor, version, name)
+  else:
+    load_python_migration(path).migrate(migration)
+    with migration.transaction() as cursor:
+      record_migration(cursor, version, name)
+
+def pending_migrations(connection, directory=MIGRATIONS_DIR):
+  applied = applied_versions(connection.cursor())
+  return [migration for migration in discover_migrations(directory) if migration[0] not in applied]
+
+def run_migrations(database, pragmas, directory=MIGRATIONS_DIR, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE):
+  # Apply every pending migration in order; stops at the first failure.
+  # Returns the names of the migrations applied.
+  connection = connect(database, pragmas)
+  try:
+    applied = []
+    for version, name, path in pending_migrations(connection, directory):
+      print(f"Applying {name}...")
+      started_at = time.monotonic()
+      apply_migration(connection, version, name, path, batch_size=batch_size, pause=pause)
+      print(f"Applied {name} in {time.monotonic() - started_at:.1f}s")
+      applied.append(name)
+    return applied
+  finally:
+    connection.close()
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import json
+
+# Keyset (cursor) pagination helpers.
+#
+# A cursor remembers the sort value and id of the last row of the previous
+# page. The next page seeks straight to it with a row-value comparison
+# (e.g. `(w.spanish, w.id) > (?, ?)`) which SQLite answers with an index
+# range scan, instead of walking past OFFSET rows on every request.
+
+def encode_cursor(sort_by, order, last_value, last_id):
+  payload = json.dumps([sort_by, order, last_value, last_id], separators=(',', ':'))
+  return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort_by, order):
+  # Returns (last_value, last_id) or raises ValueError for a malformed token
+  # or one that was issued for a different sort.
+  try:
+    padded = token + '=' * (-len(token) % 4)
+    cursor_sort_by, cursor_order, last_value, last_id = json.loads(
+      base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+    )
+  except (ValueError, TypeError, binascii.Error, UnicodeError):
+    raise ValueError('Invalid cursor')
+
+  if cursor_sort_by != sort_by or cursor_order != order or not isinstance(last_id, int):
+    raise ValueError('Cursor does not match the requested sort order')
+  return last_value, last_id
+
+def keyset_condition(sort_expr, id_expr, order, last_value, last_id):
+  # Returns (sql, params). The redundant single-column bound lets the planner
+  # seek expression indexes too, which it won't do from the row value alone.
+  op = '>' if order == 'asc' else '<'
+  sql = f'{sort_expr} {op}= ? AND ({sort_expr}, {id_expr}) {op} (?, ?)'
+  return sql, (last_value, last_value, last_id)
+
+def next_cursor(rows, limit, sort_by, order, sort_key='sort_value', id_key='id'):
+  # The queries fetch limit + 1 rows; an extra row means there is another page.
+  if len(rows) <= limit:
+    return None
+  last = rows[limit - 1]
+  return encode_cursor(sort_by, order, last[sort_key], last[id_key])
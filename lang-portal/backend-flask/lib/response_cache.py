@@ -0,0 +1,109 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, make_response, request
+
+# In-process cache for GET responses.
+#
+# Responses are cached by path plus query arguments (sorted, so ?a=1&b=2 and
+# ?b=2&a=1 share an entry) together with the version of every table the
+# endpoint reads. Write endpoints bump those versions with invalidate(), which
+# makes every dependent entry stale at once without having to find them.
+# Each response gets a strong ETag over its body, so clients that send it
+# back in If-None-Match get a 304 without the body being sent again.
+
+class ResponseCache:
+  # Entries also expire, so writes made by another process (e.g. the import
+  # tasks), which can't bump this process's versions, show up eventually
+  TTL = 60
+
+  # max_entries=0 disables caching
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self.entries = OrderedDict()  # key -> (versions, stored_at, body, mimetype, etag)
+    self.versions = {}
+    self.lock = threading.Lock()
+    self.counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0, 'evictions': 0}
+
+  def table_versions(self, tables):
+    return tuple(self.versions.get(table, 0) for table in tables)
+
+  # Called by write endpoints after committing changes to `tables`
+  def invalidate(self, *tables):
+    with self.lock:
+      for table in tables:
+        self.versions[table] = self.versions.get(table, 0) + 1
+      self.counters['invalidations'] += 1
+
+  def lookup(self, key, versions):
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is not None and entry[0] == versions and time.monotonic() - entry[1] < self.TTL:
+        self.entries.move_to_end(key)
+        self.counters['hits'] += 1
+        return entry
+      self.counters['misses'] += 1
+      return None
+
+  def store(self, key, entry):
+    with self.lock:
+      self.entries[key] = entry
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+        self.counters['evictions'] += 1
+
+  def respond(self, entry, cache_status):
+    _, _, body, mimetype, etag = entry
+    if request.if_none_match.contains(etag):
+      with self.lock:
+        self.counters['not_modified'] += 1
+      response = current_app.response_class(status=304)
+    else:
+      response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate it with the ETag every time
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = cache_status
+    return response
+
+  # Decorator for GET views; `tables` are the tables the view's response depends on
+  def cached(self, *tables):
+    def decorator(view):
+      @functools.wraps(view)
+      def wrapper(*args, **kwargs):
+        if not self.max_entries:
+          return view(*args, **kwargs)
+
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        # Read the versions before running the view, so an entry built while
+        # a write lands is already stale when it's stored
+        versions = self.table_versions(tables)
+
+        entry = self.lookup(key, versions)
+        if entry is not None:
+          return self.respond(entry, 'HIT')
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.direct_passthrough:
+          return response
+
+        body = response.get_data()
+        entry = (versions, time.monotonic(), body, response.mimetype, hashlib.sha256(body).hexdigest())
+        self.store(key, entry)
+        return self.respond(entry, 'MISS')
+      return wrapper
+    return decorator
+
+  def stats(self):
+    with self.lock:
+      lookups = self.counters['hits'] + self.counters['misses']
+      return dict(
+        self.counters,
+        entries=len(self.entries),
+        hit_rate=self.counters['hits'] / lookups if lookups else None,
+        versions=dict(self.versions)
+      )
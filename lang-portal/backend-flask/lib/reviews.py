@@ -0,0 +1,187 @@
+# Recording word reviews and maintaining the review rollups.
+#
+# word_review_items is the raw answer history. word_reviews (per word),
+# study_session_word_reviews (per session and word), study_session_summaries
+# (per session) and daily_review_stats (per group and day) hold running
+# counts that are updated in the same transaction as the insert, so read
+# endpoints never have to aggregate the history. Each answer also moves the
+# word's spaced-repetition schedule in the session's group.
+
+from lib.dashboard_snapshot import apply_reviews, refresh_snapshot
+from lib.scheduler import rebuild_schedules, schedule_reviews
+
+def record_review(cursor, study_session_id, word_id, correct):
+  cursor.execute('''
+    INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, ?, ?)
+  ''', (word_id, study_session_id, correct))
+  review_id = cursor.lastrowid
+
+  update_rollups(cursor, study_session_id, [(word_id, correct)])
+  return review_id
+
+# Record many reviews for one session. The items are inserted with a single
+# executemany and the rollups are updated once per distinct word, so a batch
+# costs a handful of statements rather than three per answer.
+def record_reviews(cursor, study_session_id, reviews):
+  cursor.executemany('''
+    INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, ?, ?)
+  ''', [(word_id, study_session_id, correct) for word_id, correct in reviews])
+
+  update_rollups(cursor, study_session_id, reviews)
+
+def update_rollups(cursor, study_session_id, reviews):
+  # Collapse the reviews into per-word deltas first
+  deltas = {}
+  for word_id, correct in reviews:
+    delta = deltas.setdefault(word_id, [0, 0])
+    delta[0 if correct else 1] += 1
+
+  rows = [(word_id, correct_delta, wrong_delta) for word_id, (correct_delta, wrong_delta) in deltas.items()]
+
+  # Read the current counts so the dashboard snapshot can be adjusted by how
+  # each word's totals (and mastery) change
+  counts_before = {}
+  word_ids = list(deltas)
+  for start in range(0, len(word_ids), 500):
+    chunk = word_ids[start:start + 500]
+    cursor.execute(f'''
+      SELECT word_id, correct_count, wrong_count FROM word_reviews
+      WHERE word_id IN ({','.join('?' * len(chunk))})
+    ''', chunk)
+    for word_id, correct_count, wrong_count in cursor.fetchall():
+      counts_before[word_id] = (correct_count, wrong_count)
+
+  cursor.executemany('''
+    INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(word_id) DO UPDATE SET
+      correct_count = correct_count + excluded.correct_count,
+      wrong_count = wrong_count + excluded.wrong_count,
+      last_reviewed = excluded.last_reviewed
+  ''', rows)
+
+  cursor.executemany('''
+    INSERT INTO study_session_word_reviews (study_session_id, word_id, correct_count, wrong_count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(study_session_id, word_id) DO UPDATE SET
+      correct_count = correct_count + excluded.correct_count,
+      wrong_count = wrong_count + excluded.wrong_count
+  ''', [(study_session_id,) + row for row in rows])
+
+  correct_total = sum(correct_delta for _, correct_delta, _ in rows)
+  wrong_total = sum(wrong_delta for _, _, wrong_delta in rows)
+  cursor.execute('''
+    INSERT INTO study_session_summaries
+      (study_session_id, review_count, correct_count, wrong_count, last_activity_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(study_session_id) DO UPDATE SET
+      review_count = review_count + excluded.review_count,
+      correct_count = correct_count + excluded.correct_count,
+      wrong_count = wrong_count + excluded.wrong_count,
+      last_activity_at = MAX(COALESCE(last_activity_at, ''), excluded.last_activity_at)
+  ''', (study_session_id, correct_total + wrong_total, correct_total, wrong_total))
+
+  # Words with no earlier reviews are new today
+  new_words = sum(1 for word_id in deltas if sum(counts_before.get(word_id, (0, 0))) == 0)
+  cursor.execute('''
+    INSERT INTO daily_review_stats (day, group_id, reviews, correct, new_words)
+    SELECT date('now'), group_id, ?, ?, ? FROM study_sessions WHERE id = ?
+    ON CONFLICT(group_id, day) DO UPDATE SET
+      reviews = reviews + excluded.reviews,
+      correct = correct + excluded.correct,
+      new_words = new_words + excluded.new_words
+  ''', (correct_total + wrong_total, correct_total, new_words, study_session_id))
+
+  word_counts = []
+  for word_id, (correct_delta, wrong_delta) in deltas.items():
+    correct_before, wrong_before = counts_before.get(word_id, (0, 0))
+    word_counts.append((
+      (correct_before, wrong_before),
+      (correct_before + correct_delta, wrong_before + wrong_delta)
+    ))
+  apply_reviews(cursor, word_counts)
+
+  schedule_reviews(cursor, study_session_id, reviews)
+
+def clear_rollups(cursor):
+  cursor.execute('DELETE FROM daily_review_stats')
+  cursor.execute('DELETE FROM study_session_summaries')
+  cursor.execute('DELETE FROM study_session_word_reviews')
+  cursor.execute('DELETE FROM word_reviews')
+
+# Recompute every rollup from the raw review items
+def rebuild_rollups(cursor):
+  clear_rollups(cursor)
+
+  cursor.execute('''
+    INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+    SELECT
+      wri.word_id,
+      SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+      SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END),
+      MAX(wri.created_at)
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    GROUP BY wri.word_id
+  ''')
+
+  cursor.execute('''
+    INSERT INTO study_session_word_reviews (study_session_id, word_id, correct_count, wrong_count)
+    SELECT
+      wri.study_session_id,
+      wri.word_id,
+      SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+      SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END)
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    GROUP BY wri.study_session_id, wri.word_id
+  ''')
+
+  cursor.execute('''
+    INSERT INTO study_session_summaries
+      (study_session_id, review_count, correct_count, wrong_count, last_activity_at)
+    SELECT
+      wri.study_session_id,
+      COUNT(*),
+      SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+      SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END),
+      MAX(wri.created_at)
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    GROUP BY wri.study_session_id
+  ''')
+
+  rebuild_daily_stats(cursor)
+  rebuild_schedules(cursor)
+  refresh_snapshot(cursor)
+
+def rebuild_daily_stats(cursor):
+  cursor.execute('DELETE FROM daily_review_stats')
+  cursor.execute('''
+    INSERT INTO daily_review_stats (day, group_id, reviews, correct)
+    SELECT
+      date(wri.created_at),
+      ss.group_id,
+      COUNT(*),
+      SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END)
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    GROUP BY date(wri.created_at), ss.group_id
+  ''')
+
+  # A word is new on the day (and in the group) of its first review
+  cursor.execute('''
+    INSERT INTO daily_review_stats (day, group_id, new_words)
+    SELECT date(wri.created_at), ss.group_id, COUNT(*)
+    FROM (
+      SELECT MIN(wri.id) AS id
+      FROM word_review_items wri
+      JOIN study_sessions ss ON wri.study_session_id = ss.id
+      GROUP BY wri.word_id
+    ) first_reviews
+    JOIN word_review_items wri ON wri.id = first_reviews.id
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    WHERE true
+    GROUP BY date(wri.created_at), ss.group_id
+    ON CONFLICT(group_id, day) DO UPDATE SET new_words = excluded.new_words
+  ''')
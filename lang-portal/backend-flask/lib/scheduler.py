@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta, timezone
+
+# SM-2 spaced-repetition scheduling for the word_schedules table
+# (sql/setup/create_word_schedules.sql).
+#
+# Every word in a group has a due_at, ease factor and interval. Each answer
+# recorded in a study session moves the word's schedule in that session's
+# group: a correct answer pushes it out by a growing interval (1 day, 6 days,
+# then interval * ease), a wrong one brings it back within minutes and lowers
+# its ease. The next words to study are the earliest due, read straight off
+# the (group_id, due_at) index.
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+# Intervals grow geometrically with every correct answer in a row, so cap
+# them (at about ten years) before due_at leaves the datetime range
+MAX_INTERVAL_DAYS = 3650
+RELEARN_DELAY = timedelta(minutes=10)
+
+# Answers are right or wrong, so they map onto two points of SM-2's 0-5 scale
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # Same as SQLite's CURRENT_TIMESTAMP
+
+def utc_now():
+  return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+def next_schedule(schedule, correct, reviewed_at):
+  # schedule is (ease, interval_days, repetitions, lapses); returns the new
+  # schedule and the datetime the word is next due
+  ease, interval_days, repetitions, lapses = schedule
+  quality = CORRECT_QUALITY if correct else WRONG_QUALITY
+  ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+  if correct:
+    if repetitions == 0:
+      interval_days = FIRST_INTERVAL_DAYS
+    elif repetitions == 1:
+      interval_days = SECOND_INTERVAL_DAYS
+    else:
+      interval_days = min(MAX_INTERVAL_DAYS, round(interval_days * ease, 2))
+    repetitions += 1
+    due_at = reviewed_at + timedelta(days=interval_days)
+  else:
+    if repetitions > 0:
+      lapses += 1
+    repetitions = 0
+    interval_days = 0
+    due_at = reviewed_at + RELEARN_DELAY
+
+  return (ease, interval_days, repetitions, lapses), due_at
+
+def write_schedules(cursor, group_id, schedules):
+  # schedules maps word_id to (schedule, due_at, reviewed_at)
+  cursor.executemany('''
+    UPDATE word_schedules
+    SET ease = ?, interval_days = ?, repetitions = ?, lapses = ?, due_at = ?, last_reviewed_at = ?
+    WHERE group_id = ? AND word_id = ?
+  ''', [
+    schedule + (due_at.strftime(TIMESTAMP_FORMAT), reviewed_at.strftime(TIMESTAMP_FORMAT), group_id, word_id)
+    for word_id, (schedule, due_at, reviewed_at) in schedules.items()
+  ])
+
+def load_schedules(cursor, group_id, word_ids, reviewed_at=None):
+  # The schedules of the group's words, as write_schedules takes them, with
+  # no due_at yet. Words that aren't in the group have no schedule.
+  schedules = {}
+  word_ids = list(word_ids)
+  for start in range(0, len(word_ids), 500):
+    chunk = word_ids[start:start + 500]
+    cursor.execute(f'''
+      SELECT word_id, ease, interval_days, repetitions, lapses FROM word_schedules
+      WHERE group_id = ? AND word_id IN ({','.join('?' * len(chunk))})
+    ''', [group_id] + chunk)
+    for word_id, ease, interval_days, repetitions, lapses in cursor.fetchall():
+      schedules[word_id] = ((ease, interval_days, repetitions, lapses), None, reviewed_at)
+  return schedules
+
+def schedule_reviews(cursor, study_session_id, reviews, reviewed_at=None):
+  # Apply (word_id, correct) answers, in order, to the schedules in the
+  # session's group. Words that aren't in the group have no schedule to move.
+  cursor.execute('SELECT group_id FROM study_sessions WHERE id = ?', (study_session_id,))
+  session = cursor.fetchone()
+  if not session:
+    return
+  group_id = session[0]
+  reviewed_at = reviewed_at or utc_now()
+
+  schedules = load_schedules(cursor, group_id, {word_id for word_id, _ in reviews}, reviewed_at)
+  for word_id, correct in reviews:
+    if word_id in schedules:
+      schedule, due_at = next_schedule(schedules[word_id][0], correct, reviewed_at)
+      schedules[word_id] = (schedule, due_at, reviewed_at)
+
+  write_schedules(cursor, group_id, schedules)
+
+def reset_schedules(cursor):
+  cursor.execute('''
+    UPDATE word_schedules
+    SET ease = ?, interval_days = 0, repetitions = 0, lapses = 0,
+        due_at = CURRENT_TIMESTAMP, last_reviewed_at = NULL
+  ''', (DEFAULT_EASE,))
+
+# Apply the recorded reviews with first_id < id <= last_id, in order and
+# dated when they were made, on top of the current schedules. Replaying the
+# history in consecutive ranges gives the same schedules as one pass.
+def replay_reviews(cursor, first_id, last_id):
+  cursor.execute('''
+    SELECT ss.group_id, wri.word_id, wri.correct, wri.created_at
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    WHERE wri.id > ? AND wri.id <= ?
+    ORDER BY wri.id
+  ''', (first_id, last_id))
+  reviews = cursor.fetchall()
+
+  word_ids = {}
+  for group_id, word_id, _, _ in reviews:
+    word_ids.setdefault(group_id, set()).add(word_id)
+  by_group = {group_id: load_schedules(cursor, group_id, ids) for group_id, ids in word_ids.items()}
+
+  for group_id, word_id, correct, created_at in reviews:
+    schedules = by_group[group_id]
+    if word_id in schedules:
+      reviewed_at = datetime.fromisoformat(created_at)
+      schedule, due_at = next_schedule(schedules[word_id][0], correct, reviewed_at)
+      schedules[word_id] = (schedule, due_at, reviewed_at)
+
+  for group_id, schedules in by_group.items():
+    write_schedules(cursor, group_id, {
+      word_id: value for word_id, value in schedules.items() if value[1] is not None
+    })
+
+# Replay the whole review history to recompute every schedule
+def rebuild_schedules(cursor):
+  reset_schedules(cursor)
+  cursor.execute('SELECT MAX(id) FROM word_review_items')
+  replay_reviews(cursor, 0, cursor.fetchone()[0] or 0)
+
+def next_words(cursor, group_id, limit):
+  # The group's words in the order they should be studied: earliest due first
+  cursor.execute('''
+    SELECT
+      w.id,
+      w.spanish,
+      w.pronunciation,
+      w.english,
+      w.parts_of_speech,
+      s.due_at,
+      s.due_at <= CURRENT_TIMESTAMP AS is_due,
+      s.ease,
+      s.interval_days,
+      s.repetitions,
+      s.lapses,
+      s.last_reviewed_at,
+      COALESCE(wr.correct_count, 0) AS correct_count,
+      COALESCE(wr.wrong_count, 0) AS wrong_count
+    FROM word_schedules s
+    JOIN words w ON w.id = s.word_id
+    LEFT JOIN word_reviews wr ON w.id = wr.word_id
+    WHERE s.group_id = ?
+    ORDER BY s.due_at, s.word_id
+    LIMIT ?
+  ''', (group_id, limit))
+  return cursor.fetchall()
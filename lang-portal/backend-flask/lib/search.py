@@ -0,0 +1,92 @@
+import re
+import unicodedata
+
+# Word search over the words_fts and words_trigram FTS5 indexes
+# (sql/setup/create_words_search.sql).
+#
+# Queries are matched as prefixes against the accent-insensitive full-text
+# index first. Only when that finds nothing do we fall back to the trigram
+# index, ranking words by how many of the query's trigrams they share, which
+# tolerates typos such as "cancoin".
+
+SEARCH_INDEXES = ['words_fts', 'words_trigram']
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def fulltext_query(q):
+  # Every term must match, the last one as a prefix so results update while typing
+  terms = [f'"{term}"' for term in TERM_PATTERN.findall(q)]
+  if not terms:
+    return None
+  terms[-1] += '*'
+  return ' '.join(terms)
+
+def strip_accents(text):
+  return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+def trigram_query(q):
+  # Any shared trigram is a candidate match; bm25 ranks words sharing more first
+  trigrams = set()
+  for term in TERM_PATTERN.findall(q.lower()):
+    for variant in {term, strip_accents(term)}:
+      trigrams.update(variant[i:i + 3] for i in range(len(variant) - 2))
+  if not trigrams:
+    return None
+  return ' OR '.join(f'"{trigram}"' for trigram in sorted(trigrams))
+
+# Ranking is done over at most this many candidates per query. A one- or
+# two-letter prefix can match most of a large vocabulary, and scoring every
+# match would make typeahead cost O(vocabulary); capping keeps it bounded,
+# at the price of approximate ranking (and a capped total) for such queries.
+SEARCH_CANDIDATE_LIMIT = 5000
+
+def search_words(cursor, q, limit, offset):
+  # Returns (match_type, total, truncated, rows). truncated is True when the
+  # query matched more than SEARCH_CANDIDATE_LIMIT words.
+  for match_type, index, match in [
+    ('fulltext', 'words_fts', fulltext_query(q)),
+    ('fuzzy', 'words_trigram', trigram_query(q))
+  ]:
+    if not match:
+      continue
+
+    cursor.execute(f'''
+      SELECT COUNT(*) FROM (SELECT 1 FROM {index} WHERE {index} MATCH ? LIMIT ?)
+    ''', (match, SEARCH_CANDIDATE_LIMIT + 1))
+    total = cursor.fetchone()[0]
+    if not total:
+      continue
+
+    # bm25 weights favour matches on the Spanish word over its translation
+    cursor.execute(f'''
+      SELECT w.id, w.spanish, w.pronunciation, w.english,
+             COALESCE(r.correct_count, 0) AS correct_count,
+             COALESCE(r.wrong_count, 0) AS wrong_count
+      FROM (
+        SELECT rowid, bm25({index}, 10.0, 5.0) AS rank
+        FROM {index}
+        WHERE {index} MATCH ?
+        LIMIT ?
+      ) m
+      JOIN words w ON w.id = m.rowid
+      LEFT JOIN word_reviews r ON w.id = r.word_id
+      ORDER BY m.rank, w.id
+      LIMIT ? OFFSET ?
+    ''', (match, SEARCH_CANDIDATE_LIMIT, limit, offset))
+    truncated = total > SEARCH_CANDIDATE_LIMIT
+    return match_type, min(total, SEARCH_CANDIDATE_LIMIT), truncated, cursor.fetchall()
+
+  return None, 0, False, []
+
+# Used by the bulk importer: drop the sync triggers for a large load, then
+# rebuild both indexes from the words table in one pass afterwards
+def drop_search_triggers(cursor):
+  cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'words_fts_%'")
+  triggers = cursor.fetchall()
+  for name, _ in triggers:
+    cursor.execute(f'DROP TRIGGER "{name}"')
+  return [sql for _, sql in triggers]
+
+def rebuild_search_index(cursor):
+  for index in SEARCH_INDEXES:
+    cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+# Review activity per day or week, read from daily_review_stats (kept up to
+# date by lib/reviews.py) rather than from word_review_items, so a query costs
+# one row per group and day in the range however long the review history is.
+
+BUCKETS = ['day', 'week']
+MAX_BUCKETS = 1000
+
+def bucket_start(day, bucket):
+  return day if bucket == 'day' else day - timedelta(days=day.weekday())
+
+# Widen a date range to whole buckets, so the first and last weeks aren't partial
+def bucket_range(start, end, bucket):
+  if bucket == 'day':
+    return start, end
+  return bucket_start(start, bucket), bucket_start(end, bucket) + timedelta(days=6)
+
+def bucket_starts(start, end, bucket):
+  step = timedelta(days=1 if bucket == 'day' else 7)
+  current = bucket_start(start, bucket)
+  while current <= end:
+    yield current
+    current += step
+
+def review_timeseries(cursor, bucket, start, end, group_id=None):
+  # Returns one point per bucket from start to end (dates, inclusive),
+  # with zeros for buckets without reviews
+  group_filter = 'AND group_id = ?' if group_id is not None else ''
+  params = [start.isoformat(), end.isoformat()] + ([group_id] if group_id is not None else [])
+  # Summed per day in SQL and folded into weeks here: computing the week in
+  # SQL means a date() call per group and day, which costs more than the sums
+  cursor.execute(f'''
+    SELECT day, SUM(reviews), SUM(correct), SUM(new_words)
+    FROM daily_review_stats
+    WHERE day BETWEEN ? AND ? {group_filter}
+    GROUP BY day
+  ''', params)
+  totals = {}
+  for day, reviews, correct, new_words in cursor.fetchall():
+    key = bucket_start(date.fromisoformat(day), bucket)
+    bucket_totals = totals.setdefault(key, [0, 0, 0])
+    bucket_totals[0] += reviews
+    bucket_totals[1] += correct
+    bucket_totals[2] += new_words
+
+  series = []
+  for start_of_bucket in bucket_starts(start, end, bucket):
+    reviews, correct, new_words = totals.get(start_of_bucket, (0, 0, 0))
+    series.append({
+      'start': start_of_bucket.isoformat(),
+      'reviews': reviews,
+      'correct': correct,
+      'accuracy': correct * 1.0 / reviews if reviews else None,
+      'new_words': new_words
+    })
+  return series
@@ -1,31 +1,43 @@
-import sqlite3
+import argparse
 import os
 
-def run_migrations():
-    # Connect to the database
-    db_path = os.path.join(os.path.dirname(__file__), 'word_bank.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    
+from lib.db import DEFAULT_PRAGMAS
+from lib import migrations
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(__file__), 'instance', 'words.db')
+
+def run_migrations(database=DEFAULT_DATABASE, batch_size=migrations.DEFAULT_BATCH_SIZE, pause=migrations.DEFAULT_PAUSE):
     try:
-        # Get list of migration files
-        migrations_dir = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
-        migration_files = sorted([f for f in os.listdir(migrations_dir) if f.endswith('.sql')])
-        
-        # Run each migration
-        for migration_file in migration_files:
-            print(f"Running migration: {migration_file}")
-            with open(os.path.join(migrations_dir, migration_file)) as f:
-                migration_sql = f.read()
-                conn.executescript(migration_sql)
-                conn.commit()
-        
-        print("Migrations completed successfully")
+        applied = migrations.run_migrations(database, DEFAULT_PRAGMAS, batch_size=batch_size, pause=pause)
+        if applied:
+            print(f"Applied {len(applied)} migration(s)")
+        else:
+            print("Database is up to date")
     except Exception as e:
+        # The failed migration's transaction was rolled back and it stays pending
         print(f"Error running migrations: {str(e)}")
-        conn.rollback()
+        raise SystemExit(1)
+
+def show_status(database=DEFAULT_DATABASE):
+    connection = migrations.connect(database, DEFAULT_PRAGMAS)
+    try:
+        pending = {version for version, _, _ in migrations.pending_migrations(connection)}
+        for version, name, _ in migrations.discover_migrations():
+            print(f"{'pending' if version in pending else 'applied':>8}  {name}")
     finally:
-        conn.close()
+        connection.close()
 
 if __name__ == '__main__':
-    run_migrations()
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--batch-size', type=int, default=migrations.DEFAULT_BATCH_SIZE,
+                        help='Rows per backfill transaction')
+    parser.add_argument('--pause', type=float, default=migrations.DEFAULT_PAUSE,
+                        help='Seconds to wait between backfill batches')
+    parser.add_argument('--status', action='store_true', help='List migrations without applying them')
+    args = parser.parse_args()
+
+    if args.status:
+        show_status(args.database)
+    else:
+        run_migrations(args.database, args.batch_size, args.pause)
@@ -0,0 +1,10 @@
+from flask import jsonify
+from flask_cors import cross_origin
+
+def load(app):
+  # Hit/miss counters of the response cache (lib/response_cache.py) and the
+  # group word bundles (lib/group_bundles.py), for monitoring
+  @app.route('/api/cache/stats', methods=['GET'])
+  @cross_origin()
+  def get_cache_stats():
+    return jsonify(dict(app.response_cache.stats(), group_bundles=app.group_bundles.stats()))
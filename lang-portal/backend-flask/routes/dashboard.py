@@ -1,6 +1,9 @@
-from flask import jsonify
+from flask import jsonify, request
 from flask_cors import cross_origin
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+from lib.dashboard_snapshot import get_snapshot, read_snapshot
+from lib.timeseries import BUCKETS, MAX_BUCKETS, bucket_range, review_timeseries
 
 def load(app):
     @app.route('/dashboard/recent-session', methods=['GET'])
@@ -16,14 +19,17 @@ def load(app):
                     ss.group_id,
                     sa.name as activity_name,
                     ss.created_at,
-                    COUNT(CASE WHEN wri.correct = 1 THEN 1 END) as correct_count,
-                    COUNT(CASE WHEN wri.correct = 0 THEN 1 END) as wrong_count
-                FROM study_sessions ss
+                    COALESCE(SUM(sswr.correct_count), 0) as correct_count,
+                    COALESCE(SUM(sswr.wrong_count), 0) as wrong_count
+                FROM (
+                    SELECT id, group_id, study_activity_id, created_at
+                    FROM study_sessions
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                ) ss
                 JOIN study_activities sa ON ss.study_activity_id = sa.id
-                LEFT JOIN word_review_items wri ON ss.id = wri.study_session_id
+                LEFT JOIN study_session_word_reviews sswr ON ss.id = sswr.study_session_id
                 GROUP BY ss.id
-                ORDER BY ss.created_at DESC
-                LIMIT 1
             ''')
             
             session = cursor.fetchone()
@@ -47,93 +53,76 @@ def load(app):
     @cross_origin()
     def get_study_stats():
         try:
-            cursor = app.db.cursor()
-            
-            # Get total vocabulary count
-            cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
-            total_vocabulary = cursor.fetchone()["total_vocabulary"]
+            # Served from the dashboard_snapshot row, which review and session
+            # writes keep up to date. ?refresh=true recomputes it from scratch.
+            refresh = request.args.get('refresh') == 'true'
+            snapshot = None if refresh else read_snapshot(app.db.cursor())
+            if snapshot is None:
+                with app.db.write() as cursor:
+                    snapshot = get_snapshot(cursor, refresh=refresh)
+
+            success_rate = 0
+            if snapshot["total_reviews"]:
+                success_rate = snapshot["correct_reviews"] * 1.0 / snapshot["total_reviews"]
 
-            # Get total unique words studied
-            cursor.execute('''
-                SELECT COUNT(DISTINCT word_id) as total_words
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-            ''')
-            total_words = cursor.fetchone()["total_words"]
-            
-            # Get mastered words (words with >80% success rate and at least 5 attempts)
-            cursor.execute('''
-                WITH word_stats AS (
-                    SELECT 
-                        word_id,
-                        COUNT(*) as total_attempts,
-                        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                    FROM word_review_items wri
-                    JOIN study_sessions ss ON wri.study_session_id = ss.id
-                    GROUP BY word_id
-                    HAVING total_attempts >= 5
-                )
-                SELECT COUNT(*) as mastered_words
-                FROM word_stats
-                WHERE success_rate >= 0.8
-            ''')
-            mastered_words = cursor.fetchone()["mastered_words"]
-            
-            # Get overall success rate
-            cursor.execute('''
-                SELECT 
-                    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-            ''')
-            success_rate = cursor.fetchone()["success_rate"] or 0
-            
-            # Get total number of study sessions
-            cursor.execute('SELECT COUNT(*) as total_sessions FROM study_sessions')
-            total_sessions = cursor.fetchone()["total_sessions"]
-            
-            # Get number of groups with activity in the last 30 days
-            cursor.execute('''
-                SELECT COUNT(DISTINCT group_id) as active_groups
-                FROM study_sessions
-                WHERE created_at >= date('now', '-30 days')
-            ''')
-            active_groups = cursor.fetchone()["active_groups"]
-            
-            # Calculate current streak (consecutive days with at least one study session)
-            cursor.execute('''
-                WITH daily_sessions AS (
-                    SELECT 
-                        date(created_at) as study_date,
-                        COUNT(*) as session_count
-                    FROM study_sessions
-                    GROUP BY date(created_at)
-                ),
-                streak_calc AS (
-                    SELECT 
-                        study_date,
-                        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
-                    FROM daily_sessions
-                )
-                SELECT COUNT(*) as streak
-                FROM (
-                    SELECT study_date
-                    FROM streak_calc
-                    WHERE days_diff = 1 OR days_diff IS NULL
-                    ORDER BY study_date DESC
-                )
-            ''')
-            current_streak = cursor.fetchone()["streak"]
-            
             return jsonify({
-                "total_vocabulary": total_vocabulary,
-                "total_words_studied": total_words,
-                "mastered_words": mastered_words,
+                "total_vocabulary": snapshot["total_vocabulary"],
+                "total_words_studied": snapshot["total_words_studied"],
+                "mastered_words": snapshot["mastered_words"],
                 "success_rate": success_rate,
-                "total_sessions": total_sessions,
-                "active_groups": active_groups,
-                "current_streak": current_streak
+                "total_sessions": snapshot["total_sessions"],
+                "active_groups": snapshot["active_groups"],
+                "current_streak": snapshot["current_streak"],
+                "computed_at": snapshot["computed_at"]
             })
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
+
+    # GET /dashboard/timeseries?bucket=day|week&from=YYYY-MM-DD&to=YYYY-MM-DD&group_id=
+    # Reviews, accuracy and new words per day or week (weeks start on Monday).
+    # Defaults to the last 30 days, or the last 12 weeks, up to today (UTC).
+    @app.route('/dashboard/timeseries', methods=['GET'])
+    @cross_origin()
+    @app.response_cache.cached('daily_review_stats')
+    def get_review_timeseries():
+        try:
+            bucket = request.args.get('bucket', 'day')
+            if bucket not in BUCKETS:
+                return jsonify({"error": f"bucket must be one of: {', '.join(BUCKETS)}"}), 400
+
+            try:
+                end = request.args.get('to')
+                end = datetime.strptime(end, '%Y-%m-%d').date() if end else datetime.now(timezone.utc).date()
+                start = request.args.get('from')
+                if start:
+                    start = datetime.strptime(start, '%Y-%m-%d').date()
+                else:
+                    start = end - (timedelta(days=29) if bucket == 'day' else timedelta(weeks=11))
+            except ValueError:
+                return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+            if start > end:
+                return jsonify({"error": "from must not be after to"}), 400
+            start, end = bucket_range(start, end, bucket)
+            if (end - start).days // (1 if bucket == 'day' else 7) >= MAX_BUCKETS:
+                return jsonify({"error": f"At most {MAX_BUCKETS} buckets can be requested"}), 400
+
+            group_id = request.args.get('group_id')
+            if group_id is not None:
+                try:
+                    group_id = int(group_id)
+                except ValueError:
+                    return jsonify({"error": "group_id must be an integer"}), 400
+
+            series = review_timeseries(app.db.cursor(), bucket, start, end, group_id)
+
+            return jsonify({
+                "bucket": bucket,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "group_id": group_id,
+                "series": series
+            })
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
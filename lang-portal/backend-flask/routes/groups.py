@@ -2,9 +2,26 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.group_bundles import choose_encoding, etag
+from lib.pagination import decode_cursor, keyset_condition, next_cursor
+from lib.scheduler import next_words
+from routes.words import WORD_SORT_EXPRESSIONS
+
+def format_group_word(word):
+  return {
+    "id": word["id"],
+    "spanish": word["spanish"],
+    "pronunciation": word["pronunciation"],
+    "english": word["english"],
+    "parts_of_speech": word["parts_of_speech"],
+    "correct_count": word["correct_count"],
+    "wrong_count": word["wrong_count"]
+  }
+
 def load(app):
   @app.route('/groups', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('groups')
   def get_groups():
     try:
       cursor = app.db.cursor()
@@ -60,6 +77,7 @@ def load(app):
 
   @app.route('/groups/<int:id>', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('groups')
   def get_group(id):
     try:
       cursor = app.db.cursor()
@@ -85,6 +103,7 @@ def load(app):
 
   @app.route('/groups/<int:id>/words', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('groups', 'words', 'word_groups', 'word_reviews')
   def get_group_words(id):
     try:
       cursor = app.db.cursor()
@@ -106,11 +125,46 @@ def load(app):
         order = 'asc'
 
       # First, check if the group exists
-      cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
+      cursor.execute('SELECT name, words_count FROM groups WHERE id = ?', (id,))
       group = cursor.fetchone()
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
+      # Cursor mode: ?cursor= (empty for the first page) switches to keyset pagination
+      if 'cursor' in request.args:
+        sort_expr = WORD_SORT_EXPRESSIONS[sort_by]
+        keyset_sql, params = '', ()
+        if request.args['cursor']:
+          try:
+            last_value, last_id = decode_cursor(request.args['cursor'], sort_by, order)
+          except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+          keyset_sql, params = keyset_condition(sort_expr, 'w.id', order, last_value, last_id)
+          keyset_sql = 'AND ' + keyset_sql
+
+        cursor.execute(f'''
+          SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts_of_speech,
+                 COALESCE(r.correct_count, 0) as correct_count,
+                 COALESCE(r.wrong_count, 0) as wrong_count,
+                 {sort_expr} AS sort_value
+          FROM words w
+          JOIN word_groups wg ON w.id = wg.word_id
+          LEFT JOIN word_reviews r ON w.id = r.word_id
+          WHERE wg.group_id = ? {keyset_sql}
+          ORDER BY {sort_expr} {order}, w.id {order}
+          LIMIT ?
+        ''', (id,) + params + (words_per_page + 1,))
+        words = cursor.fetchall()
+
+        response = {
+          'words': [format_group_word(word) for word in words[:words_per_page]],
+          'next_cursor': next_cursor(words, words_per_page, sort_by, order)
+        }
+        if request.args.get('include_total') == 'true':
+          # words_count is kept exact by the word_groups triggers
+          response['total_words'] = group['words_count']
+        return jsonify(response)
+
       # Query to fetch words with pagination and sorting
       cursor.execute(f'''
         SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts_of_speech,
@@ -127,29 +181,11 @@ def load(app):
       words = cursor.fetchall()
 
       # Get total words count for pagination
-      cursor.execute('''
-        SELECT COUNT(*) 
-        FROM word_groups 
-        WHERE group_id = ?
-      ''', (id,))
-      total_words = cursor.fetchone()[0]
+      total_words = group['words_count']
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "spanish": word["spanish"],
-          "pronunciation": word["pronunciation"],
-          "english": word["english"],
-          "parts_of_speech": word["parts_of_speech"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
       return jsonify({
-        'words': words_data,
+        'words': [format_group_word(word) for word in words],
         'total_pages': total_pages,
         'current_page': page
       })
@@ -168,7 +204,7 @@ def load(app):
           session_id = request.args.get('session_id')
 
           # First, check if the group exists
-          cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
+          cursor.execute('SELECT id, name, membership_version FROM groups WHERE id = ?', (id,))
           group = cursor.fetchone()
           if not group:
               return jsonify({"error": "Group not found"}), 404
@@ -182,63 +218,68 @@ def load(app):
               if not cursor.fetchone():
                   return jsonify({"error": "Invalid session ID for this group"}), 404
 
-          # Get all words for this group with their review history
-          cursor.execute('''
-              SELECT 
-                  w.id,
-                  w.spanish,
-                  w.pronunciation,
-                  w.english,
-                  w.parts_of_speech,
-                  COALESCE(wr.correct_count, 0) as total_correct_count,
-                  COALESCE(wr.wrong_count, 0) as total_wrong_count,
-                  COALESCE(ss_reviews.correct_count, 0) as session_correct_count,
-                  COALESCE(ss_reviews.wrong_count, 0) as session_wrong_count
-              FROM words w
-              JOIN word_groups wg ON w.id = wg.word_id
-              LEFT JOIN word_reviews wr ON w.id = wr.word_id
-              LEFT JOIN (
-                  SELECT 
-                      word_id,
-                      SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) as correct_count,
-                      SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END) as wrong_count
-                  FROM word_review_items
-                  WHERE study_session_id = ?
-                  GROUP BY word_id
-              ) ss_reviews ON w.id = ss_reviews.word_id
-              WHERE wg.group_id = ?
-              ORDER BY w.spanish
-          ''', (session_id if session_id else None, id))
-          
-          words = cursor.fetchall()
-
-          return jsonify({
-              'group_id': id,
-              'group_name': group['name'],
-              'session_id': session_id,
-              'words': [{
-                  'id': word['id'],
-                  'spanish': word['spanish'],
-                  'pronunciation': word['pronunciation'],
-                  'english': word['english'],
-                  'parts_of_speech': word['parts_of_speech'],
-                  'stats': {
-                      'total': {
-                          'correct': word['total_correct_count'],
-                          'wrong': word['total_wrong_count']
-                      },
-                      'session': {
-                          'correct': word['session_correct_count'],
-                          'wrong': word['session_wrong_count']
-                      }
-                  }
-              } for word in words]
-          })
+          # The group's words come pre-serialised from the bundle cache, with
+          # their review stats spliced in (see lib/group_bundles.py)
+          body, hit = app.group_bundles.payload(cursor, group, session_id)
+          encoding = choose_encoding(request.accept_encodings)
+          body_etag = etag(body, encoding)
+          if request.if_none_match.contains(body_etag):
+              response = app.response_class(status=304)
+          else:
+              response = app.response_class(
+                  app.group_bundles.compressed(body, encoding, body_etag), mimetype='application/json'
+              )
+              if encoding:
+                  response.headers['Content-Encoding'] = encoding
+          response.set_etag(body_etag)
+          response.headers['Vary'] = 'Accept-Encoding'
+          response.headers['Cache-Control'] = 'no-cache'
+          response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+          return response
       except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+  # The next words to study in this group, earliest due first (see lib/scheduler.py)
+  @app.route('/groups/<int:id>/words/next', methods=['GET'])
+  @cross_origin()
+  def get_group_words_next(id):
+    try:
+      cursor = app.db.cursor()
+
+      try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+      except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+      cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
+      group = cursor.fetchone()
+      if not group:
+        return jsonify({"error": "Group not found"}), 404
+
+      words = next_words(cursor, id, limit)
+
+      return jsonify({
+        'group_id': id,
+        'group_name': group['name'],
+        'words': [{
+          **format_group_word(word),
+          'schedule': {
+            'due_at': word['due_at'],
+            'is_due': bool(word['is_due']),
+            'ease': word['ease'],
+            'interval_days': word['interval_days'],
+            'repetitions': word['repetitions'],
+            'lapses': word['lapses'],
+            'last_reviewed_at': word['last_reviewed_at']
+          }
+        } for word in words]
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/groups/<int:id>/study_sessions', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('groups', 'study_sessions', 'study_activities', 'study_session_summaries')
   def get_group_study_sessions(id):
     try:
       cursor = app.db.cursor()
@@ -254,15 +295,17 @@ def load(app):
 
       # Map frontend sort keys to database columns
       sort_mapping = {
-        'startTime': 'created_at',
-        'endTime': 'last_activity_time',
+        'startTime': 's.created_at',
+        'endTime': 'end_time',
         'activityName': 'a.name',
         'groupName': 'g.name',
         'reviewItemsCount': 'review_count'
       }
 
       # Use mapped sort column or default to created_at
-      sort_column = sort_mapping.get(sort_by, 'created_at')
+      sort_column = sort_mapping.get(sort_by, 's.created_at')
+      if order not in ['asc', 'desc']:
+        order = 'desc'
 
       # Get total count for pagination
       cursor.execute('''
@@ -273,52 +316,38 @@ def load(app):
       total_sessions = cursor.fetchone()[0]
       total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
+      # Review counts and last activity come from the per-session summary, so
+      # this is one indexed scan of the group's sessions whatever the history size.
+      # Sessions without reviews end 30 minutes after they started.
       cursor.execute(f'''
         SELECT 
           s.id,
           s.group_id,
           s.study_activity_id,
           s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
+          COALESCE(summary.last_activity_at, datetime(s.created_at, '+30 minutes')) as end_time,
           a.name as activity_name,
           g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
+          COALESCE(summary.review_count, 0) as review_count
         FROM study_sessions s
         JOIN study_activities a ON s.study_activity_id = a.id
         JOIN groups g ON s.group_id = g.id
+        LEFT JOIN study_session_summaries summary ON summary.study_session_id = s.id
         WHERE s.group_id = ?
-        ORDER BY {sort_column} {order}
+        ORDER BY {sort_column} {order}, s.id {order}
         LIMIT ? OFFSET ?
       ''', (id, sessions_per_page, offset))
       
-      sessions = cursor.fetchall()
-      sessions_data = []
-      
-      for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
-        sessions_data.append({
-          "id": session["id"],
-          "group_id": session["group_id"],
-          "group_name": session["group_name"],
-          "study_activity_id": session["study_activity_id"],
-          "activity_name": session["activity_name"],
-          "start_time": session["start_time"],
-          "end_time": end_time,
-          "review_items_count": session["review_count"]
-        })
+      sessions_data = [{
+        "id": session["id"],
+        "group_id": session["group_id"],
+        "group_name": session["group_name"],
+        "study_activity_id": session["study_activity_id"],
+        "activity_name": session["activity_name"],
+        "start_time": session["start_time"],
+        "end_time": session["end_time"],
+        "review_items_count": session["review_count"]
+      } for session in cursor.fetchall()]
 
       return jsonify({
         'study_sessions': sessions_data,
@@ -0,0 +1,40 @@
+from flask import Response, jsonify, request
+from flask_cors import cross_origin
+from datetime import datetime, timezone
+
+from lib.history import export_records, gzip_chunks, ndjson_chunks
+
+EXPORT_FORMATS = ['ndjson', 'gzip']
+
+def load(app):
+  # Download the study history as NDJSON (see lib/history.py), streamed so the
+  # export takes constant memory however long the history is:
+  #   GET /api/export               application/x-ndjson
+  #   GET /api/export?format=gzip   the same, gzip-compressed
+  @app.route('/api/export', methods=['GET'])
+  @cross_origin()
+  def export_history():
+    try:
+      export_format = request.args.get('format', 'ndjson')
+      if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+      filename = f"study-history-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.ndjson"
+      # The body is generated after the request's app context is torn down,
+      # which releases its connection, so the export checks out a connection
+      # of its own and releases it once the response is closed
+      connection = app.db.acquire()
+      chunks = ndjson_chunks(export_records(connection.cursor()))
+      if export_format == 'gzip':
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+
+      response = Response(
+        chunks,
+        mimetype='application/gzip' if export_format == 'gzip' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+      )
+      response.call_on_close(lambda: app.db.release(connection))
+      return response
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
@@ -5,6 +5,7 @@ import math
 def load(app):
     @app.route('/api/study-activities', methods=['GET'])
     @cross_origin()
+    @app.response_cache.cached('study_activities')
     def get_study_activities():
         cursor = app.db.cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities')
@@ -19,6 +20,7 @@ def load(app):
 
     @app.route('/api/study-activities/<int:id>', methods=['GET'])
     @cross_origin()
+    @app.response_cache.cached('study_activities')
     def get_study_activity(id):
         cursor = app.db.cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
@@ -36,6 +38,7 @@ def load(app):
 
     @app.route('/api/study-activities/<int:id>/sessions', methods=['GET'])
     @cross_origin()
+    @app.response_cache.cached('study_activities', 'study_sessions', 'groups', 'study_session_summaries')
     def get_study_activity_sessions(id):
         cursor = app.db.cursor()
         
@@ -58,7 +61,9 @@ def load(app):
         ''', (id,))
         total_count = cursor.fetchone()['count']
 
-        # Get paginated sessions
+        # Get paginated sessions. Review counts and last activity come from the
+        # per-session summary instead of grouping every review item; sessions
+        # without reviews end 30 minutes after they started.
         cursor.execute('''
             SELECT 
                 ss.id,
@@ -66,15 +71,15 @@ def load(app):
                 g.name as group_name,
                 sa.name as activity_name,
                 ss.created_at,
+                COALESCE(summary.last_activity_at, datetime(ss.created_at, '+30 minutes')) as end_time,
                 ss.study_activity_id as activity_id,
-                COUNT(wri.id) as review_items_count
+                COALESCE(summary.review_count, 0) as review_items_count
             FROM study_sessions ss
             JOIN groups g ON g.id = ss.group_id
             JOIN study_activities sa ON sa.id = ss.study_activity_id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
+            LEFT JOIN study_session_summaries summary ON summary.study_session_id = ss.id
             WHERE ss.study_activity_id = ?
-            GROUP BY ss.id, ss.group_id, g.name, sa.name, ss.created_at, ss.study_activity_id
-            ORDER BY ss.created_at DESC
+            ORDER BY ss.created_at DESC, ss.id DESC
             LIMIT ? OFFSET ?
         ''', (id, per_page, offset))
         sessions = cursor.fetchall()
@@ -87,7 +92,7 @@ def load(app):
                 'activity_id': session['activity_id'],
                 'activity_name': session['activity_name'],
                 'start_time': session['created_at'],
-                'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
+                'end_time': session['end_time'],
                 'review_items_count': session['review_items_count']
             } for session in sessions],
             'total': total_count,
@@ -1,13 +1,78 @@
 from flask import request, jsonify, g
 from flask_cors import cross_origin
 from datetime import datetime
+import json
 import math
 
+from lib.pagination import decode_cursor, keyset_condition, next_cursor
+from lib.reviews import record_review, record_reviews, clear_rollups
+from lib.dashboard_snapshot import apply_session_created, refresh_snapshot
+from lib.scheduler import reset_schedules
+
+# Number of review items validated and inserted per executemany in a batch upload
+REVIEW_BATCH_CHUNK_SIZE = 1000
+
+# Tables written when reviews are recorded, for invalidating cached responses
+REVIEW_TABLES = (
+  'word_review_items', 'word_reviews', 'study_session_word_reviews', 'study_session_summaries', 'daily_review_stats'
+)
+
+# Placeholder yielded for NDJSON lines that aren't valid JSON
+INVALID_JSON_LINE = object()
+
+def read_review_batch(req):
+  # Yield the raw review items of a batch upload: a JSON array (or an object
+  # with a `reviews` array), or NDJSON with one review per line. NDJSON is read
+  # line by line from the request stream, so large uploads aren't buffered.
+  if req.mimetype in ('application/x-ndjson', 'application/jsonl'):
+    for line in req.stream:
+      line = line.strip()
+      if not line:
+        continue
+      try:
+        yield json.loads(line)
+      except ValueError:
+        yield INVALID_JSON_LINE
+  else:
+    data = req.get_json(silent=True)
+    if isinstance(data, dict):
+      data = data.get('reviews')
+    if not isinstance(data, list):
+      raise ValueError('Expected a JSON array of reviews or an NDJSON body')
+    yield from data
+
+def parse_review_item(item):
+  # Returns (word_id, correct) or raises ValueError describing the problem
+  if item is INVALID_JSON_LINE:
+    raise ValueError('Invalid JSON')
+  if not isinstance(item, dict):
+    raise ValueError('Review must be a JSON object')
+  word_id = item.get('word_id')
+  correct = item.get('correct', item.get('is_correct'))
+  if not isinstance(word_id, int) or isinstance(word_id, bool):
+    raise ValueError('word_id must be an integer')
+  if not isinstance(correct, bool):
+    raise ValueError('correct must be a boolean')
+  return word_id, correct
+
+def format_session(session):
+  return {
+    'id': session['id'],
+    'group_id': session['group_id'],
+    'group_name': session['group_name'],
+    'activity_id': session['activity_id'],
+    'activity_name': session['activity_name'],
+    'start_time': session['created_at'],
+    'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
+    'review_items_count': session['review_items_count']
+  }
+
 def load(app):
 
 
   @app.route('/api/study-sessions', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('study_sessions', 'groups', 'study_activities', 'study_session_summaries')
   def get_study_sessions():
     try:
       cursor = app.db.cursor()
@@ -17,6 +82,41 @@ def load(app):
       per_page = request.args.get('per_page', 10, type=int)
       offset = (page - 1) * per_page
 
+      # Cursor mode: ?cursor= (empty for the first page) switches to keyset
+      # pagination over (created_at, id), newest first
+      if 'cursor' in request.args:
+        keyset_sql, params = '', ()
+        if request.args['cursor']:
+          try:
+            last_value, last_id = decode_cursor(request.args['cursor'], 'created_at', 'desc')
+          except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+          keyset_sql, params = keyset_condition('ss.created_at', 'ss.id', 'desc', last_value, last_id)
+          keyset_sql = 'WHERE ' + keyset_sql
+
+        # Review counts come from the per-session summary, so a page costs
+        # the same however many reviews its sessions have
+        cursor.execute(f'''
+          SELECT
+            ss.id, ss.group_id, g.name as group_name, sa.id as activity_id, sa.name as activity_name,
+            ss.created_at, COALESCE(summary.review_count, 0) as review_items_count
+          FROM study_sessions ss JOIN groups g ON g.id = ss.group_id JOIN study_activities sa ON sa.id
+          = ss.study_activity_id LEFT JOIN study_session_summaries summary ON summary.study_session_id
+          = ss.id
+          {keyset_sql}
+          ORDER BY ss.created_at DESC, ss.id DESC LIMIT ?
+        ''', params + (per_page + 1,))
+        sessions = cursor.fetchall()
+
+        response = {
+          'items': [format_session(session) for session in sessions[:per_page]],
+          'next_cursor': next_cursor(sessions, per_page, 'created_at', 'desc', sort_key='created_at'),
+          'per_page': per_page
+        }
+        if request.args.get('include_total') == 'true':
+          response['total'] = app.db.cached_count(('study_sessions',), 'SELECT COUNT(*) FROM study_sessions')
+        return jsonify(response)
+
       # Get total count
       cursor.execute('''
         SELECT COUNT(*) as count FROM study_sessions ss JOIN groups g ON g.id = ss.group_id JOIN
@@ -28,24 +128,15 @@ def load(app):
       cursor.execute('''
         SELECT 
           ss.id, ss.group_id, g.name as group_name, sa.id as activity_id, sa.name as activity_name,
-          ss.created_at, COUNT(wri.id) as review_items_count
+          ss.created_at, COALESCE(summary.review_count, 0) as review_items_count
         FROM study_sessions ss JOIN groups g ON g.id = ss.group_id JOIN study_activities sa ON sa.id
-        = ss.study_activity_id LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id GROUP
-        BY ss.id ORDER BY ss.created_at DESC LIMIT ? OFFSET ?
+        = ss.study_activity_id LEFT JOIN study_session_summaries summary ON summary.study_session_id
+        = ss.id ORDER BY ss.created_at DESC LIMIT ? OFFSET ?
       ''', (per_page, offset))
       sessions = cursor.fetchall()
 
       return jsonify({
-        'items': [{
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
-        } for session in sessions],
+        'items': [format_session(session) for session in sessions],
         'total': total_count,
         'page': page,
         'per_page': per_page,
@@ -56,6 +147,9 @@ def load(app):
 
   @app.route('/api/study-sessions/<id>', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached(
+    'study_sessions', 'groups', 'study_activities', 'words', 'study_session_word_reviews', 'study_session_summaries'
+  )
   def get_study_session(id):
     try:
       cursor = app.db.cursor()
@@ -64,10 +158,10 @@ def load(app):
       cursor.execute('''
         SELECT 
           ss.id, ss.group_id, g.name as group_name, sa.id as activity_id, sa.name as activity_name,
-          ss.created_at, COUNT(wri.id) as review_items_count
+          ss.created_at, COALESCE(summary.review_count, 0) as review_items_count
         FROM study_sessions ss JOIN groups g ON g.id = ss.group_id JOIN study_activities sa ON sa.id
-        = ss.study_activity_id LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id WHERE
-        ss.id = ? GROUP BY ss.id
+        = ss.study_activity_id LEFT JOIN study_session_summaries summary ON summary.study_session_id
+        = ss.id WHERE ss.id = ?
       ''', (id,))
       
       session = cursor.fetchone()
@@ -82,19 +176,17 @@ def load(app):
       # Get the words reviewed in this session with their review status
       cursor.execute('''
         SELECT 
-          w.id, w.spanish, w.pronunciation, w.english, w.parts_of_speech, COALESCE(SUM(CASE WHEN
-          wri.correct = 1 THEN 1 ELSE 0 END), 0) as session_correct_count, COALESCE(SUM(CASE WHEN
-          wri.correct = 0 THEN 1 ELSE 0 END), 0) as session_wrong_count
-        FROM words w JOIN word_review_items wri ON wri.word_id = w.id WHERE wri.study_session_id = ?
-        GROUP BY w.id ORDER BY w.spanish LIMIT ? OFFSET ?
+          w.id, w.spanish, w.pronunciation, w.english, w.parts_of_speech,
+          sswr.correct_count as session_correct_count, sswr.wrong_count as session_wrong_count
+        FROM study_session_word_reviews sswr JOIN words w ON w.id = sswr.word_id
+        WHERE sswr.study_session_id = ? ORDER BY w.spanish LIMIT ? OFFSET ?
       ''', (id, per_page, offset))
       
       words = cursor.fetchall()
 
       # Get total count of words
       cursor.execute('''
-        SELECT COUNT(DISTINCT w.id) as count FROM words w JOIN word_review_items wri ON wri.word_id
-        = w.id WHERE wri.study_session_id = ?
+        SELECT COUNT(*) as count FROM study_session_word_reviews WHERE study_session_id = ?
       ''', (id,))
       
       total_count = cursor.fetchone()['count']
@@ -127,21 +219,127 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
-  # todo POST /study_sessions/:id/review
-# what the language learning app reports back to submit whether an answer was right or wrong.
+  # POST /api/study-sessions/:id/review
+  # what the language learning app reports back to submit whether an answer was right or wrong.
+  @app.route('/api/study-sessions/<int:id>/review', methods=['POST'])
+  @cross_origin()
+  def create_word_review(id):
+    try:
+      data = request.get_json(silent=True) or {}
+
+      # Accept both `correct` and the frontend's `is_correct`
+      correct = data.get('correct', data.get('is_correct'))
+      if 'word_id' not in data or correct is None:
+        return jsonify({"error": "Missing required fields: word_id and correct"}), 400
+      if not isinstance(correct, bool):
+        return jsonify({"error": "correct must be a boolean"}), 400
+
+      word_id = data['word_id']
+
+      # Record the review and update the rollups in one transaction
+      with app.db.write() as cursor:
+        # Verify that the study session exists
+        cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
+        if not cursor.fetchone():
+          return jsonify({"error": "Study session not found"}), 404
+
+        # Verify that the word exists
+        cursor.execute('SELECT id FROM words WHERE id = ?', (word_id,))
+        if not cursor.fetchone():
+          return jsonify({"error": "Word not found"}), 404
+
+        review_id = record_review(cursor, id, word_id, correct)
+
+      app.response_cache.invalidate(*REVIEW_TABLES)
+
+      return jsonify({
+        "id": review_id,
+        "study_session_id": id,
+        "word_id": word_id,
+        "correct": correct
+      }), 201
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # POST /api/study-sessions/:id/reviews:batch
+  # Records many answers at once; invalid items are reported and skipped.
+  @app.route('/api/study-sessions/<int:id>/reviews:batch', methods=['POST'])
+  @cross_origin()
+  def create_word_reviews_batch(id):
+    try:
+      cursor = app.db.cursor()
+
+      # Verify that the study session exists
+      cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Study session not found"}), 404
+
+      # Parse and validate the whole upload before taking the write lock, so
+      # a slow client never holds up other writers
+      statuses = []
+      chunks = [[]]
+      for index, item in enumerate(read_review_batch(request)):
+        try:
+          word_id, correct = parse_review_item(item)
+        except ValueError as e:
+          statuses.append({"index": index, "status": "error", "error": str(e)})
+          continue
+        if len(chunks[-1]) >= REVIEW_BATCH_CHUNK_SIZE:
+          chunks.append([])
+        chunks[-1].append((index, word_id, correct))
+
+      valid_chunks = []
+      for chunk in chunks:
+        existing = app.db.existing_word_ids([word_id for _, word_id, _ in chunk])
+        reviews = []
+        for index, word_id, correct in chunk:
+          if word_id in existing:
+            reviews.append((word_id, correct))
+            statuses.append({"index": index, "status": "recorded"})
+          else:
+            statuses.append({"index": index, "status": "error", "error": "Word not found"})
+        if reviews:
+          valid_chunks.append(reviews)
+
+      # Every chunk is written inside the same transaction
+      with app.db.write() as cursor:
+        for reviews in valid_chunks:
+          record_reviews(cursor, id, reviews)
+
+      if valid_chunks:
+        app.response_cache.invalidate(*REVIEW_TABLES)
+
+      recorded = sum(len(reviews) for reviews in valid_chunks)
+      statuses.sort(key=lambda status: status["index"])
+      return jsonify({
+        "study_session_id": id,
+        "recorded": recorded,
+        "failed": len(statuses) - recorded,
+        "items": statuses
+      })
+    except ValueError as e:
+      return jsonify({"error": str(e)}), 400
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/api/study-sessions/reset', methods=['POST'])
   @cross_origin()
   def reset_study_sessions():
     try:
-      cursor = app.db.cursor()
-      
-      # First delete all word review items since they have foreign key constraints
-      cursor.execute('DELETE FROM word_review_items')
-      
-      # Then delete all study sessions
-      cursor.execute('DELETE FROM study_sessions')
+      with app.db.write() as cursor:
+        # First delete all word review items since they have foreign key constraints
+        cursor.execute('DELETE FROM word_review_items')
+        
+        # Then delete all study sessions
+        cursor.execute('DELETE FROM study_sessions')
+
+        # The review rollups are derived from the history, so clear them too
+        clear_rollups(cursor)
+        reset_schedules(cursor)
+        refresh_snapshot(cursor)
       
-      app.db.commit()
+      app.db.invalidate_counts('study_sessions')
+      app.response_cache.invalidate('study_sessions', *REVIEW_TABLES)
       
       return jsonify({"message": "Study history cleared successfully"}), 200
     except Exception as e:
@@ -161,28 +359,28 @@ def load(app):
       group_id = data['group_id']
       study_activity_id = data['study_activity_id']
       
-      cursor = app.db.cursor()
-      
-      # Verify that group exists
-      cursor.execute('SELECT id FROM groups WHERE id = ?', (group_id,))
-      if not cursor.fetchone():
-        return jsonify({"error": "Group not found"}), 404
-            
-      # Verify that study activity exists
-      cursor.execute('SELECT id FROM study_activities WHERE id = ?', (study_activity_id,))
-      if not cursor.fetchone():
-        return jsonify({"error": "Study activity not found"}), 404
-            
-      # Create new study session
-      cursor.execute('''
-        INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, ?)
-      ''', (group_id, study_activity_id))
-      
-      # Get the ID of the newly created session
-      session_id = cursor.lastrowid
+      with app.db.write() as cursor:
+        # Verify that group exists
+        cursor.execute('SELECT id FROM groups WHERE id = ?', (group_id,))
+        if not cursor.fetchone():
+          return jsonify({"error": "Group not found"}), 404
+              
+        # Verify that study activity exists
+        cursor.execute('SELECT id FROM study_activities WHERE id = ?', (study_activity_id,))
+        if not cursor.fetchone():
+          return jsonify({"error": "Study activity not found"}), 404
+              
+        # Create new study session
+        cursor.execute('''
+          INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, ?)
+        ''', (group_id, study_activity_id))
+        
+        # Get the ID of the newly created session
+        session_id = cursor.lastrowid
+        apply_session_created(cursor, session_id, group_id)
       
-      # Commit the transaction
-      app.db.commit()
+      app.db.invalidate_counts('study_sessions')
+      app.response_cache.invalidate('study_sessions')
       
       return jsonify({"session_id": session_id}), 201
       
@@ -2,10 +2,34 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.pagination import decode_cursor, keyset_condition, next_cursor
+from lib.search import search_words
+
+# SQL expression used to sort and seek on each sortable column in cursor mode.
+# Shared with routes.groups so group word listings page the same way.
+WORD_SORT_EXPRESSIONS = {
+  'spanish': 'w.spanish',
+  'pronunciation': "COALESCE(w.pronunciation, '')",
+  'english': 'w.english',
+  'correct_count': 'COALESCE(r.correct_count, 0)',
+  'wrong_count': 'COALESCE(r.wrong_count, 0)'
+}
+
+def format_word(word):
+  return {
+    "id": word["id"],
+    "spanish": word["spanish"],
+    "pronunciation": word["pronunciation"],
+    "english": word["english"],
+    "correct_count": word["correct_count"],
+    "wrong_count": word["wrong_count"]
+  }
+
 def load(app):
   # Endpoint: GET /words with pagination (50 words per page)
   @app.route('/words', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('words', 'word_reviews')
   def get_words():
     try:
       cursor = app.db.cursor()
@@ -28,6 +52,40 @@ def load(app):
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      # Cursor mode: passing ?cursor= (empty for the first page) switches to
+      # keyset pagination, which costs the same at any depth
+      if 'cursor' in request.args:
+        sort_expr = WORD_SORT_EXPRESSIONS[sort_by]
+        keyset_sql, params = '', ()
+        if request.args['cursor']:
+          try:
+            last_value, last_id = decode_cursor(request.args['cursor'], sort_by, order)
+          except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+          keyset_sql, params = keyset_condition(sort_expr, 'w.id', order, last_value, last_id)
+          keyset_sql = 'WHERE ' + keyset_sql
+
+        cursor.execute(f'''
+          SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts_of_speech,
+              COALESCE(r.correct_count, 0) AS correct_count,
+              COALESCE(r.wrong_count, 0) AS wrong_count,
+              {sort_expr} AS sort_value
+          FROM words w
+          LEFT JOIN word_reviews r ON w.id = r.word_id
+          {keyset_sql}
+          ORDER BY {sort_expr} {order}, w.id {order}
+          LIMIT ?
+        ''', params + (words_per_page + 1,))
+        words = cursor.fetchall()
+
+        response = {
+          "words": [format_word(word) for word in words[:words_per_page]],
+          "next_cursor": next_cursor(words, words_per_page, sort_by, order)
+        }
+        if request.args.get('include_total') == 'true':
+          response["total_words"] = app.db.cached_count(('words',), 'SELECT COUNT(*) FROM words')
+        return jsonify(response)
+
       # Query to fetch words with sorting
       cursor.execute(f'''
         SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts_of_speech,
@@ -46,20 +104,8 @@ def load(app):
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "spanish": word["spanish"],
-          "pronunciation": word["pronunciation"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
       return jsonify({
-        "words": words_data,
+        "words": [format_word(word) for word in words],
         "total_pages": total_pages,
         "current_page": page,
         "total_words": total_words
@@ -67,12 +113,40 @@ def load(app):
 
     except Exception as e:
       return jsonify({"error": str(e)}), 500
-    finally:
-      app.db.close()
+
+  # Endpoint: GET /words/search?q= for ranked, accent-insensitive prefix search
+  # with a typo-tolerant fallback
+  @app.route('/words/search', methods=['GET'])
+  @cross_origin()
+  @app.response_cache.cached('words', 'word_reviews')
+  def search():
+    try:
+      q = request.args.get('q', '').strip()
+      if not q:
+        return jsonify({"error": "Missing required parameter: q"}), 400
+
+      page = max(1, request.args.get('page', 1, type=int))
+      per_page = min(max(1, request.args.get('per_page', 20, type=int)), 100)
+      offset = (page - 1) * per_page
+
+      match_type, total, truncated, words = search_words(app.db.cursor(), q, per_page, offset)
+
+      return jsonify({
+        "words": [format_word(word) for word in words],
+        "match": match_type,
+        "total": total,
+        "total_truncated": truncated,  # More words matched than are ranked
+        "page": page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
 
   # Endpoint: GET /words/:id to get a single word with its details
   @app.route('/words/<int:word_id>', methods=['GET'])
   @cross_origin()
+  @app.response_cache.cached('words', 'word_reviews', 'groups', 'word_groups')
   def get_word(word_id):
     try:
       cursor = app.db.cursor()
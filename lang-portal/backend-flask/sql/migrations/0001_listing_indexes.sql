@@ -0,0 +1,12 @@
+-- Indexes for the cursor-paginated listings and the session listings.
+-- SQLite builds an index in one pass that holds the write lock, so on a large
+-- database the app's writes wait (up to busy_timeout) while this runs.
+CREATE INDEX IF NOT EXISTS idx_words_spanish ON words(spanish);
+CREATE INDEX IF NOT EXISTS idx_words_english ON words(english);
+CREATE INDEX IF NOT EXISTS idx_words_pronunciation ON words(COALESCE(pronunciation, ''));
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id ON word_groups(group_id, word_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions(created_at);
+DROP INDEX IF EXISTS idx_word_review_items_study_session_id;
+CREATE INDEX IF NOT EXISTS idx_word_review_items_study_session_id_created_at ON word_review_items(study_session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_created_at ON study_sessions(group_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_study_activity_id_created_at ON study_sessions(study_activity_id, created_at);
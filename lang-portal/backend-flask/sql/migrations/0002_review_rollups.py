@@ -0,0 +1,113 @@
+# Add the review rollups (word_reviews keyed by word, study_session_word_reviews
+# and study_session_summaries) and the dashboard snapshot, and backfill them
+# from word_review_items in batches.
+#
+# Run this before starting the version of the app that maintains the
+# rollups: the backfill follows word_review_items to its end, so reviews the
+# old version records meanwhile are counted too.
+
+from lib.dashboard_snapshot import refresh_snapshot
+
+def migrate(migration):
+  with migration.transaction() as cursor:
+    cursor.execute('''
+      CREATE TABLE IF NOT EXISTS study_session_word_reviews (
+        study_session_id INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        correct_count INTEGER DEFAULT 0,
+        wrong_count INTEGER DEFAULT 0,
+        PRIMARY KEY (study_session_id, word_id),
+        FOREIGN KEY (study_session_id) REFERENCES study_sessions(id),
+        FOREIGN KEY (word_id) REFERENCES words(id)
+      )
+    ''')
+    cursor.execute('''
+      CREATE TABLE IF NOT EXISTS study_session_summaries (
+        study_session_id INTEGER PRIMARY KEY,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        correct_count INTEGER NOT NULL DEFAULT 0,
+        wrong_count INTEGER NOT NULL DEFAULT 0,
+        last_activity_at DATETIME,
+        FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+      )
+    ''')
+    cursor.execute('''
+      CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_vocabulary INTEGER NOT NULL DEFAULT 0,
+        total_words_studied INTEGER NOT NULL DEFAULT 0,
+        mastered_words INTEGER NOT NULL DEFAULT 0,
+        correct_reviews INTEGER NOT NULL DEFAULT 0,
+        total_reviews INTEGER NOT NULL DEFAULT 0,
+        total_sessions INTEGER NOT NULL DEFAULT 0,
+        active_groups INTEGER NOT NULL DEFAULT 0,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        last_study_date DATE,
+        computed_at DATETIME
+      )
+    ''')
+
+    # word_reviews could hold several rows per word; it is rebuilt from the
+    # history below, one row per word. Clearing the other rollups too makes
+    # the migration safe to re-run after an interruption.
+    cursor.execute('DELETE FROM word_reviews')
+    cursor.execute('DELETE FROM study_session_word_reviews')
+    cursor.execute('DELETE FROM study_session_summaries')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews(word_id)')
+
+  # Each batch adds its slice of the history onto the running totals
+  migration.backfill('word_review_items', [
+    '''
+      INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+      SELECT
+        wri.word_id,
+        SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END),
+        MAX(wri.created_at)
+      FROM word_review_items wri
+      JOIN study_sessions ss ON wri.study_session_id = ss.id
+      WHERE wri.id > ? AND wri.id <= ?
+      GROUP BY wri.word_id
+      ON CONFLICT(word_id) DO UPDATE SET
+        correct_count = correct_count + excluded.correct_count,
+        wrong_count = wrong_count + excluded.wrong_count,
+        last_reviewed = MAX(COALESCE(last_reviewed, ''), excluded.last_reviewed)
+    ''',
+    '''
+      INSERT INTO study_session_word_reviews (study_session_id, word_id, correct_count, wrong_count)
+      SELECT
+        wri.study_session_id,
+        wri.word_id,
+        SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END)
+      FROM word_review_items wri
+      JOIN study_sessions ss ON wri.study_session_id = ss.id
+      WHERE wri.id > ? AND wri.id <= ?
+      GROUP BY wri.study_session_id, wri.word_id
+      ON CONFLICT(study_session_id, word_id) DO UPDATE SET
+        correct_count = correct_count + excluded.correct_count,
+        wrong_count = wrong_count + excluded.wrong_count
+    ''',
+    '''
+      INSERT INTO study_session_summaries
+        (study_session_id, review_count, correct_count, wrong_count, last_activity_at)
+      SELECT
+        wri.study_session_id,
+        COUNT(*),
+        SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END),
+        MAX(wri.created_at)
+      FROM word_review_items wri
+      JOIN study_sessions ss ON wri.study_session_id = ss.id
+      WHERE wri.id > ? AND wri.id <= ?
+      GROUP BY wri.study_session_id
+      ON CONFLICT(study_session_id) DO UPDATE SET
+        review_count = review_count + excluded.review_count,
+        correct_count = correct_count + excluded.correct_count,
+        wrong_count = wrong_count + excluded.wrong_count,
+        last_activity_at = MAX(COALESCE(last_activity_at, ''), excluded.last_activity_at)
+    '''
+  ])
+
+  with migration.transaction() as cursor:
+    refresh_snapshot(cursor)
@@ -0,0 +1,73 @@
+# Add the words_fts and words_trigram search indexes and their triggers, and
+# fill them from the words table in batches.
+#
+# The triggers are created first, in the same transaction that notes the
+# highest word id, so words inserted during the backfill are indexed by the
+# triggers and the backfill stops where they took over. The app never
+# updates or deletes words, which the update and delete triggers would
+# otherwise try to remove from the index before they had been backfilled.
+
+def migrate(migration):
+  with migration.transaction() as cursor:
+    # Start over if an earlier run was interrupted
+    for trigger in ['words_fts_insert', 'words_fts_delete', 'words_fts_update']:
+      cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute('DROP TABLE IF EXISTS words_fts')
+    cursor.execute('DROP TABLE IF EXISTS words_trigram')
+
+    cursor.execute('''
+      CREATE VIRTUAL TABLE words_fts USING fts5(
+        spanish, english, pronunciation,
+        content='words', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+      )
+    ''')
+    cursor.execute('''
+      CREATE VIRTUAL TABLE words_trigram USING fts5(
+        spanish, english,
+        content='words', content_rowid='id',
+        tokenize='trigram'
+      )
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER words_fts_insert AFTER INSERT ON words BEGIN
+        INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+        VALUES (new.id, new.spanish, new.english, new.pronunciation);
+        INSERT INTO words_trigram (rowid, spanish, english)
+        VALUES (new.id, new.spanish, new.english);
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER words_fts_delete AFTER DELETE ON words BEGIN
+        INSERT INTO words_fts (words_fts, rowid, spanish, english, pronunciation)
+        VALUES ('delete', old.id, old.spanish, old.english, old.pronunciation);
+        INSERT INTO words_trigram (words_trigram, rowid, spanish, english)
+        VALUES ('delete', old.id, old.spanish, old.english);
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER words_fts_update AFTER UPDATE ON words BEGIN
+        INSERT INTO words_fts (words_fts, rowid, spanish, english, pronunciation)
+        VALUES ('delete', old.id, old.spanish, old.english, old.pronunciation);
+        INSERT INTO words_trigram (words_trigram, rowid, spanish, english)
+        VALUES ('delete', old.id, old.spanish, old.english);
+        INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+        VALUES (new.id, new.spanish, new.english, new.pronunciation);
+        INSERT INTO words_trigram (rowid, spanish, english)
+        VALUES (new.id, new.spanish, new.english);
+      END
+    ''')
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM words')
+    last_word_id = cursor.fetchone()[0]
+
+  migration.backfill('words', [
+    '''
+      INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+      SELECT id, spanish, english, pronunciation FROM words WHERE id > ? AND id <= ?
+    ''',
+    '''
+      INSERT INTO words_trigram (rowid, spanish, english)
+      SELECT id, spanish, english FROM words WHERE id > ? AND id <= ?
+    '''
+  ], until=last_word_id)
@@ -0,0 +1,56 @@
+# Add the word_schedules spaced-repetition table, its due-queue index and the
+# word_groups triggers that maintain it, give every existing group membership
+# a schedule, then replay the review history into the schedules, all in
+# batches.
+#
+# Run this before starting the version of the app that maintains the
+# schedules: the replay follows word_review_items to its end, so reviews the
+# old version records meanwhile are scheduled too.
+
+from lib.scheduler import replay_reviews, reset_schedules
+
+def migrate(migration):
+  with migration.transaction() as cursor:
+    cursor.execute('''
+      CREATE TABLE IF NOT EXISTS word_schedules (
+        group_id INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        due_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        ease REAL NOT NULL DEFAULT 2.5,
+        interval_days REAL NOT NULL DEFAULT 0,
+        repetitions INTEGER NOT NULL DEFAULT 0,
+        lapses INTEGER NOT NULL DEFAULT 0,
+        last_reviewed_at DATETIME,
+        PRIMARY KEY (group_id, word_id),
+        FOREIGN KEY (group_id) REFERENCES groups(id),
+        FOREIGN KEY (word_id) REFERENCES words(id)
+      )
+    ''')
+    cursor.execute('''
+      CREATE INDEX IF NOT EXISTS idx_word_schedules_group_id_due_at ON word_schedules(group_id, due_at, word_id)
+    ''')
+    # Created before the backfill so memberships added meanwhile get a
+    # schedule too; INSERT OR IGNORE makes the overlap harmless
+    cursor.execute('''
+      CREATE TRIGGER IF NOT EXISTS word_schedules_insert AFTER INSERT ON word_groups BEGIN
+        INSERT OR IGNORE INTO word_schedules (group_id, word_id) VALUES (new.group_id, new.word_id);
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER IF NOT EXISTS word_schedules_delete AFTER DELETE ON word_groups BEGIN
+        DELETE FROM word_schedules
+        WHERE group_id = old.group_id AND word_id = old.word_id
+          AND NOT EXISTS (SELECT 1 FROM word_groups WHERE group_id = old.group_id AND word_id = old.word_id);
+      END
+    ''')
+
+  migration.backfill('word_groups', '''
+    INSERT OR IGNORE INTO word_schedules (group_id, word_id)
+    SELECT group_id, word_id FROM word_groups WHERE rowid > ? AND rowid <= ?
+  ''')
+
+  # Fresh schedules first, so the migration is safe to re-run after an
+  # interruption; each batch moves them on through its slice of the history
+  with migration.transaction() as cursor:
+    reset_schedules(cursor)
+  migration.backfill('word_review_items', replay_reviews)
@@ -0,0 +1,53 @@
+# Add daily_review_stats, the per group and day rollup behind
+# /dashboard/timeseries, and backfill it from word_review_items in batches.
+
+def migrate(migration):
+  with migration.transaction() as cursor:
+    cursor.execute('''
+      CREATE TABLE IF NOT EXISTS daily_review_stats (
+        day DATE NOT NULL,
+        group_id INTEGER NOT NULL,
+        reviews INTEGER NOT NULL DEFAULT 0,
+        correct INTEGER NOT NULL DEFAULT 0,
+        new_words INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (group_id, day),
+        FOREIGN KEY (group_id) REFERENCES groups(id)
+      ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_review_stats_day ON daily_review_stats(day, reviews, correct, new_words)')
+    # Safe to re-run after an interruption
+    cursor.execute('DELETE FROM daily_review_stats')
+
+  # The first review of every word, found with one read-only scan into a temp
+  # table (no write lock) so each batch can tell which of its reviews are new
+  # words. Words first reviewed while the migration runs aren't counted as new.
+  migration.connection.execute('DROP TABLE IF EXISTS temp.first_reviews')
+  migration.connection.execute('''
+    CREATE TEMP TABLE first_reviews AS
+    SELECT MIN(wri.id) AS id
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    GROUP BY wri.word_id
+  ''')
+  migration.connection.execute('CREATE UNIQUE INDEX temp.idx_first_reviews_id ON first_reviews(id)')
+
+  migration.backfill('word_review_items', '''
+    INSERT INTO daily_review_stats (day, group_id, reviews, correct, new_words)
+    SELECT
+      date(wri.created_at),
+      ss.group_id,
+      COUNT(*),
+      SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+      COUNT(fr.id)
+    FROM word_review_items wri
+    JOIN study_sessions ss ON wri.study_session_id = ss.id
+    LEFT JOIN first_reviews fr ON fr.id = wri.id
+    WHERE wri.id > ? AND wri.id <= ?
+    GROUP BY date(wri.created_at), ss.group_id
+    ON CONFLICT(group_id, day) DO UPDATE SET
+      reviews = reviews + excluded.reviews,
+      correct = correct + excluded.correct,
+      new_words = new_words + excluded.new_words
+  ''')
+
+  migration.connection.execute('DROP TABLE temp.first_reviews')
@@ -0,0 +1,22 @@
+-- Add groups.membership_version and the triggers that bump it when a group's
+-- words change, for the cached group word bundles (lib/group_bundles.py).
+-- Adding a column with a constant default doesn't rewrite the table.
+ALTER TABLE groups ADD COLUMN membership_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_insert AFTER INSERT ON word_groups BEGIN
+  UPDATE groups SET membership_version = membership_version + 1 WHERE id = new.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_delete AFTER DELETE ON word_groups BEGIN
+  UPDATE groups SET membership_version = membership_version + 1 WHERE id = old.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_word_update AFTER UPDATE ON words BEGIN
+  UPDATE groups SET membership_version = membership_version + 1
+  WHERE id IN (SELECT group_id FROM word_groups WHERE word_id = new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_word_delete AFTER DELETE ON words BEGIN
+  UPDATE groups SET membership_version = membership_version + 1
+  WHERE id IN (SELECT group_id FROM word_groups WHERE word_id = old.id);
+END;
@@ -0,0 +1,77 @@
+# Rebuild word_groups keyed by (group_id, word_id) WITHOUT ROWID, add the
+# reverse (word_id, group_id) index, and have the membership triggers keep
+# groups.words_count exact; then recount every group, as the counter was only
+# ever set at import time.
+#
+# The rebuild is one transaction, since the old table is dropped and the new
+# one renamed in its place. It holds the write lock while it copies the
+# memberships (a few seconds per million), so the app's writes wait meanwhile.
+# Dropping the old table drops its triggers, and the triggers on words that
+# read word_groups would fail the rename, so all of them are created again.
+
+def migrate(migration):
+  with migration.transaction() as cursor:
+    cursor.execute('''
+      CREATE TABLE word_groups_new (
+        word_id INTEGER NOT NULL,
+        group_id INTEGER NOT NULL,
+        PRIMARY KEY (group_id, word_id),
+        FOREIGN KEY (word_id) REFERENCES words(id),
+        FOREIGN KEY (group_id) REFERENCES groups(id)
+      ) WITHOUT ROWID
+    ''')
+    # Duplicate memberships collapse into one
+    cursor.execute('''
+      INSERT OR IGNORE INTO word_groups_new (group_id, word_id)
+      SELECT group_id, word_id FROM word_groups ORDER BY group_id, word_id
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS group_membership_word_update')
+    cursor.execute('DROP TRIGGER IF EXISTS group_membership_word_delete')
+    cursor.execute('DROP TABLE word_groups')
+    cursor.execute('ALTER TABLE word_groups_new RENAME TO word_groups')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_word_groups_word_id ON word_groups(word_id, group_id)')
+
+    cursor.execute('''
+      CREATE TRIGGER word_schedules_insert AFTER INSERT ON word_groups BEGIN
+        INSERT OR IGNORE INTO word_schedules (group_id, word_id) VALUES (new.group_id, new.word_id);
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER word_schedules_delete AFTER DELETE ON word_groups BEGIN
+        DELETE FROM word_schedules
+        WHERE group_id = old.group_id AND word_id = old.word_id
+          AND NOT EXISTS (SELECT 1 FROM word_groups WHERE group_id = old.group_id AND word_id = old.word_id);
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER group_membership_insert AFTER INSERT ON word_groups BEGIN
+        UPDATE groups
+        SET words_count = words_count + 1, membership_version = membership_version + 1
+        WHERE id = new.group_id;
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER group_membership_delete AFTER DELETE ON word_groups BEGIN
+        UPDATE groups
+        SET words_count = words_count - 1, membership_version = membership_version + 1
+        WHERE id = old.group_id;
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER group_membership_word_update AFTER UPDATE ON words BEGIN
+        UPDATE groups SET membership_version = membership_version + 1
+        WHERE id IN (SELECT group_id FROM word_groups WHERE word_id = new.id);
+      END
+    ''')
+    cursor.execute('''
+      CREATE TRIGGER group_membership_word_delete AFTER DELETE ON words BEGIN
+        UPDATE groups SET membership_version = membership_version + 1
+        WHERE id IN (SELECT group_id FROM word_groups WHERE word_id = old.id);
+      END
+    ''')
+
+    cursor.execute('''
+      UPDATE groups
+      SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id),
+        membership_version = membership_version + 1
+    ''')
@@ -0,0 +1,26 @@
+-- Keep groups.words_count exact as words join and leave groups (checked and
+-- repaired by `invoke check-group-counts`), and bump groups.membership_version
+-- whenever a group gains or loses a word, or one of its words is edited or
+-- deleted. Cached per-group data (the word bundles in lib/group_bundles.py)
+-- stores the version it was built from and is rebuilt once it no longer matches.
+CREATE TRIGGER IF NOT EXISTS group_membership_insert AFTER INSERT ON word_groups BEGIN
+  UPDATE groups
+  SET words_count = words_count + 1, membership_version = membership_version + 1
+  WHERE id = new.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_delete AFTER DELETE ON word_groups BEGIN
+  UPDATE groups
+  SET words_count = words_count - 1, membership_version = membership_version + 1
+  WHERE id = old.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_word_update AFTER UPDATE ON words BEGIN
+  UPDATE groups SET membership_version = membership_version + 1
+  WHERE id IN (SELECT group_id FROM word_groups WHERE word_id = new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_membership_word_delete AFTER DELETE ON words BEGIN
+  UPDATE groups SET membership_version = membership_version + 1
+  WHERE id IN (SELECT group_id FROM word_groups WHERE word_id = old.id);
+END;
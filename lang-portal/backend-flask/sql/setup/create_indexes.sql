@@ -0,0 +1,23 @@
+-- Indexes backing the cursor-paginated listings. SQLite appends the rowid (id)
+-- to every index entry, so these also serve the (sort column, id) keyset.
+CREATE INDEX IF NOT EXISTS idx_words_spanish ON words(spanish);
+CREATE INDEX IF NOT EXISTS idx_words_english ON words(english);
+-- pronunciation is nullable, so it is sorted (and indexed) as an empty string
+CREATE INDEX IF NOT EXISTS idx_words_pronunciation ON words(COALESCE(pronunciation, ''));
+-- word_groups is keyed by (group_id, word_id), which serves a group's words;
+-- this is the reverse, a word's groups
+DROP INDEX IF EXISTS idx_word_groups_group_id;
+CREATE INDEX IF NOT EXISTS idx_word_groups_word_id ON word_groups(word_id, group_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions(created_at);
+-- A session's reviews in time order; replaces the single-column index
+DROP INDEX IF EXISTS idx_word_review_items_study_session_id;
+CREATE INDEX IF NOT EXISTS idx_word_review_items_study_session_id_created_at ON word_review_items(study_session_id, created_at);
+-- word_reviews is the per-word rollup of word_review_items; one row per word
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews(word_id);
+-- Checks whether a group already had a session in the last 30 days
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_created_at ON study_sessions(group_id, created_at);
+-- Session listings of a study activity, newest first
+CREATE INDEX IF NOT EXISTS idx_study_sessions_study_activity_id_created_at ON study_sessions(study_activity_id, created_at);
+-- Time series across all groups sum daily_review_stats by day; covering, so
+-- the sums never look up the table rows
+CREATE INDEX IF NOT EXISTS idx_daily_review_stats_day ON daily_review_stats(day, reviews, correct, new_words);
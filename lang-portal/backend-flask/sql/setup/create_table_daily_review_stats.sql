@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS daily_review_stats (
+  day DATE NOT NULL,  -- UTC date of the reviews
+  group_id INTEGER NOT NULL,  -- Group of the study sessions the reviews were made in
+  reviews INTEGER NOT NULL DEFAULT 0,
+  correct INTEGER NOT NULL DEFAULT 0,
+  new_words INTEGER NOT NULL DEFAULT 0,  -- Words reviewed for the first time ever
+  PRIMARY KEY (group_id, day),
+  FOREIGN KEY (group_id) REFERENCES groups(id)
+) WITHOUT ROWID;
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+  id INTEGER PRIMARY KEY CHECK (id = 1),  -- Single row cache of the dashboard stats
+  total_vocabulary INTEGER NOT NULL DEFAULT 0,
+  total_words_studied INTEGER NOT NULL DEFAULT 0,
+  mastered_words INTEGER NOT NULL DEFAULT 0,
+  correct_reviews INTEGER NOT NULL DEFAULT 0,
+  total_reviews INTEGER NOT NULL DEFAULT 0,
+  total_sessions INTEGER NOT NULL DEFAULT 0,
+  active_groups INTEGER NOT NULL DEFAULT 0,
+  current_streak INTEGER NOT NULL DEFAULT 0,
+  last_study_date DATE,  -- Date of the most recent study session, used to extend the streak
+  computed_at DATETIME  -- When the time dependent stats (active_groups) were last computed
+);
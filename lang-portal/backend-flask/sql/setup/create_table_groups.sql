@@ -1,5 +1,6 @@
 CREATE TABLE IF NOT EXISTS groups (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   name TEXT NOT NULL,
-  words_count INTEGER DEFAULT 0  -- Counter cache for the number of words in the group
+  words_count INTEGER DEFAULT 0,  -- Counter cache for the number of words in the group
+  membership_version INTEGER NOT NULL DEFAULT 0  -- Bumped whenever the group's words change (see create_group_membership_triggers.sql)
 );
\ No newline at end of file
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS study_session_summaries (
+  study_session_id INTEGER PRIMARY KEY,  -- Rollup of word_review_items for this session
+  review_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  wrong_count INTEGER NOT NULL DEFAULT 0,
+  last_activity_at DATETIME,  -- created_at of the session's latest review
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
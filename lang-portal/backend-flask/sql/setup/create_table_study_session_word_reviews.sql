@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS study_session_word_reviews (
+  study_session_id INTEGER NOT NULL,
+  word_id INTEGER NOT NULL,
+  correct_count INTEGER DEFAULT 0,  -- Rollup of word_review_items for this session and word
+  wrong_count INTEGER DEFAULT 0,
+  PRIMARY KEY (study_session_id, word_id),
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id),
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
@@ -0,0 +1,33 @@
+-- Spaced-repetition state for every word in every group (see lib/scheduler.py).
+-- New words are due immediately; reviews push due_at out by the word's interval.
+CREATE TABLE IF NOT EXISTS word_schedules (
+  group_id INTEGER NOT NULL,
+  word_id INTEGER NOT NULL,
+  due_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  ease REAL NOT NULL DEFAULT 2.5,  -- SM-2 ease factor
+  interval_days REAL NOT NULL DEFAULT 0,  -- Days between the last review and due_at
+  repetitions INTEGER NOT NULL DEFAULT 0,  -- Correct answers in a row
+  lapses INTEGER NOT NULL DEFAULT 0,  -- Times the word was forgotten after being learned
+  last_reviewed_at DATETIME,
+  PRIMARY KEY (group_id, word_id),
+  FOREIGN KEY (group_id) REFERENCES groups(id),
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
+
+-- The due queue: the next words of a group are an index range scan
+CREATE INDEX IF NOT EXISTS idx_word_schedules_group_id_due_at ON word_schedules(group_id, due_at, word_id);
+
+-- Schedule words that were added to groups before this table existed
+INSERT OR IGNORE INTO word_schedules (group_id, word_id)
+SELECT group_id, word_id FROM word_groups;
+
+-- Keep a schedule row for every group membership
+CREATE TRIGGER IF NOT EXISTS word_schedules_insert AFTER INSERT ON word_groups BEGIN
+  INSERT OR IGNORE INTO word_schedules (group_id, word_id) VALUES (new.group_id, new.word_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS word_schedules_delete AFTER DELETE ON word_groups BEGIN
+  DELETE FROM word_schedules
+  WHERE group_id = old.group_id AND word_id = old.word_id
+    AND NOT EXISTS (SELECT 1 FROM word_groups WHERE group_id = old.group_id AND word_id = old.word_id);
+END;
@@ -0,0 +1,41 @@
+-- Full-text index over words. remove_diacritics makes "cancion" match "canción",
+-- and the prefix indexes keep typeahead queries ("can*") fast.
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+  spanish, english, pronunciation,
+  content='words', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+);
+
+-- Trigram index used as a fallback for misspelled queries
+CREATE VIRTUAL TABLE IF NOT EXISTS words_trigram USING fts5(
+  spanish, english,
+  content='words', content_rowid='id',
+  tokenize='trigram'
+);
+
+-- Keep both indexes in sync with the words table
+CREATE TRIGGER IF NOT EXISTS words_fts_insert AFTER INSERT ON words BEGIN
+  INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+  VALUES (new.id, new.spanish, new.english, new.pronunciation);
+  INSERT INTO words_trigram (rowid, spanish, english)
+  VALUES (new.id, new.spanish, new.english);
+END;
+
+CREATE TRIGGER IF NOT EXISTS words_fts_delete AFTER DELETE ON words BEGIN
+  INSERT INTO words_fts (words_fts, rowid, spanish, english, pronunciation)
+  VALUES ('delete', old.id, old.spanish, old.english, old.pronunciation);
+  INSERT INTO words_trigram (words_trigram, rowid, spanish, english)
+  VALUES ('delete', old.id, old.spanish, old.english);
+END;
+
+CREATE TRIGGER IF NOT EXISTS words_fts_update AFTER UPDATE ON words BEGIN
+  INSERT INTO words_fts (words_fts, rowid, spanish, english, pronunciation)
+  VALUES ('delete', old.id, old.spanish, old.english, old.pronunciation);
+  INSERT INTO words_trigram (words_trigram, rowid, spanish, english)
+  VALUES ('delete', old.id, old.spanish, old.english);
+  INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+  VALUES (new.id, new.spanish, new.english, new.pronunciation);
+  INSERT INTO words_trigram (rowid, spanish, english)
+  VALUES (new.id, new.spanish, new.english);
+END;
@@ -1,4 +1,4 @@
-from invoke import task
+from invoke import Exit, task
 from lib.db import db
 
 @task
@@ -6,4 +6,109 @@ def init_db(c):
   from flask import Flask
   app = Flask(__name__)
   db.init(app)
-  print("Database initialized successfully.")
\ No newline at end of file
+  print("Database initialized successfully.")
+
+@task(help={
+  'batch_size': "Rows per backfill transaction",
+  'status': "List migrations without applying them"
+})
+def migrate(c, batch_size=10000, status=False):
+  import migrate
+  if status:
+    migrate.show_status(db.database)
+  else:
+    migrate.run_migrations(db.database, batch_size=int(batch_size))
+
+@task
+def rebuild_rollups(c):
+  from flask import Flask
+  from lib.reviews import rebuild_rollups
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    rebuild_rollups(cursor)
+    db.commit()
+  print("Review rollups rebuilt successfully.")
+
+@task(help={
+  'path': "Word list to import (.json array, .ndjson/.jsonl or .csv)",
+  'group': "Group for words that don't name their own",
+  'format': "File format, if it can't be told from the extension",
+  'chunk_size': "Rows per executemany batch",
+  'defer_indexes': "Drop and rebuild the word indexes around the load (default: only for files over 10 MB)"
+})
+def import_words(c, path, group=None, format=None, chunk_size=5000, defer_indexes=None):
+  import os
+  from flask import Flask
+  from lib.importer import import_words, read_words
+  # Rebuilding the indexes costs more than it saves when adding a few words to a large database
+  if defer_indexes is None:
+    defer_indexes = os.path.getsize(path) > 10 * 1024 * 1024
+  app = Flask(__name__)
+  with app.app_context():
+    with db.write() as cursor:
+      stats = import_words(
+        cursor, read_words(path, format),
+        group_name=group, chunk_size=int(chunk_size), defer_indexes=defer_indexes
+      )
+  rate = stats['words_read'] / stats['seconds'] if stats['seconds'] else 0
+  print(
+    f"Read {stats['words_read']} words in {stats['seconds']:.2f}s ({rate:,.0f} rows/sec): "
+    f"{stats['words_inserted']} new, {stats['duplicates']} duplicates, "
+    f"{stats['memberships_inserted']} group memberships added."
+  )
+
+@task(help={
+  'path': "File to write (.ndjson, or .ndjson.gz for a gzip-compressed export)"
+})
+def export_history(c, path):
+  from flask import Flask
+  from lib.history import export_records, gzip_chunks, ndjson_chunks
+  app = Flask(__name__)
+  with app.app_context():
+    chunks = ndjson_chunks(export_records(db.cursor()))
+    if path.endswith('.gz'):
+      chunks = gzip_chunks(chunks)
+    with open(path, 'wb') as file:
+      for chunk in chunks:
+        file.write(chunk)
+  print(f"Study history exported to {path}.")
+
+@task(help={
+  'path': "Export to load (.ndjson, gzip-compressed or not)",
+  'chunk_size': "Rows per executemany batch"
+})
+def import_history(c, path, chunk_size=5000):
+  from flask import Flask
+  from lib.history import import_history, read_history
+  app = Flask(__name__)
+  with app.app_context():
+    with db.write() as cursor:
+      stats = import_history(cursor, read_history(path), chunk_size=int(chunk_size))
+  rows = stats['sessions'] + stats['reviews']
+  rate = rows / stats['seconds'] if stats['seconds'] else 0
+  print(
+    f"Imported {stats['sessions']} study sessions and {stats['reviews']} reviews "
+    f"in {stats['seconds']:.2f}s ({rate:,.0f} rows/sec), rollups included."
+  )
+
+@task(help={
+  'repair': "Set every drifted words_count to the real count"
+})
+def check_group_counts(c, repair=False):
+  from flask import Flask
+  from lib.group_counts import group_count_drift, repair_group_counts
+  app = Flask(__name__)
+  with app.app_context():
+    with db.write() as cursor:
+      drift = group_count_drift(cursor)
+      for group_id, name, words_count, actual in drift:
+        print(f"Group {group_id} ({name}): words_count is {words_count}, it has {actual} words")
+      if repair:
+        repair_group_counts(cursor, drift)
+  if not drift:
+    print("Every group's words_count is correct.")
+  elif repair:
+    print(f"Repaired {len(drift)} group(s).")
+  else:
+    raise Exit(f"{len(drift)} group(s) drifted; run with --repair to fix them.", code=1)
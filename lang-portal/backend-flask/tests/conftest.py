@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+from flask import Flask
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from lib.db import Db
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+  # A fresh database with the seed data, built the way `invoke init-db` does
+  # (its setup and seed paths are relative to the backend directory)
+  monkeypatch.chdir(BACKEND_DIR)
+  path = str(tmp_path / 'words.db')
+  Db(database=path, pool_size=0).init(Flask(__name__))
+  return path
+
+@pytest.fixture
+def connection(database):
+  connection = sqlite3.connect(database)
+  connection.row_factory = sqlite3.Row
+  yield connection
+  connection.close()
+
+@pytest.fixture
+def app(database):
+  from app import create_app
+  return create_app({'DATABASE': database, 'DB_POOL_SIZE': 0})
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
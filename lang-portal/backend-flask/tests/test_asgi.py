@@ -0,0 +1,93 @@
+import asyncio
+import gzip
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from asgi import create_asgi_app
+
+def request(app, path, query_string=b'', headers=(), method='GET', body=b''):
+  # One http request through the ASGI app; returns (status, headers, body)
+  messages = []
+  received = [{'type': 'http.request', 'body': body}]
+
+  async def receive():
+    return received.pop(0) if received else {'type': 'http.disconnect'}
+
+  async def send(message):
+    messages.append(message)
+
+  scope = {
+    'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path, 'root_path': '',
+    'query_string': query_string, 'headers': [(name.encode(), value.encode()) for name, value in headers],
+    'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)
+  }
+
+  async def run():
+    await app(scope, receive, send)
+
+  asyncio.run(run())
+  start = messages[0]
+  return (
+    start['status'],
+    {name.decode(): value.decode() for name, value in start['headers']},
+    b''.join(message.get('body', b'') for message in messages[1:])
+  )
+
+@pytest.fixture
+def asgi_app(app):
+  asgi_app = create_asgi_app(app)
+  yield asgi_app
+  messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+
+  async def receive():
+    return messages.pop(0)
+
+  async def send(message):
+    pass
+
+  asyncio.run(asgi_app({'type': 'lifespan'}, receive, send))
+
+def test_raw_words_match_the_flask_view(asgi_app, client):
+  response = client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1})
+  session_id = response.get_json()['session_id']
+  for query_string in [b'', f'session_id={session_id}'.encode()]:
+    expected = client.get('/groups/1/words/raw', query_string=query_string.decode())
+    status, headers, body = request(asgi_app, '/groups/1/words/raw', query_string)
+    assert (status, body) == (200, expected.get_data())
+    assert headers['etag'] == expected.headers['ETag']
+
+    status, headers, body = request(
+      asgi_app, '/groups/1/words/raw', query_string, headers=[('accept-encoding', 'gzip')]
+    )
+    assert headers['content-encoding'] == 'gzip'
+    assert gzip.decompress(body) == expected.get_data()
+
+    status, _, _ = request(
+      asgi_app, '/groups/1/words/raw', query_string,
+      headers=[('accept-encoding', 'gzip'), ('if-none-match', headers['etag'])]
+    )
+    assert status == 304
+
+def test_raw_words_not_found(asgi_app):
+  assert request(asgi_app, '/groups/999/words/raw')[0] == 404
+  assert request(asgi_app, '/groups/1/words/raw', b'session_id=999')[0] == 404
+
+def test_other_routes_run_the_flask_views(asgi_app, client):
+  status, _, body = request(asgi_app, '/groups')
+  assert (status, body) == (200, client.get('/groups').get_data())
+
+  status, _, body = request(
+    asgi_app, '/api/study-sessions', method='POST',
+    headers=[('content-type', 'application/json'), ('content-length', '39')],
+    body=b'{"group_id": 1, "study_activity_id": 1}'
+  )
+  assert status == 201, body
+
+  # A chunked request has no content-length
+  status, _, body = request(
+    asgi_app, '/api/study-sessions', method='POST', headers=[('content-type', 'application/json')],
+    body=b'{"group_id": 1, "study_activity_id": 1}'
+  )
+  assert status == 201, body
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+from lib.reviews import rebuild_rollups
+
+def start_session(client, group_id=1):
+  response = client.post('/api/study-sessions', json={'group_id': group_id, 'study_activity_id': 1})
+  return response.get_json()['session_id']
+
+def test_stats_come_from_the_snapshot_until_refreshed(client, connection):
+  total_vocabulary = client.get('/dashboard/stats').get_json()['total_vocabulary']
+
+  # A word added behind the app's back isn't in the snapshot yet
+  connection.execute('''
+    INSERT INTO words (spanish, pronunciation, english, parts_of_speech) VALUES ('nuevo', '', 'new', '{}')
+  ''')
+  connection.commit()
+  assert client.get('/dashboard/stats').get_json()['total_vocabulary'] == total_vocabulary
+  assert client.get('/dashboard/stats?refresh=true').get_json()['total_vocabulary'] == total_vocabulary + 1
+
+def test_writes_keep_the_snapshot_current(client, connection):
+  word_ids = [row[0] for row in connection.execute('SELECT word_id FROM word_groups WHERE group_id = 1 LIMIT 3')]
+  before = client.get('/dashboard/stats').get_json()
+
+  session_id = start_session(client)
+  for word_id in word_ids:
+    client.post(f'/api/study-sessions/{session_id}/review', json={'word_id': word_id, 'correct': True})
+  client.post(f'/api/study-sessions/{session_id}/reviews:batch', json=[
+    {'word_id': word_ids[0], 'correct': correct} for correct in [True, True, True, False]
+  ])
+
+  stats = client.get('/dashboard/stats').get_json()
+  assert stats['total_sessions'] == before['total_sessions'] + 1
+  assert stats['total_words_studied'] == before['total_words_studied'] + 3
+  assert stats['mastered_words'] == before['mastered_words'] + 1
+  assert stats['success_rate'] == 6 / 7
+  refreshed = client.get('/dashboard/stats?refresh=true').get_json()
+  assert dict(refreshed, computed_at=None) == dict(stats, computed_at=None)
+
+def test_snapshot_from_an_earlier_day_is_recomputed(client, connection):
+  client.get('/dashboard/stats')
+  connection.execute("UPDATE dashboard_snapshot SET computed_at = '2000-01-01 00:00:00'")
+  connection.commit()
+
+  today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+  assert client.get('/dashboard/stats').get_json()['computed_at'].startswith(today)
+
+def add_reviews(connection, group_id, day, results):
+  cursor = connection.cursor()
+  cursor.execute('''
+    INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (?, 1, ?)
+  ''', (group_id, f'{day} 10:00:00'))
+  session_id = cursor.lastrowid
+  cursor.execute('SELECT word_id FROM word_groups WHERE group_id = ? ORDER BY word_id', (group_id,))
+  word_ids = [row[0] for row in cursor.fetchall()]
+  cursor.executemany('''
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)
+  ''', [(word_id, session_id, correct, f'{day} 10:00:00') for word_id, correct in zip(word_ids, results)])
+
+def point(start, reviews=0, correct=0, new_words=0):
+  return {
+    'start': start, 'reviews': reviews, 'correct': correct,
+    'accuracy': correct / reviews if reviews else None, 'new_words': new_words
+  }
+
+def test_timeseries_by_day_and_week(client, connection):
+  add_reviews(connection, 1, '2025-01-06', [True, True, False])
+  add_reviews(connection, 2, '2025-01-08', [False, False])
+  add_reviews(connection, 1, '2025-01-20', [True])
+  rebuild_rollups(connection.cursor())
+  connection.commit()
+
+  days = client.get('/dashboard/timeseries?from=2025-01-06&to=2025-01-08').get_json()
+  assert days['series'] == [
+    point('2025-01-06', 3, 2, 3), point('2025-01-07'), point('2025-01-08', 2, 0, 2)
+  ]
+
+  # Weeks start on Monday, and the range is widened to whole weeks
+  weeks = client.get('/dashboard/timeseries?bucket=week&from=2025-01-07&to=2025-01-21').get_json()
+  assert (weeks['from'], weeks['to']) == ('2025-01-06', '2025-01-26')
+  assert weeks['series'] == [point('2025-01-06', 5, 2, 5), point('2025-01-13'), point('2025-01-20', 1, 1, 0)]
+
+  group = client.get('/dashboard/timeseries?bucket=week&from=2025-01-06&to=2025-01-26&group_id=2').get_json()
+  assert [bucket['reviews'] for bucket in group['series']] == [2, 0, 0]
+
+def test_timeseries_counts_reviews_as_they_are_recorded(client, connection):
+  word_id = connection.execute('SELECT word_id FROM word_groups WHERE group_id = 1').fetchone()[0]
+  session_id = start_session(client)
+  client.post(f'/api/study-sessions/{session_id}/reviews:batch', json=[
+    {'word_id': word_id, 'correct': True}, {'word_id': word_id, 'correct': False}
+  ])
+
+  series = client.get('/dashboard/timeseries').get_json()['series']
+  assert len(series) == 30
+  assert series[-1] == point(datetime.now(timezone.utc).strftime('%Y-%m-%d'), 2, 1, 1)
+
+def test_timeseries_rejects_bad_ranges(client):
+  for query in ['bucket=month', 'from=2025-02-01&to=2025-01-01', 'from=2020-01-01&to=2025-01-01', 'to=tomorrow']:
+    assert client.get(f'/dashboard/timeseries?{query}').status_code == 400
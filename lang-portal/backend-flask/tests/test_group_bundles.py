@@ -0,0 +1,67 @@
+import gzip
+
+def raw_words(client, group_id=1, **headers):
+  response = client.get(f'/groups/{group_id}/words/raw', headers=headers)
+  assert response.status_code == 200
+  return response
+
+def test_bundle_is_built_once_per_membership_version(client):
+  first = raw_words(client)
+  assert first.headers['X-Cache'] == 'MISS'
+  second = raw_words(client)
+  assert second.headers['X-Cache'] == 'HIT'
+  assert second.get_data() == first.get_data()
+
+def test_editing_a_word_rebuilds_its_groups_bundles(client, connection):
+  word_id, group_id = connection.execute('SELECT word_id, group_id FROM word_groups').fetchone()
+  raw_words(client, group_id)
+
+  connection.execute("UPDATE words SET english = 'edited' WHERE id = ?", (word_id,))
+  connection.commit()
+  response = raw_words(client, group_id)
+  assert response.headers['X-Cache'] == 'MISS'
+  words = {word['id']: word for word in response.get_json()['words']}
+  assert words[word_id]['english'] == 'edited'
+
+def test_membership_changes_rebuild_the_bundle(client, connection):
+  word_ids = {word['id'] for word in raw_words(client, 1).get_json()['words']}
+  word_id = connection.execute('SELECT word_id FROM word_groups WHERE group_id = 2').fetchone()[0]
+
+  connection.execute('INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)', (word_id,))
+  connection.commit()
+  response = raw_words(client, 1)
+  assert response.headers['X-Cache'] == 'MISS'
+  assert {word['id'] for word in response.get_json()['words']} == word_ids | {word_id}
+
+def test_reviews_are_spliced_into_a_cached_bundle(client, connection):
+  word_id = connection.execute('SELECT word_id FROM word_groups WHERE group_id = 1').fetchone()[0]
+  raw_words(client)
+  response = client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1})
+  session_id = response.get_json()['session_id']
+  client.post(f'/api/study-sessions/{session_id}/reviews:batch', json=[
+    {'word_id': word_id, 'correct': True}, {'word_id': word_id, 'correct': False}
+  ])
+
+  response = client.get(f'/groups/1/words/raw?session_id={session_id}')
+  assert response.headers['X-Cache'] == 'HIT'
+  data = response.get_json()
+  stats = {word['id']: word['stats'] for word in data['words']}
+  assert stats[word_id] == {'session': {'correct': 1, 'wrong': 1}, 'total': {'correct': 1, 'wrong': 1}}
+  assert data['session_id'] == str(session_id)
+
+def test_compressed_payload_and_revalidation(client):
+  plain = raw_words(client)
+  compressed = raw_words(client, **{'Accept-Encoding': 'gzip'})
+  assert compressed.headers['Content-Encoding'] == 'gzip'
+  assert compressed.headers['Vary'] == 'Accept-Encoding'
+  assert gzip.decompress(compressed.get_data()) == plain.get_data()
+  assert compressed.headers['ETag'] != plain.headers['ETag']
+
+  not_modified = client.get('/groups/1/words/raw', headers={
+    'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']
+  })
+  assert not_modified.status_code == 304
+
+def test_missing_group_and_session(client):
+  assert client.get('/groups/999/words/raw').status_code == 404
+  assert client.get('/groups/1/words/raw?session_id=999').status_code == 404
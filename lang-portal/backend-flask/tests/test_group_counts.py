@@ -0,0 +1,47 @@
+import pytest
+
+from lib.group_counts import group_count_drift, repair_group_counts
+from lib.importer import import_words
+
+def words_count(connection, group_id):
+  return connection.execute('SELECT words_count FROM groups WHERE id = ?', (group_id,)).fetchone()[0]
+
+def test_seeded_counts_are_exact(connection):
+  assert group_count_drift(connection.cursor()) == []
+  assert words_count(connection, 1) == connection.execute(
+    'SELECT COUNT(*) FROM word_groups WHERE group_id = 1'
+  ).fetchone()[0]
+
+def test_triggers_follow_memberships(connection):
+  count = words_count(connection, 1)
+  word_id = connection.execute('SELECT word_id FROM word_groups WHERE group_id = 2').fetchone()[0]
+
+  connection.execute('INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)', (word_id,))
+  assert words_count(connection, 1) == count + 1
+  # An existing membership isn't counted twice
+  connection.execute('INSERT OR IGNORE INTO word_groups (word_id, group_id) VALUES (?, 1)', (word_id,))
+  assert words_count(connection, 1) == count + 1
+  connection.execute('DELETE FROM word_groups WHERE group_id = 1')
+  assert words_count(connection, 1) == 0
+  assert group_count_drift(connection.cursor()) == []
+
+# A deferred-index import drops the membership triggers and recounts at the end
+@pytest.mark.parametrize('defer_indexes', [False, True])
+def test_imports_keep_counts_exact(connection, defer_indexes):
+  cursor = connection.cursor()
+  import_words(cursor, [
+    {'spanish': 'hablar', 'english': 'to speak', 'group': ['Core Adjectives', 'Nuevo']},
+    {'spanish': 'correr', 'english': 'to run', 'group': 'Nuevo'}
+  ], defer_indexes=defer_indexes)
+  cursor.execute("SELECT id FROM groups WHERE name = 'Nuevo'")
+  assert words_count(connection, cursor.fetchone()[0]) == 2
+  assert group_count_drift(cursor) == []
+
+def test_drift_is_found_and_repaired(connection):
+  cursor = connection.cursor()
+  connection.execute('UPDATE groups SET words_count = 0 WHERE id = 1')
+  drift = group_count_drift(cursor)
+  assert [(group_id, words_count) for group_id, _, words_count, _ in drift] == [(1, 0)]
+
+  repair_group_counts(cursor, drift)
+  assert group_count_drift(cursor) == []
@@ -0,0 +1,86 @@
+import gzip
+import json
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from lib.db import Db
+from lib.history import export_records, import_history
+
+@pytest.fixture
+def empty_database(database, tmp_path):
+  # A second database from the same seed data, without study history
+  path = str(tmp_path / 'imported.db')
+  Db(database=path, pool_size=0).init(Flask(__name__))
+  return path
+
+def record_history(client, connection):
+  group_words = {}
+  for group_id, word_id in connection.execute('SELECT group_id, word_id FROM word_groups'):
+    group_words.setdefault(group_id, []).append(word_id)
+  for group_id, word_ids in group_words.items():
+    for _ in range(2):
+      response = client.post('/api/study-sessions', json={'group_id': group_id, 'study_activity_id': 1})
+      session_id = response.get_json()['session_id']
+      client.post(f'/api/study-sessions/{session_id}/reviews:batch', json=[
+        {'word_id': word_id, 'correct': index % 4 > 0} for index, word_id in enumerate(word_ids)
+      ])
+
+def parse(body):
+  return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+def test_export_and_import_round_trip(client, connection, empty_database):
+  record_history(client, connection)
+
+  response = client.get('/api/export')
+  assert response.mimetype == 'application/x-ndjson'
+  records = parse(response.get_data())
+  assert records[0]['type'] == 'export'
+  assert sum(record['type'] == 'study_session' for record in records) == 4
+  assert sum(record['type'] == 'review' for record in records) == 2 * 111
+
+  compressed = client.get('/api/export?format=gzip')
+  assert compressed.mimetype == 'application/gzip'
+  assert parse(gzip.decompress(compressed.get_data()))[1:] == records[1:]
+
+  imported = sqlite3.connect(empty_database)
+  stats = import_history(imported.cursor(), iter(records), chunk_size=50)
+  imported.commit()
+  assert (stats['sessions'], stats['reviews']) == (4, 222)
+
+  assert list(export_records(imported.cursor()))[1:] == records[1:]
+  # The rollups are rebuilt from the imported history
+  rollups = '''
+    SELECT study_session_id, review_count, correct_count, wrong_count
+    FROM study_session_summaries ORDER BY study_session_id
+  '''
+  assert imported.execute(rollups).fetchall() == [tuple(row) for row in connection.execute(rollups)]
+  imported.close()
+
+def test_import_needs_a_database_without_history(client, connection):
+  record_history(client, connection)
+  records = parse(client.get('/api/export').get_data())
+  with pytest.raises(ValueError, match='already has study history'):
+    import_history(connection.cursor(), iter(records))
+  connection.rollback()
+
+@pytest.mark.parametrize('records, error', [
+  ([{'type': 'review'}], 'first record must be the export header'),
+  ([{'type': 'export', 'version': 2}], 'Unsupported export version'),
+  ([{'type': 'export', 'version': 1}, {'type': 'study_session', 'id': 1}], "Record 2: missing 'group_id'"),
+  ([
+    {'type': 'export', 'version': 1},
+    {'type': 'study_session', 'id': 1, 'group_id': 99, 'study_activity_id': 1, 'created_at': '2025-01-01 00:00:00'}
+  ], '1 rows reference missing groups'),
+])
+def test_import_rejects_bad_exports(empty_database, records, error):
+  imported = sqlite3.connect(empty_database)
+  with pytest.raises(ValueError, match=error):
+    import_history(imported.cursor(), iter(records))
+  imported.rollback()
+  assert imported.execute('SELECT COUNT(*) FROM study_sessions').fetchone()[0] == 0
+  imported.close()
+
+def test_export_rejects_unknown_formats(client):
+  assert client.get('/api/export?format=zip').status_code == 400
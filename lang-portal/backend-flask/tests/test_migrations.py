@@ -0,0 +1,149 @@
+import random
+import sqlite3
+
+from lib import migrations
+from lib.db import DEFAULT_PRAGMAS
+from lib.reviews import rebuild_rollups
+
+# The schema of a database created before schema_migrations existed
+BASELINE_SCHEMA = '''
+  CREATE TABLE words (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spanish TEXT NOT NULL,
+    pronunciation TEXT,
+    english TEXT NOT NULL,
+    parts_of_speech TEXT NOT NULL
+  );
+  CREATE TABLE word_groups (
+    word_id INTEGER NOT NULL,
+    group_id INTEGER NOT NULL,
+    FOREIGN KEY (word_id) REFERENCES words(id),
+    FOREIGN KEY (group_id) REFERENCES groups(id)
+  );
+  CREATE TABLE groups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    words_count INTEGER DEFAULT 0
+  );
+  CREATE TABLE study_activities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    preview_url TEXT
+  );
+  CREATE TABLE study_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id INTEGER NOT NULL,
+    study_activity_id INTEGER NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (group_id) REFERENCES groups(id),
+    FOREIGN KEY (study_activity_id) REFERENCES study_activities(id)
+  );
+  CREATE TABLE word_review_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    word_id INTEGER NOT NULL,
+    study_session_id INTEGER NOT NULL,
+    correct BOOLEAN NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (word_id) REFERENCES words(id),
+    FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+  );
+  CREATE TABLE word_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    word_id INTEGER NOT NULL,
+    correct_count INTEGER DEFAULT 0,
+    wrong_count INTEGER DEFAULT 0,
+    last_reviewed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (word_id) REFERENCES words(id)
+  );
+'''
+
+def schema(connection):
+  # Every table's columns, and the names of the indexes and triggers
+  objects = {}
+  for kind, name, table in connection.execute("SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"):
+    if kind == 'table':
+      objects[name] = [tuple(column)[1:] for column in connection.execute(f'PRAGMA table_info("{name}")')]
+    else:
+      objects[name] = (kind, table)
+  return objects
+
+def baseline_database(path, seeded):
+  # The seed words and groups with a random review history, in the baseline schema
+  connection = sqlite3.connect(path)
+  connection.executescript(BASELINE_SCHEMA)
+  connection.execute('ATTACH DATABASE ? AS seeded', (seeded,))
+  for table, columns in [
+    ('words', 'id, spanish, pronunciation, english, parts_of_speech'),
+    ('groups', 'id, name, words_count'),
+    ('word_groups', 'word_id, group_id'),
+    ('study_activities', 'id, name, url, preview_url')
+  ]:
+    connection.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM seeded.{table}')
+  group_words = {}
+  for group_id, word_id in connection.execute('SELECT group_id, word_id FROM word_groups'):
+    group_words.setdefault(group_id, []).append(word_id)
+  connection.commit()
+  connection.execute('DETACH DATABASE seeded')
+
+  rng = random.Random(0)
+  for day in range(1, 21):
+    group_id = rng.choice(list(group_words))
+    cursor = connection.execute('''
+      INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (?, 1, ?)
+    ''', (group_id, f'2025-01-{day:02d} 09:00:00'))
+    connection.executemany('''
+      INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)
+    ''', [
+      (rng.choice(group_words[group_id]), cursor.lastrowid, rng.random() < 0.7, f'2025-01-{day:02d} 09:{minute:02d}:00')
+      for minute in range(30)
+    ])
+  connection.commit()
+  connection.close()
+
+def rollups(connection):
+  return [
+    connection.execute(query).fetchall() for query in [
+      'SELECT word_id, correct_count, wrong_count FROM word_reviews ORDER BY word_id',
+      'SELECT * FROM study_session_summaries ORDER BY study_session_id',
+      'SELECT * FROM daily_review_stats ORDER BY group_id, day',
+      'SELECT group_id, word_id, ease, interval_days, due_at FROM word_schedules ORDER BY group_id, word_id'
+    ]
+  ]
+
+def test_upgrade_from_baseline_to_head(database, tmp_path):
+  path = str(tmp_path / 'baseline.db')
+  baseline_database(path, database)
+
+  applied = migrations.run_migrations(path, DEFAULT_PRAGMAS, batch_size=50, pause=0)
+  assert applied == [name for _, name, _ in migrations.discover_migrations()]
+  assert migrations.run_migrations(path, DEFAULT_PRAGMAS, pause=0) == []
+
+  migrated = sqlite3.connect(path)
+  fresh = sqlite3.connect(database)
+  assert schema(migrated) == schema(fresh)
+
+  # The backfilled rollups are the ones rebuilt from the history in one pass
+  backfilled = rollups(migrated)
+  rebuild_rollups(migrated.cursor())
+  assert rollups(migrated) == backfilled
+  assert all(backfilled)
+
+  # Group word counts are exact, and search finds the words
+  assert migrated.execute('''
+    SELECT COUNT(*) FROM groups WHERE words_count != (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+  ''').fetchone()[0] == 0
+  assert migrated.execute("SELECT COUNT(*) FROM words_fts WHERE words_fts MATCH 'hablar'").fetchone()[0] == 1
+  migrated.close()
+  fresh.close()
+
+def test_split_statements_keeps_trigger_bodies_whole():
+  statements = migrations.split_statements('''
+    -- A comment
+    CREATE TABLE t (id INTEGER);
+    CREATE TRIGGER t_insert AFTER INSERT ON t BEGIN
+      UPDATE t SET id = id + 1 WHERE id = new.id;
+    END;
+  ''')
+  assert len(statements) == 2
+  assert statements[1].endswith('END;')
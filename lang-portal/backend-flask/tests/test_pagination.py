@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from lib.pagination import decode_cursor, encode_cursor, keyset_condition, next_cursor
+
+def paginate(connection, order, limit):
+  # Follow the cursors page by page, the way the listing routes do
+  pages = []
+  token = None
+  while True:
+    where, params = '', ()
+    if token:
+      last_value, last_id = decode_cursor(token, 'spanish', order)
+      where, params = keyset_condition('spanish', 'id', order, last_value, last_id)
+      where = 'WHERE ' + where
+    rows = connection.execute(f'''
+      SELECT id, spanish AS sort_value FROM words {where}
+      ORDER BY spanish {order}, id {order} LIMIT ?
+    ''', params + (limit + 1,)).fetchall()
+    pages.append([row['id'] for row in rows[:limit]])
+    token = next_cursor(rows, limit, 'spanish', order)
+    if token is None:
+      return pages
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+@pytest.mark.parametrize('limit', [1, 3, 7, 100])
+def test_cursor_pages_cover_every_row_once(order, limit):
+  connection = sqlite3.connect(':memory:')
+  connection.row_factory = sqlite3.Row
+  connection.execute('CREATE TABLE words (id INTEGER PRIMARY KEY, spanish TEXT NOT NULL)')
+  # Repeated sort values: the id breaks the ties
+  connection.executemany('INSERT INTO words (spanish) VALUES (?)', [
+    (spanish,) for spanish in ['uno', 'dos', 'tres', 'dos', 'cuatro', 'uno', 'uno', 'cinco', 'dos', 'seis']
+  ])
+  expected = [row['id'] for row in connection.execute(f'SELECT id FROM words ORDER BY spanish {order}, id {order}')]
+
+  pages = paginate(connection, order, limit)
+  assert [word_id for page in pages for word_id in page] == expected
+  assert all(len(page) == limit for page in pages[:-1])
+  assert pages[-1]
+
+def test_cursor_round_trip():
+  token = encode_cursor('spanish', 'desc', 'mañana', 42)
+  assert decode_cursor(token, 'spanish', 'desc') == ('mañana', 42)
+
+@pytest.mark.parametrize('token, sort_by, order', [
+  (encode_cursor('spanish', 'asc', 'uno', 1), 'english', 'asc'),
+  (encode_cursor('spanish', 'asc', 'uno', 1), 'spanish', 'desc'),
+  (encode_cursor('spanish', 'asc', 'uno', 'x'), 'spanish', 'asc'),
+  ('not a cursor', 'spanish', 'asc'),
+])
+def test_invalid_cursor(token, sort_by, order):
+  with pytest.raises(ValueError):
+    decode_cursor(token, sort_by, order)
@@ -0,0 +1,53 @@
+from lib.response_cache import ResponseCache
+
+def test_etag_revalidation(client):
+  first = client.get('/groups/1')
+  assert first.headers['X-Cache'] == 'MISS'
+  etag = first.headers['ETag']
+
+  second = client.get('/groups/1')
+  assert second.headers['X-Cache'] == 'HIT'
+  assert second.headers['ETag'] == etag
+  assert second.get_data() == first.get_data()
+
+  not_modified = client.get('/groups/1', headers={'If-None-Match': etag})
+  assert not_modified.status_code == 304
+  assert not not_modified.get_data()
+  assert client.get('/groups/1', headers={'If-None-Match': '"other"'}).status_code == 200
+
+def test_query_argument_order_shares_an_entry(client):
+  client.get('/words?page=1&sort_by=english')
+  assert client.get('/words?sort_by=english&page=1').headers['X-Cache'] == 'HIT'
+  assert client.get('/words?sort_by=english&page=2').headers['X-Cache'] == 'MISS'
+
+def test_writes_invalidate_dependent_responses(client, connection):
+  word_id = connection.execute('SELECT word_id FROM word_groups WHERE group_id = 1').fetchone()[0]
+  etag = client.get(f'/words/{word_id}').headers['ETag']
+  activities = client.get('/api/study-activities')
+
+  response = client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1})
+  session_id = response.get_json()['session_id']
+  client.post(f'/api/study-sessions/{session_id}/review', json={'word_id': word_id, 'correct': True})
+
+  word = client.get(f'/words/{word_id}', headers={'If-None-Match': etag})
+  assert word.status_code == 200
+  assert word.headers['X-Cache'] == 'MISS'
+  assert word.headers['ETag'] != etag
+  # Endpoints that don't read the reviews keep their entries
+  assert client.get('/api/study-activities').headers['ETag'] == activities.headers['ETag']
+  assert client.get('/api/study-activities').headers['X-Cache'] == 'HIT'
+
+def test_entries_expire(client, monkeypatch):
+  client.get('/groups')
+  monkeypatch.setattr(ResponseCache, 'TTL', 0)
+  assert client.get('/groups').headers['X-Cache'] == 'MISS'
+
+def test_least_recently_used_entries_are_evicted(app, client):
+  app.response_cache.max_entries = 2
+  client.get('/groups/1')
+  client.get('/groups/2')
+  client.get('/groups/1')
+  client.get('/groups')
+  assert client.get('/groups/1').headers['X-Cache'] == 'HIT'
+  assert client.get('/groups/2').headers['X-Cache'] == 'MISS'
+  assert client.get('/api/cache/stats').get_json()['evictions'] == 2
@@ -0,0 +1,140 @@
+import random
+
+from lib.dashboard_snapshot import apply_session_created
+from lib.reviews import rebuild_rollups, record_review, record_reviews
+
+# The rollups as maintained incrementally and as rebuilt from the history
+# must agree. Timestamps are left out: the incremental ones are taken when
+# each review is written, the rebuilt ones from the review items.
+ROLLUP_QUERIES = [
+  'SELECT word_id, correct_count, wrong_count FROM word_reviews ORDER BY word_id',
+  'SELECT * FROM study_session_word_reviews ORDER BY study_session_id, word_id',
+  '''
+    SELECT study_session_id, review_count, correct_count, wrong_count
+    FROM study_session_summaries ORDER BY study_session_id
+  ''',
+  'SELECT * FROM daily_review_stats ORDER BY group_id, day',
+  '''
+    SELECT total_vocabulary, total_words_studied, mastered_words, correct_reviews,
+      total_reviews, total_sessions, current_streak, last_study_date
+    FROM dashboard_snapshot
+  ''',
+  '''
+    SELECT group_id, word_id, ease, interval_days, repetitions, lapses
+    FROM word_schedules ORDER BY group_id, word_id
+  '''
+]
+
+def read_rollups(cursor):
+  rollups = []
+  for query in ROLLUP_QUERIES:
+    cursor.execute(query)
+    rollups.append([tuple(row) for row in cursor.fetchall()])
+  return rollups
+
+def create_session(cursor, group_id):
+  cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, 1)', (group_id,))
+  apply_session_created(cursor, cursor.lastrowid, group_id)
+  return cursor.lastrowid
+
+def test_incremental_rollups_match_rebuild(connection):
+  cursor = connection.cursor()
+  cursor.execute('SELECT group_id, word_id FROM word_groups')
+  group_words = {}
+  for group_id, word_id in cursor.fetchall():
+    group_words.setdefault(group_id, []).append(word_id)
+
+  rng = random.Random(0)
+  for group_id, word_ids in group_words.items():
+    for _ in range(3):
+      session_id = create_session(cursor, group_id)
+      # Batches repeat words, so their per-word deltas are collapsed
+      record_reviews(cursor, session_id, [
+        (rng.choice(word_ids), rng.random() < 0.7) for _ in range(50)
+      ])
+      for _ in range(10):
+        record_review(cursor, session_id, rng.choice(word_ids), rng.random() < 0.7)
+  # A review of a word outside the session's group has no schedule to move
+  outside = [word_id for other_id, word_ids in group_words.items() if other_id != group_id for word_id in word_ids]
+  record_review(cursor, session_id, (set(outside) - set(group_words[group_id])).pop(), True)
+  connection.commit()
+
+  incremental = read_rollups(cursor)
+  rebuild_rollups(cursor)
+  connection.commit()
+  assert read_rollups(cursor) == incremental
+  assert all(incremental)
+
+def start_session(client, group_id=1):
+  response = client.post('/api/study-sessions', json={'group_id': group_id, 'study_activity_id': 1})
+  return response.get_json()['session_id']
+
+def test_batch_reports_each_item(client, connection):
+  session_id = start_session(client)
+  word_id = connection.execute('SELECT MIN(id) FROM words').fetchone()[0]
+
+  response = client.post(f'/api/study-sessions/{session_id}/reviews:batch', json=[
+    {'word_id': word_id, 'correct': True},
+    {'word_id': word_id, 'is_correct': False},
+    {'word_id': 999999, 'correct': True},
+    {'word_id': 'x', 'correct': True},
+    {'word_id': word_id},
+    'not an object'
+  ])
+  assert response.status_code == 200
+  data = response.get_json()
+  assert (data['recorded'], data['failed']) == (2, 4)
+  assert [item['status'] for item in data['items']] == ['recorded', 'recorded'] + ['error'] * 4
+  assert [item.get('error') for item in data['items'][2:]] == [
+    'Word not found', 'word_id must be an integer', 'correct must be a boolean', 'Review must be a JSON object'
+  ]
+
+  counts = connection.execute('''
+    SELECT correct_count, wrong_count FROM study_session_word_reviews WHERE study_session_id = ?
+  ''', (session_id,)).fetchone()
+  assert tuple(counts) == (1, 1)
+
+def test_batch_accepts_ndjson(client, connection):
+  session_id = start_session(client)
+  word_id = connection.execute('SELECT MIN(id) FROM words').fetchone()[0]
+  body = f'{{"word_id": {word_id}, "correct": true}}\n\nnot json\n{{"word_id": {word_id}, "correct": false}}\n'
+
+  response = client.post(
+    f'/api/study-sessions/{session_id}/reviews:batch', data=body, content_type='application/x-ndjson'
+  )
+  data = response.get_json()
+  assert (data['recorded'], data['failed']) == (2, 1)
+  assert data['items'][1] == {'index': 1, 'status': 'error', 'error': 'Invalid JSON'}
+
+def test_batch_for_missing_session(client):
+  response = client.post('/api/study-sessions/999999/reviews:batch', json=[{'word_id': 1, 'correct': True}])
+  assert response.status_code == 404
+
+def test_batch_is_validated_then_written_in_chunks(app, client, connection, monkeypatch):
+  import routes.study_sessions
+
+  session_id = start_session(client)
+  word_ids = [row[0] for row in connection.execute('SELECT id FROM words')]
+  # Answers flip with each pass over the words
+  reviews = [
+    {'word_id': word_ids[i % len(word_ids)], 'correct': i // len(word_ids) % 2 == 0} for i in range(2500)
+  ]
+
+  # Every chunk is checked against the words table before the write lock is
+  # taken, then all of them are written in the one transaction
+  events = []
+  existing_word_ids, write, record_reviews = app.db.existing_word_ids, app.db.write, routes.study_sessions.record_reviews
+  monkeypatch.setattr(app.db, 'existing_word_ids', lambda ids: events.append('validate') or existing_word_ids(ids))
+  monkeypatch.setattr(app.db, 'write', lambda: events.append('write') or write())
+  monkeypatch.setattr(
+    routes.study_sessions, 'record_reviews',
+    lambda cursor, id, chunk: events.append(len(chunk)) or record_reviews(cursor, id, chunk)
+  )
+
+  data = client.post(f'/api/study-sessions/{session_id}/reviews:batch', json=reviews).get_json()
+  assert data['recorded'] == 2500
+  assert events == ['validate'] * 3 + ['write', 1000, 1000, 500]
+  review_count = connection.execute(
+    'SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ?', (session_id,)
+  ).fetchone()[0]
+  assert review_count == 2500
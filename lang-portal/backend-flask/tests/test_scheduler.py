@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from lib.scheduler import (
+  DEFAULT_EASE, MAX_INTERVAL_DAYS, MIN_EASE, RELEARN_DELAY, next_schedule, rebuild_schedules, replay_reviews,
+  reset_schedules
+)
+
+REVIEWED_AT = datetime(2025, 1, 1, 12, 0, 0)
+
+def test_correct_answers_grow_the_interval():
+  schedule = (DEFAULT_EASE, 0, 0, 0)
+  intervals = []
+  for _ in range(4):
+    schedule, due_at = next_schedule(schedule, True, REVIEWED_AT)
+    intervals.append(schedule[1])
+    assert due_at == REVIEWED_AT + timedelta(days=schedule[1])
+  assert intervals[:2] == [1, 6]
+  assert intervals[2] == round(6 * schedule[0], 2)
+  assert schedule[2] == 4
+
+def test_wrong_answer_relearns_soon_and_lowers_ease():
+  schedule, _ = next_schedule((DEFAULT_EASE, 6, 2, 0), True, REVIEWED_AT)
+  schedule, due_at = next_schedule(schedule, False, REVIEWED_AT)
+  ease, interval_days, repetitions, lapses = schedule
+  assert (interval_days, repetitions, lapses) == (0, 0, 1)
+  assert ease < DEFAULT_EASE
+  assert due_at == REVIEWED_AT + RELEARN_DELAY
+
+def test_ease_and_interval_are_bounded():
+  schedule = (MIN_EASE, 0, 0, 0)
+  for _ in range(10):
+    schedule, _ = next_schedule(schedule, False, REVIEWED_AT)
+  assert schedule[0] == MIN_EASE
+  for _ in range(100):
+    schedule, _ = next_schedule(schedule, True, REVIEWED_AT)
+  assert schedule[1] == MAX_INTERVAL_DAYS
+
+def test_replaying_in_ranges_matches_one_pass(connection):
+  cursor = connection.cursor()
+  cursor.execute('SELECT group_id, word_id FROM word_groups ORDER BY group_id, word_id')
+  memberships = cursor.fetchall()
+  group_id = memberships[0]['group_id']
+  word_ids = [row['word_id'] for row in memberships if row['group_id'] == group_id][:5]
+  cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, 1)', (group_id,))
+  session_id = cursor.lastrowid
+  cursor.executemany('''
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)
+  ''', [
+    (word_ids[i % len(word_ids)], session_id, i % 3 != 0, f'2025-01-{1 + i // 5:02d} 10:00:00')
+    for i in range(40)
+  ])
+
+  query = 'SELECT * FROM word_schedules ORDER BY group_id, word_id'
+  rebuild_schedules(cursor)
+  one_pass = [tuple(row) for row in cursor.execute(query)]
+
+  reset_schedules(cursor)
+  for first_id in range(0, 40, 7):
+    replay_reviews(cursor, first_id, first_id + 7)
+  in_ranges = [tuple(row) for row in cursor.execute(query)]
+
+  # Words never reviewed are due at the time of each reset, so compare the rest
+  reviewed = lambda rows: [row for row in rows if row[-1] is not None]
+  assert reviewed(in_ranges) == reviewed(one_pass)
+  assert len(reviewed(one_pass)) == len(word_ids)
@@ -0,0 +1,43 @@
+def search(client, q, **args):
+  response = client.get('/words/search', query_string=dict(args, q=q))
+  assert response.status_code == 200
+  return response.get_json()
+
+def test_prefix_search_ranks_the_spanish_word_first(client):
+  data = search(client, 'habl')
+  assert data['match'] == 'fulltext'
+  assert data['words'][0]['spanish'] == 'hablar'
+
+def test_search_ignores_accents(client):
+  assert search(client, 'increible')['words'][0]['spanish'] == 'increíble'
+  assert search(client, 'pequeno')['words'][0]['spanish'] == 'pequeño'
+
+def test_misspellings_fall_back_to_fuzzy_search(client):
+  data = search(client, 'habalr')
+  assert data['match'] == 'fuzzy'
+  assert 'hablar' in [word['spanish'] for word in data['words'][:3]]
+
+def test_search_pages(client):
+  first = search(client, 'to', per_page=5)
+  second = search(client, 'to', per_page=5, page=2)
+  assert first['total'] == second['total'] > 10
+  assert len(first['words']) == len(second['words']) == 5
+  assert not {word['id'] for word in first['words']} & {word['id'] for word in second['words']}
+
+def test_search_indexes_follow_word_changes(app, client, connection):
+  # Written straight to the database: the triggers keep the indexes in step
+  connection.execute('''
+    INSERT INTO words (spanish, pronunciation, english, parts_of_speech)
+    VALUES ('murciélago', 'moor-SYEH-lah-goh', 'bat', '{}')
+  ''')
+  connection.commit()
+  assert search(client, 'murcielago')['words'][0]['spanish'] == 'murciélago'
+
+  connection.execute("UPDATE words SET spanish = 'vampiro' WHERE spanish = 'murciélago'")
+  connection.commit()
+  app.response_cache.invalidate('words')
+  assert 'murciélago' not in [word['spanish'] for word in search(client, 'murcielago')['words']]
+  assert search(client, 'vampiro')['words'][0]['english'] == 'bat'
+
+def test_search_needs_a_query(client):
+  assert client.get('/words/search?q=').status_code == 400
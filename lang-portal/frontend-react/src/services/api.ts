@@ -182,12 +182,12 @@ export const submitStudySessionReview = async (
   sessionId: number,
   reviews: WordReview[]
 ): Promise<void> => {
-  const response = await fetch(`${API_BASE_URL}/study_sessions/${sessionId}/review`, {
+  const response = await fetch(`${API_BASE_URL}/api/study-sessions/${sessionId}/reviews:batch`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
     },
-    body: JSON.stringify({ reviews }),
+    body: JSON.stringify(reviews),
   });
   if (!response.ok) {
     throw new Error('Failed to submit study session review');
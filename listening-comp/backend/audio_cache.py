@@ -0,0 +1,144 @@
+import os
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+class AudioCache:
+    """Content-addressed, size-bounded LRU cache of synthesized speech on disk"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        # key -> lock held while the key is being synthesized, so concurrent
+        # requests for the same line wait for one synthesis instead of each
+        # calling TTS
+        self.pending = {}
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "coalesced": 0}
+
+        # Entries left by earlier runs, oldest first by last use
+        existing = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".mp3") and os.path.isfile(path):
+                stat = os.stat(path)
+                existing.append((stat.st_mtime, name[:-4], stat.st_size))
+            elif name.endswith(".tmp"):
+                # Interrupted write
+                os.remove(path)
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+            self.total_bytes += size
+        with self.lock:
+            self._evict()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Cache key of the audio for the given (text, voice, language, format, ...)"""
+        digest = hashlib.sha256()
+        for part in parts:
+            encoded = part.encode("utf-8")
+            # Length-prefixed so ("ab", "c") and ("a", "bc") differ
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self.path(key), "rb") as file:
+                audio = file.read()
+        except FileNotFoundError:
+            # Removed from disk behind our back
+            with self.lock:
+                size = self.entries.pop(key, None)
+                if size is not None:
+                    self.total_bytes -= size
+            return None
+        # Keep the modification time as the last use, for the order on restart
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        # Written under a unique name and renamed, so readers never see a
+        # partial file
+        temp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.tmp")
+        with open(temp_path, "wb") as file:
+            file.write(audio)
+        os.replace(temp_path, self.path(key))
+        with self.lock:
+            self.total_bytes += len(audio) - self.entries.pop(key, 0)
+            self.entries[key] = len(audio)
+            self._evict()
+
+    def get_or_create(self, key: str, create: Callable[[], bytes]) -> bytes:
+        """Return the cached audio for key, calling create() on a miss"""
+        audio = self.get(key)
+        if audio is not None:
+            with self.lock:
+                self.counters["hits"] += 1
+            return audio
+
+        with self.lock:
+            key_lock = self.pending.get(key)
+            if key_lock is None:
+                key_lock = self.pending[key] = threading.Lock()
+                waited = False
+            else:
+                waited = True
+        with key_lock:
+            try:
+                if waited:
+                    audio = self.get(key)
+                    if audio is not None:
+                        with self.lock:
+                            self.counters["coalesced"] += 1
+                        return audio
+                with self.lock:
+                    self.counters["misses"] += 1
+                audio = create()
+                self.put(key, audio)
+                return audio
+            finally:
+                with self.lock:
+                    if self.pending.get(key) is key_lock:
+                        del self.pending[key]
+
+    def _evict(self):
+        # Called with the lock held
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.counters["evictions"] += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["coalesced"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                entries=len(self.entries),
+                bytes=self.total_bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=(self.counters["hits"] + self.counters["coalesced"]) / lookups if lookups else None
+            )
@@ -0,0 +1,65 @@
+# Benchmark conversation audio generation (polly.generate_conversation_audio)
+# offline, with the local TTS backend standing in for Polly.
+#
+#   python benchmark_audio.py --lines 12 --latency 0.4 --workers 4
+#
+# Run it with --workers 1 to compare against line-by-line synthesis. The
+# first run synthesizes every line; later ones are served by the audio cache.
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+SAMPLE_LINES = [
+    ("Narrador", "Vamos a escuchar una conversación entre dos compañeros de piso y una vecina."),
+    ("Interlocutor1", "¡Ay, buenos días, señora Carmen! ¿Qué tal?"),
+    ("Interlocutor2", "Buenos días, chicos. Pues, la verdad, no muy bien. Llevo toda la noche sin poder dormir."),
+]
+
+def sample_conversation(lines: int) -> list:
+    # Every line distinct, so the first run synthesizes each of them
+    conversation = []
+    for i in range(lines):
+        speaker, text = SAMPLE_LINES[i % len(SAMPLE_LINES)]
+        conversation.append({"speaker": speaker, "text": f"{text} ({i + 1})"})
+    return conversation
+
+async def run(args, directory: str):
+    # Imported here so the settings in the environment are read by the module
+    from polly import generate_conversation_audio, get_audio_cache
+
+    conversation = sample_conversation(args.lines)
+    timings = []
+    for run_number in range(args.runs):
+        output_path = os.path.join(directory, f"conversation_{run_number}.mp3")
+        started = time.perf_counter()
+        if not await generate_conversation_audio(conversation, output_path, backend="local"):
+            raise RuntimeError("Audio generation failed")
+        timings.append(time.perf_counter() - started)
+        print(f"Run {run_number + 1}: {timings[-1]:.2f}s")
+    stats = get_audio_cache().stats()
+    print(
+        f"{args.lines} lines, {args.latency:.2f}s TTS latency, {args.workers} workers: "
+        f"cold {timings[0]:.2f}s, cached median {statistics.median(timings[1:]):.2f}s"
+    )
+    print(f"Audio cache: {stats['hits']} hits, {stats['coalesced']} coalesced, {stats['misses']} misses")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversation audio generation offline")
+    parser.add_argument("--lines", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.4, help="simulated seconds per TTS request")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["LOCAL_TTS_LATENCY"] = str(args.latency)
+        os.environ["TTS_MAX_WORKERS"] = str(args.workers)
+        os.environ["AUDIO_CACHE_DIR"] = os.path.join(directory, "audio_cache")
+        asyncio.run(run(args, directory))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import json
+from typing import Dict, List
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils import embedding_functions
+
+# Local embedding model for practices: Chroma's bundled ONNX MiniLM by
+# default, or any sentence-transformers model named in EMBEDDING_MODEL (a
+# multilingual one such as paraphrase-multilingual-MiniLM-L12-v2 suits the
+# Spanish content better, at the cost of installing sentence-transformers)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+
+def practice_text(content: Dict) -> str:
+    """The exercise text of a practice: what makes two practices alike"""
+    parts = []
+    for part in content.get("conversation", []):
+        parts.append(part.get("text", ""))
+    if content.get("text"):
+        parts.append(content["text"])
+    questions = content.get("questions", [])
+    if content.get("question"):
+        questions = questions + [content["question"]]
+    for question in questions:
+        parts.append(question.get("text") or question.get("question", ""))
+        parts.extend(question.get("options", []))
+    return "\n".join(part for part in parts if part)
+
+class PracticeEmbeddingFunction(EmbeddingFunction):
+    """Embeds stored practice documents (JSON) by their exercise text
+
+    Set on the practice collection, so everything Chroma embeds there,
+    on add, update or query, goes through the same model and text.
+    """
+
+    def __init__(self):
+        if EMBEDDING_MODEL:
+            self.model = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
+        else:
+            self.model = embedding_functions.DefaultEmbeddingFunction()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = []
+        for document in input:
+            try:
+                texts.append(practice_text(json.loads(document)))
+            except (ValueError, AttributeError):
+                # Not a practice document: embed it as it is
+                texts.append(document)
+        return self.model(texts)
+
+    def embed_practice(self, content: Dict) -> List[float]:
+        return self.model([practice_text(content)])[0]
@@ -1,43 +1,167 @@
 import os
 import json
+import threading
+from typing import Callable, Dict, List, Literal
 import google.generativeai as genai
 from dotenv import load_dotenv
-from datetime import datetime
-
-def generate_listening_gemini(transcript_text: str, num_questions: int = 5):
-    # Load environment variables from .env file
-    load_dotenv()
-
-    # Configure the Gemini API
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-    # Define the model generation configuration
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 0.95,
-        "top_k": 64,
-        "max_output_tokens": 512,
-    }
-
-    # Initialize the Gemini model
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash",
-        generation_config=generation_config,
+from pydantic import BaseModel, Field, ValidationError
+
+# Exercises are generated in batches: one structured-output call (JSON mode
+# with a response schema) asks for several exercises, each is validated on
+# its own, and only the malformed ones are asked for again, one at a time.
+
+LISTENING_MODEL = "gemini-2.0-flash"
+READING_MODEL = "gemini-2.0-flash"
+# Output tokens allowed per exercise in a batch
+LISTENING_TOKENS_PER_EXERCISE = 512
+READING_TOKENS_PER_EXERCISE = 2048
+# Times a malformed exercise is asked for again on its own
+MAX_ITEM_RETRIES = 2
+
+class ConversationPart(BaseModel):
+    speaker: Literal["Narrador", "Interlocutor1", "Interlocutor2"]
+    text: str = Field(min_length=1)
+
+class ListeningQuestion(BaseModel):
+    text: str = Field(min_length=1)
+    options: List[str] = Field(min_length=3, max_length=3)
+    correctAnswer: int = Field(ge=0, le=2)
+
+class ListeningExercise(BaseModel):
+    conversation: List[ConversationPart] = Field(min_length=3, max_length=3)
+    question: ListeningQuestion
+
+class ReadingQuestion(BaseModel):
+    question: str = Field(min_length=1)
+    options: List[str] = Field(min_length=3, max_length=3)
+    correctAnswer: int = Field(ge=0, le=2)
+
+class ReadingExercise(BaseModel):
+    text: str = Field(min_length=1)
+    questions: List[ReadingQuestion] = Field(min_length=3, max_length=3)
+
+# Response schemas for Gemini's structured output, matching the models above
+def _object_schema(properties: Dict) -> Dict:
+    return {"type": "OBJECT", "properties": properties, "required": list(properties)}
+
+def _options_schema() -> Dict:
+    return {"type": "ARRAY", "items": {"type": "STRING"}}
+
+LISTENING_SCHEMA = {
+    "type": "ARRAY",
+    "items": _object_schema({
+        "conversation": {
+            "type": "ARRAY",
+            "items": _object_schema({
+                "speaker": {"type": "STRING", "enum": ["Narrador", "Interlocutor1", "Interlocutor2"]},
+                "text": {"type": "STRING"},
+            }),
+        },
+        "question": _object_schema({
+            "text": {"type": "STRING"},
+            "options": _options_schema(),
+            "correctAnswer": {"type": "INTEGER"},
+        }),
+    }),
+}
+
+READING_SCHEMA = {
+    "type": "ARRAY",
+    "items": _object_schema({
+        "text": {"type": "STRING"},
+        "questions": {
+            "type": "ARRAY",
+            "items": _object_schema({
+                "question": {"type": "STRING"},
+                "options": _options_schema(),
+                "correctAnswer": {"type": "INTEGER"},
+            }),
+        },
+    }),
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(model_name: str):
+    # Configured once and shared across calls: the model holds no per-call state
+    with _models_lock:
+        if not _models:
+            # Load environment variables from .env file
+            load_dotenv()
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        if model_name not in _models:
+            _models[model_name] = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config={
+                    "temperature": 0.7,
+                    "top_p": 0.95,
+                    "top_k": 64,
+                    "response_mime_type": "application/json",
+                },
+            )
+        return _models[model_name]
+
+def _request(model_name: str, prompt: str, schema: Dict, max_output_tokens: int) -> List:
+    response = get_model(model_name).generate_content(
+        prompt,
+        generation_config={"response_schema": schema, "max_output_tokens": max_output_tokens},
     )
+    items = json.loads(response.text)
+    if not isinstance(items, list):
+        raise ValueError("Response is not a JSON array")
+    return items
+
+def _generate_batch(
+    count: int,
+    prompt: Callable[[int], str],
+    model_name: str,
+    schema: Dict,
+    tokens_per_exercise: int,
+    exercise_model,
+) -> List[Dict]:
+    """Generate count exercises in one call, then retry malformed ones singly"""
+    exercises = []
+    try:
+        items = _request(model_name, prompt(count), schema, tokens_per_exercise * count)
+    except ValueError as e:
+        # A truncated or unparseable batch: every exercise is retried
+        print(f"Batch of {count} exercises was malformed: {e}")
+        items = []
+
+    for item in items[:count]:
+        try:
+            exercises.append(exercise_model.model_validate(item).model_dump())
+        except ValidationError as e:
+            print(f"Discarding malformed exercise ({e.error_count()} errors)")
 
-    # Define the prompt in English
-    prompt = f"""
+    for _ in range(count - len(exercises)):
+        for attempt in range(MAX_ITEM_RETRIES + 1):
+            try:
+                item = _request(model_name, prompt(1), schema, tokens_per_exercise)[0]
+                exercises.append(exercise_model.model_validate(item).model_dump())
+                break
+            except (ValueError, IndexError) as e:
+                # ValidationError is a ValueError
+                print(f"Attempt {attempt + 1} at a single exercise was malformed: {e}")
+
+    if not exercises:
+        raise ValueError("Invalid response format: no valid exercise generated")
+    return exercises
+
+def _listening_prompt(transcript_text: str, level: str, count: int) -> str:
+    return f"""
 Your task is to help a student prepare for the Spanish DELE exam. Using the transcript provided
-below, generate a NEW and SHORT conversation in Spanish along with one unique B2-level listening
-comprehension question. The conversation should consist of three parts with distinct voices: -
-Narrator (Narrador) - Interlocutor1 (choose either male or female) - Interlocutor2 (the opposite
-gender of Interlocutor1)
+below, generate {count} NEW and SHORT conversations in Spanish, each along with one unique
+{level}-level listening comprehension question. Each conversation should consist of three parts
+with distinct voices: - Narrator (Narrador) - Interlocutor1 (choose either male or female) -
+Interlocutor2 (the opposite gender of Interlocutor1)
 
-After the conversation, create one listening comprehension question that includes: - A question text
-in Spanish. - Three answer options labeled A, B, and C. - The correct answer indicated as an index
-(0 for A, 1 for B, or 2 for C).
+After each conversation, create one listening comprehension question that includes: - A question
+text in Spanish. - Three answer options. - The correct answer indicated as an index (0 for the
+first option, 1 for the second, or 2 for the third).
 
-Return your response strictly as a JSON string with the exact following structure, ensuring that all
+Return a JSON array of {count} exercises, each with the following structure, ensuring that all
 text (conversation and question) is in Spanish:
 
 {{
@@ -51,65 +175,16 @@ text (conversation and question) is in Spanish:
     }}
 }}
 
-Use the transcript provided below as inspiration. The exercise and question should always be unique.
+Use the transcript provided below as inspiration. The exercises and questions should always be
+unique and different from each other.
 
 Transcript: {transcript_text}
 """
 
-    # Start a chat session and send the prompt
-    chat_session = model.start_chat()
-    response = chat_session.send_message(prompt)
-
-    # Extract the response text and clean it
-    response_text = response.text.strip()
-
-    # Remove markdown artifacts if they exist
-    if response_text.startswith("```json"):
-        response_text = response_text[7:-3].strip()
-    elif response_text.startswith("```"):
-        response_text = response_text[3:-3].strip()
-
-    # Parse the JSON response to validate it
-    try:
-        json_response = json.loads(response_text)
-        # Validate the structure
-        assert "conversation" in json_response, "Missing conversation field"
-        assert "question" in json_response, "Missing question field"
-        assert len(json_response["conversation"]) == 3, "Conversation must have exactly 3 parts"
-        assert all(["speaker" in part and "text" in part for part in json_response["conversation"]]), "Invalid conversation structure"
-        assert all([key in json_response["question"] for key in ["text", "options", "correctAnswer"]]), "Invalid question structure"
-        assert len(json_response["question"]["options"]) == 3, "Question must have exactly 3 options"
-        
-        # Return the validated JSON string
-        return json.dumps(json_response, ensure_ascii=False, indent=2)
-    except (json.JSONDecodeError, AssertionError) as e:
-        raise ValueError(f"Invalid response format: {str(e)}")
-
-def generate_reading_gemini():
-    # Load environment variables from .env file
-    load_dotenv()
-
-    # Configure the Gemini API
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-    # Define the model generation configuration
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 0.95,
-        "top_k": 64,
-        "max_output_tokens": 2048,
-    }
-
-    # Initialize the Gemini model
-    model = genai.GenerativeModel(
-        model_name="gemini-pro",
-        generation_config=generation_config,
-    )
-
-    # Define the prompt
-    prompt = """
-Your task is to help a student prepare for the Spanish DELE exam by creating a reading comprehension
-exercise in Spanish. You must generate the following:
+def _reading_prompt(level: str, count: int) -> str:
+    return f"""
+Your task is to help a student prepare for the Spanish DELE exam by creating {count} {level}-level
+reading comprehension exercises in Spanish. For each exercise, generate the following:
 
 1. A SHORT reading passage written in Spanish. The passage must be formatted in Markdown (including
    headings, paragraphs, etc.) and should cover an interesting everyday topic.
@@ -117,63 +192,56 @@ exercise in Spanish. You must generate the following:
    should include: - A question text. - Three answer options. - The correct answer indicated as an
    index (0 for the first option, 1 for the second, or 2 for the third).
 
-Return your response strictly as a JSON string with the exact following structure (ensure the text
+Return a JSON array of {count} exercises, each with the following structure (ensure the text
 remains in Spanish):
 
-{
+{{
   "text": "<markdown formatted reading passage in Spanish>", "questions": [
-    {
+    {{
       "question": "<question text in Spanish>", "options": ["<option A>", "<option B>", "<option
       C>"], "correctAnswer": <index of correct answer: 0, 1, or 2>
-    }, {
+    }}, {{
       "question": "<question text in Spanish>", "options": ["<option A>", "<option B>", "<option
       C>"], "correctAnswer": <index of correct answer: 0, 1, or 2>
-    }, {
+    }}, {{
       "question": "<question text in Spanish>", "options": ["<option A>", "<option B>", "<option
       C>"], "correctAnswer": <index of correct answer: 0, 1, or 2>
-    }
+    }}
   ]
-}
+}}
 
-Do not include any explanations or additional text. The exercise and questions should always be
-unique.
+The exercises and questions should always be unique, each passage on a different topic.
 """
 
-    # Start a chat session and send the prompt
-    chat_session = model.start_chat()
-    response = chat_session.send_message(prompt)
+def generate_listening_batch(transcript_text: str, count: int, level: str = "B2") -> List[Dict]:
+    return _generate_batch(
+        count,
+        lambda n: _listening_prompt(transcript_text, level, n),
+        LISTENING_MODEL,
+        LISTENING_SCHEMA,
+        LISTENING_TOKENS_PER_EXERCISE,
+        ListeningExercise,
+    )
 
-    # Extract the response text and clean it
-    response_text = response.text.strip()
+def generate_reading_batch(count: int, level: str = "B2") -> List[Dict]:
+    return _generate_batch(
+        count,
+        lambda n: _reading_prompt(level, n),
+        READING_MODEL,
+        READING_SCHEMA,
+        READING_TOKENS_PER_EXERCISE,
+        ReadingExercise,
+    )
 
-    # Remove markdown artifacts if they exist
-    if response_text.startswith("```json"):
-        response_text = response_text[7:-3].strip()
-    elif response_text.startswith("```"):
-        response_text = response_text[3:-3].strip()
+def generate_listening_gemini(transcript_text: str, level: str = "B2"):
+    # One exercise, as a JSON string
+    exercise = generate_listening_batch(transcript_text, 1, level)[0]
+    return json.dumps(exercise, ensure_ascii=False, indent=2)
 
-    # Parse the JSON response to validate it
-    try:
-        json_response = json.loads(response_text)
-        # Validate the structure
-        assert "text" in json_response, "Missing text field"
-        assert "questions" in json_response, "Missing questions field"
-        assert len(json_response["questions"]) == 3, "Must have exactly 3 questions"
-        for q in json_response["questions"]:
-            assert all([key in q for key in ["question", "options", "correctAnswer"]]), "Invalid question structure"
-            assert len(q["options"]) == 3, "Each question must have exactly 3 options"
-            assert isinstance(q["correctAnswer"], int), "correctAnswer must be an integer"
-            assert 0 <= q["correctAnswer"] <= 2, "correctAnswer must be 0, 1, or 2"
-        
-        # Add metadata for storage
-        json_response["type"] = "reading"
-        json_response["timestamp"] = datetime.now().isoformat()
-        json_response["id"] = f"reading_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Return the validated JSON string
-        return json.dumps(json_response, ensure_ascii=False, indent=2)
-    except (json.JSONDecodeError, AssertionError) as e:
-        raise ValueError(f"Invalid response format: {str(e)}")
+def generate_reading_gemini(level: str = "B2"):
+    # One exercise, as a JSON string
+    exercise = generate_reading_batch(1, level)[0]
+    return json.dumps(exercise, ensure_ascii=False, indent=2)
 
 def test_gemini():
     try:
@@ -181,17 +249,21 @@ def test_gemini():
         print("\nTesting reading generation:")
         reading_output = generate_reading_gemini()
         print(reading_output)
-        
+
         # Test listening generation
         print("\nTesting listening generation:")
         sample_text = "Sample transcript text for testing..."
         listening_output = generate_listening_gemini(sample_text)
         print(listening_output)
-        
+
+        # Test batched generation
+        print("\nTesting batched reading generation:")
+        print(json.dumps(generate_reading_batch(3), ensure_ascii=False, indent=2))
+
         return True
     except Exception as e:
         print(f"Error in test: {e}")
         return False
 
 if __name__ == "__main__":
-    test_gemini()
\ No newline at end of file
+    test_gemini()
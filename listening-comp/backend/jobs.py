@@ -0,0 +1,135 @@
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+class Job:
+    """A queued unit of work, with the progress events it has reported"""
+
+    def __init__(self, key: str, run: Callable[["Job"], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.run = run
+        self.status = "queued"  # queued, running, done or failed
+        self.stage = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._changed = asyncio.Event()
+        self.events = [self.snapshot(include_result=False)]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def _notify(self):
+        self.events.append(self.snapshot(include_result=False))
+        # Wake every waiter, then start a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def report(self, stage: str):
+        """Record that the job has reached the given stage"""
+        self.stage = stage
+        self._notify()
+
+    async def wait_for_change(self, after: int, timeout: float):
+        """Wait until there are more than `after` events, or the timeout ends"""
+        if len(self.events) > after:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def snapshot(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {"job_id": self.id, "status": self.status, "stage": self.stage}
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+class JobQueue:
+    """In-process job queue worked by a fixed number of asyncio workers
+
+    Submitting a job whose key matches a queued or running job returns that
+    job instead, so duplicate requests share one piece of work. Finished jobs
+    are kept for `retention` seconds so their results can be collected.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 100, retention: float = 3600):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.jobs: Dict[str, Job] = {}
+        self.in_flight: Dict[str, Job] = {}  # key -> queued or running job
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks = []
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, key: str, run: Callable[[Job], Awaitable[Any]]) -> Job:
+        """Queue run(job) unless a job with the same key is in flight"""
+        self._prune()
+        job = self.in_flight.get(key)
+        if job is not None:
+            return job
+        if self.queue.qsize() >= self.max_queued:
+            raise RuntimeError("Too many queued jobs, try again later")
+        job = Job(key, run)
+        self.jobs[job.id] = job
+        self.in_flight[key] = job
+        self.queue.put_nowait(job)
+        return job
+
+    def add_finished(self, key: str, result: Any) -> Job:
+        """Register work done without queueing it, as a finished job, so its
+        result is collected the same way as a queued job's"""
+        self._prune()
+        job = Job(key, None)
+        job.result = result
+        job.status = "done"
+        job.stage = "done"
+        job.finished_at = time.time()
+        job.events = [job.snapshot(include_result=False)]
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def _work(self):
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job._notify()
+            try:
+                job.result = await job.run(job)
+                job.status = "done"
+                job.stage = "done"
+            except Exception as e:
+                print(f"Job {job.id} ({job.key}) failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+                job._notify()
+                self.queue.task_done()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
@@ -1,18 +1,62 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
 import json
-from datetime import datetime
-from typing import Optional, List, Dict, Any
-from gemini_question_generator import generate_listening_gemini, generate_reading_gemini
-from polly import generate_conversation_audio
-from transcript_utils import get_transcript_text
-from vector_store import VectorStore
+import asyncio
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from gemini_question_generator import generate_listening_batch, generate_reading_batch
+from stub_generator import generate_listening_batch_stub, generate_reading_batch_stub
+from polly import generate_conversation_audio, get_audio_cache
+from transcript_utils import get_transcript_excerpt
+from vector_store import VectorStore, new_practice_id
+from jobs import Job, JobQueue
+from practice_pool import PracticePool
+
+PRACTICE_TYPES = ["listening", "reading"]
+PRACTICE_LEVELS = os.getenv("PRACTICE_LEVELS", "B2").split(",")
+# Generations run at the same time; more requests wait in the queue
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+SSE_KEEPALIVE_SECONDS = 15
+MAX_PAGE_SIZE = 100
+# Exercise text generators: "gemini", or "stub" to run offline
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# A generated practice at least this similar (cosine) to a stored one of the
+# same type and level is regenerated, up to MAX_DUPLICATE_RETRIES times (at 1
+# only exact duplicates are). Stub exercises share one template, so they are
+# all near-duplicates of each other: only exact ones are rejected by default.
+DUPLICATE_SIMILARITY_THRESHOLD = float(
+    os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "1" if LLM_BACKEND == "stub" else "0.95")
+)
+MAX_DUPLICATE_RETRIES = 2
+MAX_SIMILAR = 20
+# Tokens of transcript put in a listening prompt. The slice is random (no
+# query): the transcript only inspires new conversations, so variety between
+# prompts matters more than relevance to anything.
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "1500"))
+
+GENERATORS = {
+    "gemini": (generate_listening_batch, generate_reading_batch),
+    "stub": (generate_listening_batch_stub, generate_reading_batch_stub),
+}
+generate_listening, generate_reading = GENERATORS[LLM_BACKEND]
+# Exercises asked of the LLM per call; the ones not used yet are kept for the
+# next practices of the same type and level
+GENERATION_BATCH_SIZE = int(os.getenv("GENERATION_BATCH_SIZE", "3"))
+
+# Pre-generated practices kept ready per type and level (0 disables the
+# pool), refilled when fewer than POOL_LOW_WATERMARK are left, generating at
+# most one every POOL_MIN_INTERVAL_SECONDS
+POOL_SIZE = int(os.getenv("POOL_SIZE", "3"))
+POOL_LOW_WATERMARK = int(os.getenv("POOL_LOW_WATERMARK", "1"))
+POOL_MIN_INTERVAL_SECONDS = float(os.getenv("POOL_MIN_INTERVAL_SECONDS", "5"))
 
 app = FastAPI()
 vector_store = VectorStore()
+job_queue = JobQueue(workers=GENERATION_WORKERS)
 
 # Configure CORS
 app.add_middleware(
@@ -28,78 +72,228 @@ app.mount("/static_audio", StaticFiles(directory="static_audio"), name="static_a
 
 class GenerateRequest(BaseModel):
     type: str
+    level: str = "B2"
 
 class SavedPractice(BaseModel):
     id: str
     type: str
+    level: str
     title: str
     timestamp: str
-    content: Dict[str, Any]
 
-@app.post("/generate")
+class SimilarPractice(SavedPractice):
+    similarity: float
+
+class SavedPracticesPage(BaseModel):
+    practices: List[SavedPractice]
+    next_cursor: Optional[str] = None
+
+# Generated exercise texts not used yet, and a lock per (type, level) so
+# concurrent generations share one batch call
+text_buffers: Dict[Tuple[str, str], deque] = {}
+text_buffer_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+async def generate_batch(practice_type: str, level: str, report: Callable[[str], None]) -> List[Dict[str, Any]]:
+    if practice_type == "listening":
+        # Use the static YouTube video for transcript
+        report("transcript")
+        static_video_url = "https://youtu.be/uQk7-sSRljc"
+        transcript_text = await asyncio.to_thread(
+            get_transcript_excerpt, static_video_url, language="es", token_budget=TRANSCRIPT_TOKEN_BUDGET
+        )
+        if not transcript_text:
+            raise Exception("Could not fetch transcript from static video")
+
+        # Generate listening practices
+        report("text")
+        print(f"Generating {GENERATION_BATCH_SIZE} listening practices with transcript...")
+        return await asyncio.to_thread(generate_listening, transcript_text, GENERATION_BATCH_SIZE, level=level)
+
+    # Generate reading practices
+    report("text")
+    return await asyncio.to_thread(generate_reading, GENERATION_BATCH_SIZE, level=level)
+
+async def generate_text(practice_type: str, level: str, report: Callable[[str], None]) -> Dict[str, Any]:
+    key = (practice_type, level)
+    buffer = text_buffers.setdefault(key, deque())
+    lock = text_buffer_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        if not buffer:
+            buffer.extend(await generate_batch(practice_type, level, report))
+        else:
+            report("text")
+        return buffer.popleft()
+
+async def create_practice(practice_type: str, level: str, report: Callable[[str], None]) -> Tuple[Dict[str, Any], List[float]]:
+    # The generation pipeline, run by the job queue's workers and the pool's
+    # refill task; report is called with each stage reached. Each blocking
+    # step (transcript fetch, Gemini, embedding) runs in a thread so the event
+    # loop keeps serving other clients meanwhile. Returns the practice and its
+    # embedding, for store_practice.
+
+    # Near-duplicates of stored practices are regenerated, before any audio
+    # is synthesized for them
+    for attempt in range(MAX_DUPLICATE_RETRIES + 1):
+        content = await generate_text(practice_type, level, report)
+        nearest_id, similarity, embedding = await asyncio.to_thread(
+            vector_store.nearest_practice, content, practice_type, level
+        )
+        if similarity < DUPLICATE_SIMILARITY_THRESHOLD:
+            break
+        print(f"Generated practice is a near-duplicate of {nearest_id} (similarity {similarity:.3f}), regenerating...")
+    else:
+        raise Exception("Could not generate a practice distinct from the stored ones")
+
+    # Create a unique ID for this practice
+    content["id"] = new_practice_id(practice_type)
+
+    if practice_type == "listening":
+        # Generate audio for the conversation
+        report("audio")
+        print("Content generated successfully, now generating audio...")
+        audio_path = await generate_conversation_audio(
+            content["conversation"],
+            f"static_audio/{content['id']}.mp3"
+        )
+        print("Audio generation completed. Path:", audio_path)
+        if not audio_path:
+            raise Exception("Audio generation failed")
+        # Add audio path to content
+        content["audioPath"] = f"/static_audio/{os.path.basename(audio_path)}"
+    return content, embedding
+
+async def build_practice(practice_type: str, level: str, job: Job) -> Dict[str, Any]:
+    content, embedding = await create_practice(practice_type, level, job.report)
+
+    # Store in vector database
+    practice_id = await asyncio.to_thread(
+        vector_store.store_practice, content, practice_type, level, False, embedding
+    )
+    if not practice_id:
+        raise Exception("Failed to store practice")
+    job.report("stored")
+    return content
+
+practice_pool = PracticePool(
+    vector_store,
+    lambda practice_type, level: create_practice(practice_type, level, lambda stage: None),
+    [(practice_type, level) for practice_type in PRACTICE_TYPES for level in PRACTICE_LEVELS],
+    size=POOL_SIZE,
+    low_watermark=POOL_LOW_WATERMARK,
+    min_interval=POOL_MIN_INTERVAL_SECONDS
+)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    job_queue.start()
+    if POOL_SIZE > 0:
+        await practice_pool.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await practice_pool.stop()
+    await job_queue.stop()
+
+@app.post("/generate", status_code=202)
 async def generate_practice(request: GenerateRequest):
+    # Always returns a job, with 202: a pre-generated practice, when one is
+    # ready, comes as a job that is already done, with the practice as its
+    # result. Otherwise the generation is queued and its job returned at
+    # once; follow it with GET /jobs/{job_id} or GET /jobs/{job_id}/events.
+    # A request for a type and level already being generated joins that job.
+    if request.type not in PRACTICE_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid practice type")
+    if request.level not in PRACTICE_LEVELS:
+        raise HTTPException(status_code=400, detail="Invalid practice level")
+
+    if POOL_SIZE > 0:
+        content = await practice_pool.take(request.type, request.level)
+        if content is not None:
+            return job_queue.add_finished(f"{request.type}:{request.level}", content).snapshot()
+
     try:
-        if request.type == "listening":
-            # Use the static YouTube video for transcript
-            static_video_url = "https://youtu.be/uQk7-sSRljc"
-            transcript_text = get_transcript_text(static_video_url, language="es")
-            if not transcript_text:
-                raise HTTPException(status_code=500, detail="Could not fetch transcript from static video")
-            
-            # Generate listening practice
-            print("Generating listening practice with transcript...")
-            content = json.loads(generate_listening_gemini(transcript_text))
-            # Generate audio for the conversation
-            print("Content generated successfully, now generating audio...")
-            print("Conversation data:", content["conversation"])
-            try:
-                # Create a unique ID for this practice
-                content["id"] = f"listening_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                audio_path = await generate_conversation_audio(
-                    content["conversation"],
-                    f"static_audio/{content['id']}.mp3"
-                )
-                print("Audio generation completed. Path:", audio_path)
-                if not audio_path:
-                    raise Exception("Audio path is empty")
-            except Exception as audio_error:
-                print(f"Error generating audio: {str(audio_error)}")
-                raise HTTPException(status_code=500, detail=f"Audio generation failed: {str(audio_error)}")
-            # Add audio path to content
-            content["audioPath"] = f"/static_audio/{os.path.basename(audio_path)}"
-            
-        elif request.type == "reading":
-            # Generate reading practice
-            content = json.loads(generate_reading_gemini())
-        else:
-            raise HTTPException(status_code=400, detail="Invalid practice type")
+        job = job_queue.submit(
+            f"{request.type}:{request.level}",
+            lambda job: build_practice(request.type, request.level, job)
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.snapshot()
 
-        # Store in vector database
-        practice_id = vector_store.store_practice(content, request.type)
-        if not practice_id:
-            raise HTTPException(status_code=500, detail="Failed to store practice")
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
 
-        return content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    # Server-sent events: one message per progress update, then an "end"
+    # event carrying the final snapshot (with the result or the error)
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                yield f"data: {json.dumps(job.events[sent])}\n\n"
+                sent += 1
+            if job.finished:
+                yield f"event: end\ndata: {json.dumps(job.snapshot())}\n\n"
+                return
+            await job.wait_for_change(sent, SSE_KEEPALIVE_SECONDS)
+            if sent == len(job.events):
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/saved_practices")
-async def get_saved_practices() -> List[SavedPractice]:
+async def get_saved_practices(limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None) -> SavedPracticesPage:
+    # Newest first, without content (load that with /practice/{id}); pass
+    # next_cursor back as cursor for the following page
     try:
-        practices = vector_store.get_all_practices()
-        return [SavedPractice(**practice) for practice in practices]
+        practices, next_cursor = await asyncio.to_thread(vector_store.list_practices, limit, cursor)
+        return SavedPracticesPage(
+            practices=[SavedPractice(**practice) for practice in practices],
+            next_cursor=next_cursor
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/practice/{practice_id}")
 async def get_practice(practice_id: str):
     try:
-        practice = vector_store.get_practice_by_id(practice_id)
-        if not practice:
-            raise HTTPException(status_code=404, detail="Practice not found")
-        return practice
+        practice = await asyncio.to_thread(vector_store.get_practice_by_id, practice_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not practice:
+        raise HTTPException(status_code=404, detail="Practice not found")
+    return practice
+
+@app.get("/practice/{practice_id}/similar")
+async def get_similar_practices(practice_id: str, k: int = Query(5, ge=1, le=MAX_SIMILAR)) -> List[SimilarPractice]:
+    # The k saved practices closest to this one by embedding, most similar first
+    try:
+        similar = await asyncio.to_thread(vector_store.get_similar_practices, practice_id, k)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Practice not found")
+    return [SimilarPractice(**practice) for practice in similar]
+
+@app.get("/pool/stats")
+async def get_pool_stats():
+    # Ready practices per type and level, and hit/miss counters
+    return practice_pool.stats()
+
+@app.get("/audio_cache/stats")
+async def get_audio_cache_stats():
+    # Hit/miss counters and size of the synthesized speech cache
+    return get_audio_cache().stats()
 
 if __name__ == "__main__":
     import uvicorn
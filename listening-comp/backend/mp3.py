@@ -0,0 +1,134 @@
+"""MP3 helpers for conversation audio
+
+An MP3 stream is a sequence of self-contained frames, each starting with a
+4-byte header, so streams of the same format can be joined by concatenating
+their frames once any ID3 tags and Xing/Info header frames (whose frame
+counts would be wrong for the joined stream) are dropped.
+"""
+from typing import Iterable, Iterator, Optional
+
+# Layer III bitrates in kbps by bitrate index, for MPEG-1 and for MPEG-2/2.5
+BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by version bits, then sample rate index
+SAMPLE_RATES = {
+    0b11: [44100, 48000, 32000],  # MPEG-1
+    0b10: [22050, 24000, 16000],  # MPEG-2
+    0b00: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+# Frame header of Polly's default mp3 output: MPEG-2 Layer III, no CRC,
+# 48 kbps, 22050 Hz, no padding, mono
+POLLY_HEADER = bytes([0xFF, 0xF3, 0x60, 0xC0])
+
+def parse_header(header: bytes) -> Optional[dict]:
+    """Parse a Layer III frame header, or return None if it isn't one"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0b11
+    layer_bits = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0b11
+    if version_bits == 0b01 or layer_bits != 0b01 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        # Reserved values, another layer, or free-format bitrate
+        return None
+
+    mpeg1 = version_bits == 0b11
+    bitrate = BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (header[2] >> 1) & 1
+    samples = 1152 if mpeg1 else 576
+    return {
+        "sample_rate": sample_rate,
+        "channels": 1 if header[3] >> 6 == 0b11 else 2,
+        "samples": samples,
+        "length": samples // 8 * bitrate // sample_rate + padding,
+        "side_info": (17 if header[3] >> 6 == 0b11 else 32) if mpeg1 else (9 if header[3] >> 6 == 0b11 else 17),
+    }
+
+def _id3v2_size(data: bytes, offset: int) -> int:
+    if data[offset:offset + 3] != b"ID3" or len(data) < offset + 10:
+        return 0
+    # Syncsafe size: 7 bits per byte, plus the header and an optional footer
+    size = 0
+    for byte in data[offset + 6:offset + 10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[offset + 5] & 0x10 else 0
+    return 10 + size + footer
+
+def iter_frames(data: bytes) -> Iterator[tuple]:
+    """Yield (offset, length, info) for each audio frame, skipping tags"""
+    offset = _id3v2_size(data, 0)
+    first = True
+    while offset + 4 <= len(data):
+        info = parse_header(data[offset:offset + 4])
+        if info is None or offset + info["length"] > len(data):
+            if data[offset:offset + 3] == b"TAG":
+                # ID3v1 tag at the end
+                return
+            # Junk between frames; resynchronise on the next header
+            offset += 1
+            continue
+        length = info["length"]
+        if first:
+            first = False
+            # A Xing/Info frame carries the stream's metadata, not audio
+            tag_offset = offset + 4 + info["side_info"]
+            if data[tag_offset:tag_offset + 4] in (b"Xing", b"Info"):
+                offset += length
+                continue
+        yield offset, length, info
+        offset += length
+
+def audio_frames(data: bytes) -> tuple:
+    """Return (frames, first frame header) of an MP3 stream, with tags dropped"""
+    parts = []
+    header = None
+    for offset, length, _ in iter_frames(data):
+        if header is None:
+            header = data[offset:offset + 4]
+        parts.append(data[offset:offset + length])
+    if header is None:
+        raise ValueError("No MP3 audio frames found")
+    return b"".join(parts), header
+
+def silence(seconds: float, header: bytes = POLLY_HEADER) -> bytes:
+    """Return about the given number of seconds of silence, in frames of the
+    same format as the frame header given (Polly's by default)"""
+    # A frame whose side info and main data are all zero decodes to silence.
+    # Without padding, and without CRC so the frame is just header and zeros.
+    header = bytes([header[0], header[1] | 0x01, header[2] & ~0x02 & 0xFF, header[3]])
+    info = parse_header(header)
+    frame = header + bytes(info["length"] - 4)
+    frames = max(1, round(seconds * info["sample_rate"] / info["samples"]))
+    return frame * frames
+
+class Concatenator:
+    """Joins MP3 streams of the same format (as Polly's are) into one
+
+    Each stream is added with its speaker; add() returns the bytes to append
+    to the joined stream, with gap_seconds of silence before the stream
+    whenever the speaker changes.
+    """
+
+    def __init__(self, gap_seconds: float = 0.0):
+        self.gap_seconds = gap_seconds
+        self.previous_speaker = None
+        self.gap = None
+
+    def add(self, speaker: str, data: bytes) -> bytes:
+        frames, header = audio_frames(data)
+        changed = self.previous_speaker is not None and speaker != self.previous_speaker
+        self.previous_speaker = speaker
+        if not changed or self.gap_seconds <= 0:
+            return frames
+        if self.gap is None:
+            self.gap = silence(self.gap_seconds, header)
+        return self.gap + frames
+
+def concat(segments: Iterable[tuple], gap_seconds: float = 0.0) -> bytes:
+    """Join MP3 streams given as (speaker, data) pairs"""
+    concatenator = Concatenator(gap_seconds)
+    return b"".join(concatenator.add(speaker, data) for speaker, data in segments)
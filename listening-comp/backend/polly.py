@@ -1,160 +1,188 @@
 import os
 import json
+import time
+import uuid
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import boto3
+from botocore.config import Config
 from dotenv import load_dotenv
+import mp3
+from audio_cache import AudioCache
 
 # Load environment variables from a .env file, including AWS credentials if set there.
 load_dotenv()
 
-async def generate_audio_polly(text: str, voice_id: str, output_file: str):
-    print(f"Starting audio generation for voice {voice_id}")
-    # Retrieve AWS region from environment variables, defaulting to "us-west-2" if not provided.
-    aws_region = os.getenv("AWS_REGION", "us-east-1")
-    print(f"Using AWS region: {aws_region}")
-    
-    # Initialize Polly client using the specified AWS region.
+# Text-to-speech backends. Each takes (text, voice_id) and returns the MP3
+# bytes; they are blocking and run on the TTS thread pool. Pick one with the
+# TTS_BACKEND environment variable: "polly" (default) or "local", an offline
+# stand-in that returns silence as long as the text would take to read, so
+# the pipeline can be exercised and benchmarked without AWS.
+TTS_BACKEND = os.getenv("TTS_BACKEND", "polly")
+# Concurrent synthesis requests across all conversations
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "4"))
+# Simulated request latency of the local backend, in seconds
+LOCAL_TTS_LATENCY = float(os.getenv("LOCAL_TTS_LATENCY", "0"))
+# Reading speed the local backend assumes, in characters per second
+LOCAL_TTS_CHARS_PER_SECOND = 15
+
+POLLY_LANGUAGE_CODE = "es-ES"  # Spanish (Spain)
+POLLY_OUTPUT_FORMAT = "mp3"
+
+# Synthesized lines are cached on disk by content, so a repeated line (the
+# narrator's introductions, common phrases) is only synthesized once
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "audio_cache")
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Seconds of silence inserted where the speaker changes
+SPEAKER_GAP_SECONDS = float(os.getenv("SPEAKER_GAP_SECONDS", "0"))
+
+VOICE_MAPPING = {
+    "Narrador": "Enrique",  # Male narrator
+    "Interlocutor1": "Lucia",  # Female voice
+    "Interlocutor2": "Miguel"  # Male voice
+}
+
+_polly_client = None
+_polly_client_lock = threading.Lock()
+_tts_executor = None
+_tts_executor_lock = threading.Lock()
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+def get_polly_client():
+    # One client for the whole process: boto3 clients are thread-safe, and
+    # creating one per line costs a credentials lookup and a new connection pool
+    global _polly_client
+    with _polly_client_lock:
+        if _polly_client is None:
+            aws_region = os.getenv("AWS_REGION", "us-east-1")
+            print(f"Initializing Polly client in region {aws_region}")
+            _polly_client = boto3.client(
+                "polly",
+                region_name=aws_region,
+                config=Config(max_pool_connections=TTS_MAX_WORKERS)
+            )
+        return _polly_client
+
+def get_tts_executor() -> ThreadPoolExecutor:
+    global _tts_executor
+    with _tts_executor_lock:
+        if _tts_executor is None:
+            _tts_executor = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+        return _tts_executor
+
+def get_audio_cache() -> AudioCache:
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+        return _audio_cache
+
+def synthesize_polly(text: str, voice_id: str) -> bytes:
+    response = get_polly_client().synthesize_speech(
+        Text=text,  # The input text to be converted to speech
+        OutputFormat=POLLY_OUTPUT_FORMAT,  # Output format of the speech
+        VoiceId=voice_id,  # Voice selection
+        LanguageCode=POLLY_LANGUAGE_CODE  # Language selection
+    )
+    if "AudioStream" not in response:
+        raise Exception(f"Polly response did not contain audio data: {list(response.keys())}")
+    with response["AudioStream"] as stream:
+        return stream.read()
+
+def synthesize_local(text: str, voice_id: str) -> bytes:
+    if LOCAL_TTS_LATENCY:
+        time.sleep(LOCAL_TTS_LATENCY)
+    return mp3.silence(len(text) / LOCAL_TTS_CHARS_PER_SECOND)
+
+TTS_BACKENDS = {
+    "polly": synthesize_polly,
+    "local": synthesize_local,
+}
+
+def get_tts_backend(name: Optional[str] = None) -> str:
+    name = name or TTS_BACKEND
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend {name!r}, expected one of: {', '.join(TTS_BACKENDS)}")
+    return name
+
+def synthesize(text: str, voice_id: str, backend: str) -> bytes:
+    # The backend is part of the key so the local stand-in's silence is never
+    # served in place of real speech
+    key = AudioCache.key(text, voice_id, POLLY_LANGUAGE_CODE, POLLY_OUTPUT_FORMAT, backend)
+    return get_audio_cache().get_or_create(key, lambda: TTS_BACKENDS[backend](text, voice_id))
+
+def _write_file(output_file: str, audio: bytes):
+    # Written under a unique name and renamed, so the file is never seen half
+    # written (static_audio is served as it is)
+    temp_file = f"{output_file}.{uuid.uuid4().hex}.tmp"
     try:
-        polly = boto3.client("polly", region_name=aws_region)
-        print("Successfully initialized Polly client")
-    except Exception as e:
-        print(f"Failed to initialize Polly client: {e}")
-        return False
-    
+        with open(temp_file, "wb") as file:
+            file.write(audio)
+        os.replace(temp_file, output_file)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+async def synthesize_line(text: str, voice_id: str, backend: Optional[str] = None) -> bytes:
+    # Synthesis blocks, so it runs on the TTS pool rather than in the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_tts_executor(), synthesize, text, voice_id, get_tts_backend(backend))
+
+async def generate_audio_polly(text: str, voice_id: str, output_file: str, backend: Optional[str] = None):
+    print(f"Starting audio generation for voice {voice_id}")
     try:
-        # Request speech synthesis from Polly
-        print("Requesting speech synthesis from Polly...")
-        response = polly.synthesize_speech(
-            Text=text,  # The input text to be converted to speech
-            OutputFormat="mp3",  # Output format of the speech
-            VoiceId=voice_id,  # Voice selection
-            LanguageCode="es-ES"  # Spanish (Spain) language selection
-        )
-        print("Speech synthesis request completed")
-
-        # Write the audio stream to a file if the response contains audio data
-        if "AudioStream" in response:
-            print(f"Writing audio stream to {output_file}")
-            with open(output_file, "wb") as file:
-                file.write(response["AudioStream"].read())
-            print(f"Audio content written to {output_file}")
-            return True
-        else:
-            print("Error: Polly response did not contain audio data.")
-            print("Response keys:", response.keys())
-            return False
+        audio = await synthesize_line(text, voice_id, backend)
+        await asyncio.get_running_loop().run_in_executor(None, _write_file, output_file, audio)
+        print(f"Audio content written to {output_file}")
+        return True
     except Exception as e:
         print(f"Error generating speech: {e}")
         if hasattr(e, 'response'):
             print("Error response:", e.response)
         return False
 
-async def combine_audio_files(file_paths: list[str], output_file: str):
+async def stream_conversation_audio(conversation_data: list, backend: Optional[str] = None, gap_seconds: float = SPEAKER_GAP_SECONDS):
+    # Yields the conversation's MP3 piece by piece, in order, as soon as each
+    # line and every line before it are synthesized. Every line is submitted
+    # at once; the TTS pool bounds how many requests are in flight.
+    lines = [(part["speaker"], part["text"]) for part in conversation_data if part["speaker"] in VOICE_MAPPING]
+    tasks = [asyncio.ensure_future(synthesize_line(text, VOICE_MAPPING[speaker], backend)) for speaker, text in lines]
+    concatenator = mp3.Concatenator(gap_seconds)
     try:
-        # Check if all input files exist
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                print(f"Error: Input file {file_path} does not exist")
-                return False
-
-        # Use ffmpeg to concatenate audio files
-        files_list = "|".join(file_paths)
-        cmd = f'ffmpeg -y -i "concat:{files_list}" -acodec copy {output_file}'
-        print(f"Executing command: {cmd}")
-        
-        process = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            print(f"Error in ffmpeg: {stderr.decode()}")
-            return False
-            
-        # Verify the output file was created
-        if not os.path.exists(output_file):
-            print(f"Error: Output file {output_file} was not created")
-            return False
-            
-        print(f"Successfully combined audio files into {output_file}")
-        
-        # Clean up temporary files
-        for file_path in file_paths:
+        for (speaker, _), task in zip(lines, tasks):
             try:
-                os.remove(file_path)
-                print(f"Cleaned up temporary file: {file_path}")
+                audio = await task
             except Exception as e:
-                print(f"Warning: Could not remove temporary file {file_path}: {e}")
-            
-        return True
-    except Exception as e:
-        print(f"Error combining audio files: {e}")
-        # Clean up any temporary files
-        for file_path in file_paths:
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as cleanup_error:
-                    print(f"Warning: Could not remove temporary file {file_path}: {cleanup_error}")
-        return False
+                raise Exception(f"Failed to generate audio for {speaker}: {e}")
+            yield concatenator.add(speaker, audio)
+    finally:
+        # Stop lines nobody will wait for, and collect their results so
+        # failures aren't reported as never retrieved
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-async def generate_conversation_audio(conversation_data: list, output_path: str) -> str:
+async def generate_conversation_audio(conversation_data: list, output_path: str, backend: Optional[str] = None) -> str:
     # Create static_audio directory if it doesn't exist
-    print("HELLO WORLD")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     print("conversation_data: ", conversation_data)
     
-    # Define voice mapping
-    voice_mapping = {
-        "Narrador": "Enrique",  # Male narrator
-        "Interlocutor1": "Lucia",  # Female voice
-        "Interlocutor2": "Miguel"  # Male voice
-    }
-    
-    temp_files = []
-    output_dir = os.path.dirname(output_path)
-    
     try:
-        # Generate audio for each part of the conversation
-        for i, part in enumerate(conversation_data):
-            speaker = part["speaker"]
-            text = part["text"]
-            
-            # Skip if the speaker is not in our mapping
-            if speaker not in voice_mapping:
-                continue
-                
-            # Generate temporary file name
-            temp_file = os.path.join(output_dir, f"temp_{i}.mp3")
-            temp_files.append(temp_file)
-            
-            # Generate audio for this part
-            success = await generate_audio_polly(
-                text=text,
-                voice_id=voice_mapping[speaker],
-                output_file=temp_file
-            )
-            
-            if not success:
-                raise Exception(f"Failed to generate audio for {speaker}")
-        
-        # Combine all audio files into the final output path
-        success = await combine_audio_files(temp_files, output_path)
-        
-        if not success:
-            raise Exception("Failed to combine audio files")
-            
+        # The lines are joined in memory and the file written once
+        chunks = [chunk async for chunk in stream_conversation_audio(conversation_data, backend)]
+        if not chunks:
+            raise Exception("The conversation has no lines to synthesize")
+        await asyncio.get_running_loop().run_in_executor(None, _write_file, output_path, b"".join(chunks))
+        print(f"Conversation audio written to {output_path}")
         return output_path
-            
     except Exception as e:
         print(f"Error in generate_conversation_audio: {e}")
-        # Clean up any temporary files
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
         return ""
 
 async def test_tts():
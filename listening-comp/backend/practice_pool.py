@@ -0,0 +1,119 @@
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class PracticePool:
+    """Pre-generated practices, ready to hand out without waiting for Gemini and Polly
+
+    Each (type, level) keeps up to `size` practices, stored in the vector
+    store's practice collection as pooled (unlisted) entries and tracked here
+    in a queue of ids, so taking one is a pop and a single update. When a pool
+    drops below `low_watermark`, a background task generates practices one at
+    a time until it is full again, at most one every `min_interval` seconds
+    so refills stay within the LLM's rate limits.
+    """
+
+    MAX_BACKOFF_SECONDS = 300
+
+    def __init__(
+        self,
+        vector_store,
+        generate: Callable[[str, str], Awaitable[Tuple[Dict[str, Any], List[float]]]],
+        keys: List[Tuple[str, str]],
+        size: int = 3,
+        low_watermark: int = 1,
+        min_interval: float = 5.0,
+    ):
+        self.vector_store = vector_store
+        self.generate = generate
+        self.keys = keys
+        self.size = size
+        self.low_watermark = low_watermark
+        self.min_interval = min_interval
+        self.ready: Dict[Tuple[str, str], deque] = {key: deque() for key in keys}
+        # Pools being topped up: entered below the low watermark, left when full
+        self.refilling = set()
+        self.wake = None
+        self.task = None
+        self.last_generation = 0.0
+        self.failures = 0
+        self.counters = {"hits": 0, "misses": 0, "generated": 0, "failed": 0}
+
+    async def start(self):
+        self.wake = asyncio.Event()
+        # Practices pooled by earlier runs are still in the store
+        for practice_type, level in self.keys:
+            ids = await asyncio.to_thread(self.vector_store.get_pooled_ids, practice_type, level)
+            self.ready[(practice_type, level)].extend(ids)
+        self.task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def take(self, practice_type: str, level: str) -> Optional[Dict[str, Any]]:
+        """Return a ready practice of the type and level, or None if the pool is empty"""
+        queue = self.ready.get((practice_type, level))
+        content = None
+        while queue and content is None:
+            content = await asyncio.to_thread(self.vector_store.claim_practice, queue.popleft())
+        self.counters["hits" if content is not None else "misses"] += 1
+        if self.wake:
+            self.wake.set()
+        return content
+
+    def _next_key(self) -> Optional[Tuple[str, str]]:
+        # The emptiest pool that needs topping up
+        for key, queue in self.ready.items():
+            if len(queue) < self.low_watermark:
+                self.refilling.add(key)
+            elif len(queue) >= self.size:
+                self.refilling.discard(key)
+        if not self.refilling:
+            return None
+        return min(self.refilling, key=lambda key: len(self.ready[key]))
+
+    async def _refill(self):
+        while True:
+            key = self._next_key()
+            if key is None:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+
+            # Rate limit, with exponential backoff while generation keeps failing
+            interval = self.min_interval
+            if self.failures:
+                interval = min(max(interval, 1) * 2 ** min(self.failures, 10), self.MAX_BACKOFF_SECONDS)
+            delay = self.last_generation + interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.last_generation = time.monotonic()
+
+            practice_type, level = key
+            try:
+                content, embedding = await self.generate(practice_type, level)
+                practice_id = await asyncio.to_thread(
+                    self.vector_store.store_practice, content, practice_type, level, True, embedding
+                )
+                if not practice_id:
+                    raise Exception("Failed to store practice")
+                self.ready[key].append(practice_id)
+                self.counters["generated"] += 1
+                self.failures = 0
+                print(f"Pooled {practice_id} ({len(self.ready[key])}/{self.size} {practice_type} {level})")
+            except Exception as e:
+                self.counters["failed"] += 1
+                self.failures += 1
+                print(f"Error pre-generating {practice_type} {level} practice: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self.counters,
+            ready={f"{practice_type}:{level}": len(queue) for (practice_type, level), queue in self.ready.items()},
+            size=self.size,
+            low_watermark=self.low_watermark,
+        )
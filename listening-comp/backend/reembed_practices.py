@@ -0,0 +1,21 @@
+# Recompute the embeddings of every stored practice with the current
+# embedding model (see embeddings.py), for practices stored before
+# embed-on-store or after changing EMBEDDING_MODEL.
+#
+#   python reembed_practices.py --batch-size 64
+
+import argparse
+import time
+from vector_store import VectorStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed stored practices")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = VectorStore().reembed_practices(batch_size=args.batch_size)
+    print(f"Re-embedded {count} practices in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import random
+import itertools
+
+# Offline stand-ins for the Gemini generators, with the same signatures and
+# output format, for exercising the pipeline without an API key. Selected
+# with LLM_BACKEND=stub; pair with TTS_BACKEND=local to run fully offline.
+
+# Simulated latency of a generation call, in seconds
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0"))
+
+PLACES = ["la biblioteca", "el mercado", "la estación", "el gimnasio", "la oficina", "el parque"]
+ACTIVITIES = ["estudiar para el examen", "comprar fruta", "esperar el tren", "hacer ejercicio", "preparar una reunión", "pasear al perro"]
+TIMES = ["por la mañana", "a mediodía", "por la tarde", "por la noche"]
+
+_serial = itertools.count(1)
+
+def _scenario() -> dict:
+    # Varied enough that stub exercises aren't identical to each other
+    return {
+        "serial": next(_serial),
+        "place": random.choice(PLACES),
+        "activity": random.choice(ACTIVITIES),
+        "time": random.choice(TIMES),
+    }
+
+def _listening_exercise(level: str) -> dict:
+    scenario = _scenario()
+    options = [scenario["place"]] + random.sample([place for place in PLACES if place != scenario["place"]], 2)
+    random.shuffle(options)
+    return {
+        "conversation": [
+            {"speaker": "Narrador", "text": f"Conversación número {scenario['serial']}: dos amigos se encuentran {scenario['time']}."},
+            {"speaker": "Interlocutor1", "text": f"¡Hola! ¿Vas a {scenario['place']} {scenario['time']}?"},
+            {"speaker": "Interlocutor2", "text": f"Sí, tengo que {scenario['activity']} allí."},
+        ],
+        "question": {
+            "text": "¿Adónde va el segundo interlocutor?",
+            "options": options,
+            "correctAnswer": options.index(scenario["place"]),
+        },
+    }
+
+def _reading_exercise(level: str) -> dict:
+    scenario = _scenario()
+    time_options = TIMES[:3] if scenario["time"] in TIMES[:3] else TIMES[1:]
+    return {
+        "text": (
+            f"# Un día en {scenario['place']}\n\n"
+            f"Texto número {scenario['serial']} (nivel {level}). Marta va a {scenario['place']} "
+            f"{scenario['time']} para {scenario['activity']}. Allí se encuentra con un viejo amigo."
+        ),
+        "questions": [
+            {
+                "question": "¿Adónde va Marta?",
+                "options": [scenario["place"], "a casa", "al cine"],
+                "correctAnswer": 0,
+            },
+            {
+                "question": "¿Cuándo va Marta?",
+                "options": time_options,
+                "correctAnswer": time_options.index(scenario["time"]),
+            },
+            {
+                "question": "¿Con quién se encuentra?",
+                "options": ["Con su hermana", "Con un viejo amigo", "Con nadie"],
+                "correctAnswer": 1,
+            },
+        ],
+    }
+
+def generate_listening_batch_stub(transcript_text: str, count: int, level: str = "B2"):
+    # One call for the whole batch, like the Gemini batch
+    if STUB_LLM_LATENCY:
+        time.sleep(STUB_LLM_LATENCY)
+    return [_listening_exercise(level) for _ in range(count)]
+
+def generate_reading_batch_stub(count: int, level: str = "B2"):
+    if STUB_LLM_LATENCY:
+        time.sleep(STUB_LLM_LATENCY)
+    return [_reading_exercise(level) for _ in range(count)]
+
+def generate_listening_stub(transcript_text: str, level: str = "B2"):
+    return json.dumps(generate_listening_batch_stub(transcript_text, 1, level)[0], ensure_ascii=False, indent=2)
+
+def generate_reading_stub(level: str = "B2"):
+    return json.dumps(generate_reading_batch_stub(1, level)[0], ensure_ascii=False, indent=2)
@@ -19,14 +19,40 @@ curl -X POST http://localhost:8000/generate \
     "type": "reading"
   }'
 
-3. Get All Saved Practices
-=======================
-curl -X GET http://localhost:8000/saved_practices
+Both return a job at once, e.g. {"job_id": "...", "status": "queued", "stage": "queued"}.
+Generating a type that is already being generated returns the same job. When a
+pre-generated practice is ready, it comes back at once as a job that is already
+done: {"job_id": "...", "status": "done", "stage": "done", "result": {...}}.
+An optional "level" (default "B2", see PRACTICE_LEVELS) picks the exam level.
 
-4. Get Specific Practice (replace {practice_id} with actual ID)
+3. Follow a Generation Job (replace {job_id} with the returned ID)
+==============================================================
+Poll it; once "status" is "done" the practice is in "result":
+curl -X GET http://localhost:8000/jobs/{job_id}
+
+Or stream its progress (transcript, text, audio, stored) as server-sent events:
+curl -N http://localhost:8000/jobs/{job_id}/events
+
+4. List Saved Practices
+=====================
+Newest first, 20 per page by default (limit up to 100), without content:
+curl -X GET "http://localhost:8000/saved_practices?limit=20"
+
+Pass the returned "next_cursor" to get the next page:
+curl -X GET "http://localhost:8000/saved_practices?cursor={next_cursor}"
+
+5. Get Specific Practice (replace {practice_id} with actual ID)
 =========================================================
 curl -X GET http://localhost:8000/practice/{practice_id}
 
+6. Find Similar Practices (k from 1 to 20, default 5)
+==================================================
+curl -X GET "http://localhost:8000/practice/{practice_id}/similar?k=5"
+
+7. Pre-generated Practice Pool
+===========================
+curl -X GET http://localhost:8000/pool/stats
+
 Example Usage:
 -------------
 1. First start your FastAPI server:
@@ -44,7 +70,7 @@ curl -X GET http://localhost:8000/saved_practices | jq '.'
 
 Testing Sequence:
 ---------------
-1. Generate a reading practice
+1. Generate a reading practice and follow its job until it is done
 2. Generate a listening practice (will use static YouTube video for transcript)
 3. Check saved practices to get an ID
 4. Use that ID to test specific practice retrieval
@@ -52,9 +78,11 @@ Testing Sequence:
 Common HTTP Status Codes:
 ----------------------
 200: Success
+202: Accepted (generation queued)
 400: Bad Request (check your input)
 404: Not Found
 500: Server Error (check server logs)
+503: Too many queued generations
 
 Notes:
 -----
@@ -63,4 +91,9 @@ Notes:
 - Audio files will be saved in the static_audio directory
 - Vector store data is persisted in the db directory
 - Listening practice uses a static YouTube video (https://youtu.be/uQk7-sSRljc) for transcript
+- To run without Gemini or AWS, start the server with LLM_BACKEND=stub TTS_BACKEND=local
+- Practices stored before embeddings were computed on store, or after changing
+  EMBEDDING_MODEL, need re-embedding: python reembed_practices.py
+- Exercises are generated GENERATION_BATCH_SIZE (default 3) per LLM call; the
+  unused ones serve the next practices of the same type and level
 """ 
\ No newline at end of file
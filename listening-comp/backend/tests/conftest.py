@@ -0,0 +1,36 @@
+import os
+import re
+import sys
+import hashlib
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EMBEDDING_DIMENSIONS = 64
+
+def bag_of_words_embedding(texts):
+    # Stands in for the ONNX model, which is downloaded on first use: texts
+    # sharing more words get closer embeddings, and equal texts equal ones
+    embeddings = []
+    for text in texts:
+        vector = [0.0] * EMBEDDING_DIMENSIONS
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % EMBEDDING_DIMENSIONS] += 1.0
+        embeddings.append(vector)
+    return embeddings
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # A vector store persisted in a temporary directory
+    pytest.importorskip("chromadb")
+    from chromadb.api.client import SharedSystemClient
+    from vector_store import VectorStore
+
+    monkeypatch.chdir(tmp_path)
+    store = VectorStore()
+    store.embedding_function.model = bag_of_words_embedding
+    yield store
+    # Chroma keeps one client per persist directory, and every store's is "db"
+    SharedSystemClient.clear_system_cache()
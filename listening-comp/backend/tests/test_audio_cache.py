@@ -0,0 +1,70 @@
+import os
+import threading
+
+from audio_cache import AudioCache
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.put("c", b"c" * 10)
+    assert cache.get("a") == b"a" * 10
+
+    cache.put("d", b"d" * 10)
+    assert cache.get("b") is None
+    assert not os.path.exists(cache.path("b"))
+    assert [cache.get(key) for key in "acd"] == [b"a" * 10, b"c" * 10, b"d" * 10]
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (3, 30, 1)
+
+def test_does_not_cache_entries_bigger_than_the_cache(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"a" * 5)
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"a" * 5
+
+def test_reloads_by_last_use_on_restart(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=30)
+    for index, key in enumerate("abc"):
+        cache.put(key, key.encode() * 10)
+        os.utime(cache.path(key), (1000 + index, 1000 + index))
+    (tmp_path / "d.0123.tmp").write_bytes(b"partial")
+
+    cache = AudioCache(str(tmp_path), max_bytes=20)
+    assert not os.path.exists(tmp_path / "d.0123.tmp")
+    assert cache.get("a") is None
+    assert cache.get("b") == b"b" * 10
+    assert cache.stats()["bytes"] == 20
+
+def test_concurrent_misses_share_one_synthesis(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1000)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def create():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"audio"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_create("k", create)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_create("k", create)))
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+
+    assert results == [b"audio", b"audio"]
+    assert len(calls) == 1
+    assert cache.get_or_create("k", create) == b"audio"
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"] + stats["coalesced"]) == (1, 2)
+
+def test_key_parts_are_length_prefixed():
+    assert AudioCache.key("ab", "c") != AudioCache.key("a", "bc")
+    assert AudioCache.key("hola", "Lucia") == AudioCache.key("hola", "Lucia")
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+import gemini_question_generator as generator
+
+def reading(topic):
+    return {
+        "text": f"Un texto sobre {topic}",
+        "questions": [{"question": f"¿{topic}?", "options": ["a", "b", "c"], "correctAnswer": 1}] * 3
+    }
+
+MALFORMED = {"text": "Sin preguntas", "questions": []}
+
+@pytest.fixture
+def responses(monkeypatch):
+    # Canned responses for successive requests; each request is recorded as
+    # the number of exercises it asked for
+    responses, requests = [], []
+
+    def request(model_name, prompt, schema, max_output_tokens):
+        requests.append(max_output_tokens // generator.READING_TOKENS_PER_EXERCISE)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(generator, "_request", request)
+    return responses, requests
+
+def test_one_call_for_a_valid_batch(responses):
+    queued, requests = responses
+    queued.append([reading("el mar"), reading("la montaña"), reading("el tren")])
+    exercises = generator.generate_reading_batch(3)
+    assert [exercise["text"] for exercise in exercises] == [
+        "Un texto sobre el mar", "Un texto sobre la montaña", "Un texto sobre el tren"
+    ]
+    assert requests == [3]
+
+def test_only_malformed_exercises_are_asked_for_again(responses):
+    queued, requests = responses
+    queued.extend([
+        [reading("el mar"), MALFORMED, {"text": "Sin nada"}],
+        [reading("la montaña")],
+        [MALFORMED], [], [reading("el tren")]
+    ])
+    exercises = generator.generate_reading_batch(3)
+    assert [exercise["text"] for exercise in exercises] == [
+        "Un texto sobre el mar", "Un texto sobre la montaña", "Un texto sobre el tren"
+    ]
+    assert requests == [3, 1, 1, 1, 1]
+
+def test_an_unparseable_batch_is_retried_singly(responses):
+    queued, requests = responses
+    queued.extend([ValueError("Unterminated string"), [reading("el mar")], [reading("el tren")]])
+    assert len(generator.generate_reading_batch(2)) == 2
+    assert requests == [2, 1, 1]
+
+def test_gives_up_on_an_exercise_after_the_retries(responses):
+    queued, requests = responses
+    queued.extend([[reading("el mar"), MALFORMED]] + [[MALFORMED]] * (generator.MAX_ITEM_RETRIES + 1))
+    assert len(generator.generate_reading_batch(2)) == 1
+    assert requests == [2] + [1] * (generator.MAX_ITEM_RETRIES + 1)
+
+def test_fails_without_any_valid_exercise(responses):
+    queued, _ = responses
+    queued.extend([[MALFORMED]] + [[MALFORMED]] * (generator.MAX_ITEM_RETRIES + 1))
+    with pytest.raises(ValueError, match="no valid exercise"):
+        generator.generate_reading_batch(1)
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from jobs import JobQueue
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_same_key_joins_the_queued_job():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        queue.start()
+        release = asyncio.Event()
+        calls = []
+
+        async def work(job):
+            calls.append(job.id)
+            job.report("text")
+            await release.wait()
+            return {"text": "hola"}
+
+        first = queue.submit("reading:B2", work)
+        second = queue.submit("reading:B2", work)
+        other = queue.submit("listening:B2", work)
+        assert second is first and other is not first
+
+        release.set()
+        while not (first.finished and other.finished):
+            await first.wait_for_change(len(first.events), 1)
+        await queue.stop()
+
+        assert sorted(calls) == sorted([first.id, other.id])
+        assert first.snapshot() == {"job_id": first.id, "status": "done", "stage": "done", "result": {"text": "hola"}}
+        assert [event["stage"] for event in first.events] == ["queued", "queued", "text", "done"]
+
+        # Once finished, the same key starts a new job
+        queue.start()
+        assert queue.submit("reading:B2", work) is not first
+        await queue.stop()
+
+    run(scenario())
+
+def test_failures_are_recorded():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        queue.start()
+
+        async def work(job):
+            raise Exception("Gemini is down")
+
+        job = queue.submit("reading:B2", work)
+        await queue.queue.join()
+        await queue.stop()
+        assert (job.status, job.error) == ("failed", "Gemini is down")
+        assert queue.in_flight == {}
+
+    run(scenario())
+
+def test_refuses_jobs_beyond_max_queued():
+    async def scenario():
+        queue = JobQueue(workers=0, max_queued=2)
+        queue.start()
+
+        async def work(job):
+            return None
+
+        queue.submit("a", work)
+        queue.submit("b", work)
+        with pytest.raises(RuntimeError):
+            queue.submit("c", work)
+        # Joining a queued job still works
+        assert queue.submit("a", work) is queue.in_flight["a"]
+
+    run(scenario())
+
+def test_added_finished_jobs_are_collected_like_queued_ones():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        queue.start()
+        job = queue.add_finished("reading:B2", {"text": "hola"})
+        await queue.stop()
+
+        assert queue.get(job.id) is job
+        assert job.snapshot() == {"job_id": job.id, "status": "done", "stage": "done", "result": {"text": "hola"}}
+        assert job.events == [{"job_id": job.id, "status": "done", "stage": "done"}]
+        # It isn't in flight, so it doesn't capture new submissions
+        assert "reading:B2" not in queue.in_flight
+
+    run(scenario())
+
+def test_finished_jobs_expire():
+    async def scenario():
+        queue = JobQueue(workers=1, retention=60)
+        queue.start()
+
+        async def work(job):
+            return {}
+
+        job = queue.submit("reading:B2", work)
+        await queue.queue.join()
+        queue.submit("reading:B2", work)
+        assert queue.get(job.id) is job
+        job.finished_at -= 61
+        queue.submit("listening:B2", work)
+        await queue.stop()
+        assert queue.get(job.id) is None
+
+    run(scenario())
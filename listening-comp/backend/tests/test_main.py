@@ -0,0 +1,87 @@
+import os
+import asyncio
+import importlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+@pytest.fixture
+def main(store, monkeypatch):
+    # The API module, running offline, with its vector store swapped for the
+    # test's (importing it opens a store and mounts static_audio in the cwd)
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    os.makedirs("static_audio", exist_ok=True)
+    main = importlib.import_module("main")
+    monkeypatch.setattr(main, "vector_store", store)
+    monkeypatch.setattr(main.practice_pool, "vector_store", store)
+    return main
+
+@pytest.fixture
+def client(main):
+    from fastapi.testclient import TestClient
+    return TestClient(main.app)
+
+def reading(text):
+    return {"text": text, "questions": [{"question": "¿Qué?", "options": ["a", "b", "c"], "correctAnswer": 0}]}
+
+def generate_texts(main, monkeypatch, texts):
+    texts = list(texts)
+
+    async def generate_text(practice_type, level, report):
+        return reading(texts.pop(0))
+
+    monkeypatch.setattr(main, "generate_text", generate_text)
+    return texts
+
+def test_near_duplicates_are_regenerated(main, store, monkeypatch):
+    store.store_practice(reading("El tren sale de la estación a las ocho"), "reading")
+    monkeypatch.setattr(main, "DUPLICATE_SIMILARITY_THRESHOLD", 0.9)
+    left = generate_texts(main, monkeypatch, [
+        "El tren sale de la estación a las ocho",
+        "El tren sale de la estación a las ocho y media",
+        "Mi perro come pescado los domingos"
+    ])
+
+    content, embedding = asyncio.run(main.create_practice("reading", "B2", lambda stage: None))
+    assert content["text"] == "Mi perro come pescado los domingos"
+    assert left == []
+    assert len(embedding) == 64
+
+def test_threshold_of_one_only_rejects_exact_duplicates(main, store, monkeypatch):
+    store.store_practice(reading("El tren sale de la estación a las ocho"), "reading")
+    monkeypatch.setattr(main, "DUPLICATE_SIMILARITY_THRESHOLD", 1.0)
+    generate_texts(main, monkeypatch, ["El tren sale de la estación a las ocho y media"])
+
+    content, _ = asyncio.run(main.create_practice("reading", "B2", lambda stage: None))
+    assert content["text"] == "El tren sale de la estación a las ocho y media"
+
+def test_gives_up_after_the_duplicate_retries(main, store, monkeypatch):
+    store.store_practice(reading("Siempre lo mismo"), "reading")
+    generate_texts(main, monkeypatch, ["Siempre lo mismo"] * (main.MAX_DUPLICATE_RETRIES + 1))
+    with pytest.raises(Exception, match="distinct from the stored ones"):
+        asyncio.run(main.create_practice("reading", "B2", lambda stage: None))
+
+def test_saved_practices_pages(client, store):
+    ids = [store.store_practice(reading(f"Texto {i}"), "reading") for i in range(3)]
+    first = client.get("/saved_practices", params={"limit": 2}).json()
+    assert [practice["id"] for practice in first["practices"]] == ids[:0:-1]
+    second = client.get("/saved_practices", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [practice["id"] for practice in second["practices"]] == ids[:1]
+    assert second["next_cursor"] is None
+
+def test_get_practice(client, store):
+    practice_id = store.store_practice(reading("Hola"), "reading")
+    assert client.get(f"/practice/{practice_id}").json()["text"] == "Hola"
+    assert client.get("/practice/missing").status_code == 404
+
+def test_pool_hit_is_a_finished_job(main, client, monkeypatch):
+    async def take(practice_type, level):
+        return reading("Del pool")
+
+    monkeypatch.setattr(main.practice_pool, "take", take)
+    response = client.post("/generate", json={"type": "reading"})
+    assert response.status_code == 202
+    job = response.json()
+    assert (job["status"], job["result"]["text"]) == ("done", "Del pool")
+    assert client.get(f"/jobs/{job['job_id']}").json() == job
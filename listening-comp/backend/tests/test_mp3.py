@@ -0,0 +1,43 @@
+import mp3
+
+FRAME_LENGTH = mp3.parse_header(mp3.POLLY_HEADER)["length"]
+
+def frame(fill: int) -> bytes:
+    return mp3.POLLY_HEADER + bytes([fill]) * (FRAME_LENGTH - 4)
+
+def stream(*fills: int) -> bytes:
+    """A Polly-like stream: ID3v2 tag, Xing frame, audio frames, ID3v1 tag"""
+    id3v2 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + bytes(5)
+    side_info = mp3.parse_header(mp3.POLLY_HEADER)["side_info"]
+    xing = mp3.POLLY_HEADER + bytes(side_info) + b"Xing"
+    xing += bytes(FRAME_LENGTH - len(xing))
+    id3v1 = b"TAG" + bytes(125)
+    return id3v2 + xing + b"".join(frame(fill) for fill in fills) + id3v1
+
+def frame_count(data: bytes) -> int:
+    return sum(1 for _ in mp3.iter_frames(data))
+
+def test_polly_header():
+    info = mp3.parse_header(mp3.POLLY_HEADER)
+    assert (info["sample_rate"], info["channels"], info["samples"], FRAME_LENGTH) == (22050, 1, 576, 156)
+
+def test_silence_frame_count():
+    for seconds, frames in [(1.0, 38), (0.5, 19), (0.0, 1)]:
+        silence = mp3.silence(seconds)
+        assert len(silence) == frames * FRAME_LENGTH
+        assert frame_count(silence) == frames
+
+def test_audio_frames_drops_tags_and_xing_frame():
+    frames, header = mp3.audio_frames(stream(1, 2, 3))
+    assert frames == frame(1) + frame(2) + frame(3)
+    assert header == mp3.POLLY_HEADER
+
+def test_concat_frame_count():
+    segments = [("Narrador", stream(1, 2)), ("Narrador", stream(3)), ("Interlocutor1", stream(4, 5, 6))]
+    assert mp3.concat(segments) == b"".join(frame(fill) for fill in range(1, 7))
+
+    # A gap only where the speaker changes
+    gap = mp3.silence(0.5)
+    joined = mp3.concat(segments, gap_seconds=0.5)
+    assert joined == frame(1) + frame(2) + frame(3) + gap + frame(4) + frame(5) + frame(6)
+    assert frame_count(joined) == 6 + frame_count(gap)
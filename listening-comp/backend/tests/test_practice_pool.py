@@ -0,0 +1,105 @@
+import asyncio
+
+from practice_pool import PracticePool
+
+KEY = ("reading", "B2")
+
+class PooledStore:
+    """The vector store methods the pool uses, in memory"""
+
+    def __init__(self):
+        self.practices = {}  # id -> practice, with whether it is pooled
+
+    def store_practice(self, content, practice_type, level="B2", pooled=False, embedding=None):
+        practice_id = f"{practice_type}_{len(self.practices)}"
+        self.practices[practice_id] = dict(content, id=practice_id, type=practice_type, level=level, pooled=pooled)
+        return practice_id
+
+    def get_pooled_ids(self, practice_type, level):
+        return [
+            practice_id for practice_id, practice in self.practices.items()
+            if practice["pooled"] and (practice["type"], practice["level"]) == (practice_type, level)
+        ]
+
+    def claim_practice(self, practice_id):
+        practice = self.practices.get(practice_id)
+        if not practice or not practice["pooled"]:
+            return None
+        practice["pooled"] = False
+        return practice
+
+def reading(text):
+    return {"text": text, "questions": []}
+
+def pool_for(store, **options):
+    generated = []
+
+    async def generate(practice_type, level):
+        generated.append((practice_type, level))
+        return reading(f"Texto número {len(generated)}"), None
+
+    return PracticePool(store, generate, [KEY], min_interval=0, **options), generated
+
+async def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+def test_refills_to_size_and_hands_out_pooled_practices():
+    store = PooledStore()
+
+    async def scenario():
+        pool, generated = pool_for(store, size=3, low_watermark=2)
+        await pool.start()
+        await wait_for(lambda: len(pool.ready[KEY]) == 3)
+        pooled_ids = list(pool.ready[KEY])
+
+        content = await pool.take(*KEY)
+        assert content["id"] == pooled_ids[0]
+        # Still at the low watermark: no refill yet
+        await asyncio.sleep(0.05)
+        assert len(generated) == 3
+
+        await pool.take(*KEY)
+        await wait_for(lambda: len(pool.ready[KEY]) == 3)
+        await pool.stop()
+        assert len(generated) == 5
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert [practice["pooled"] for practice in store.practices.values()] == [False, False, True, True, True]
+    assert pool.stats()["hits"] == 2
+
+def test_picks_up_practices_pooled_by_an_earlier_run():
+    store = PooledStore()
+    pooled_id = store.store_practice(reading("Hola"), "reading", "B2", pooled=True)
+
+    async def scenario():
+        pool, generated = pool_for(store, size=1, low_watermark=1)
+        await pool.start()
+        content = await pool.take(*KEY)
+        await pool.stop()
+        return content
+
+    assert asyncio.run(scenario())["id"] == pooled_id
+
+def test_moves_on_when_a_practice_was_claimed_elsewhere():
+    store = PooledStore()
+    first = store.store_practice(reading("Uno"), "reading", "B2", pooled=True)
+    second = store.store_practice(reading("Dos"), "reading", "B2", pooled=True)
+
+    async def scenario():
+        pool, _ = pool_for(store, size=0, low_watermark=0)
+        await pool.start()
+        store.claim_practice(first)
+        content = await pool.take(*KEY)
+        empty = await pool.take(*KEY)
+        await pool.stop()
+        return pool, content, empty
+
+    pool, content, empty = asyncio.run(scenario())
+    assert content["id"] == second
+    assert empty is None
+    assert (pool.counters["hits"], pool.counters["misses"]) == (1, 1)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+pytest.importorskip("youtube_transcript_api")
+
+import transcript_utils
+
+URL = "https://youtu.be/abc123xyz"
+
+@pytest.fixture
+def fetches(tmp_path, monkeypatch):
+    # Transcript fetches, answered from a list that tests can change
+    monkeypatch.setattr(transcript_utils, "TRANSCRIPT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(transcript_utils, "_transcripts", {})
+    fetches = []
+    segments = ["hola", "qué tal"]
+
+    def get_transcript(video_id, languages):
+        fetches.append((video_id, languages))
+        if isinstance(segments[0], Exception):
+            raise segments[0]
+        return [{"text": text} for text in segments]
+
+    # Newer releases of the library dropped get_transcript; the fetch is faked either way
+    monkeypatch.setattr(transcript_utils.YouTubeTranscriptApi, "get_transcript", get_transcript, raising=False)
+    return fetches, segments
+
+def test_cached_in_memory_and_on_disk(fetches, monkeypatch):
+    calls, _ = fetches
+    assert transcript_utils.get_transcript_text(URL) == "hola qué tal"
+    assert transcript_utils.get_transcript_text(URL) == "hola qué tal"
+    assert calls == [("abc123xyz", ["es"])]
+
+    # A new process reads the file
+    monkeypatch.setattr(transcript_utils, "_transcripts", {})
+    assert transcript_utils.get_transcript_text(URL) == "hola qué tal"
+    assert len(calls) == 1
+    # Languages are cached apart
+    transcript_utils.get_transcript_text(URL, language="en")
+    assert len(calls) == 2
+
+def test_refetched_once_expired(fetches, monkeypatch):
+    calls, segments = fetches
+    transcript_utils.get_transcript_text(URL)
+    segments[:] = ["adiós"]
+    monkeypatch.setattr(transcript_utils, "TRANSCRIPT_CACHE_TTL_SECONDS", 0)
+    assert transcript_utils.get_transcript_text(URL) == "adiós"
+    assert len(calls) == 2
+
+    cache_path = transcript_utils._cache_path("abc123xyz", "es")
+    with open(cache_path, encoding="utf-8") as file:
+        assert json.load(file)["segments"] == ["adiós"]
+
+def test_expired_transcript_used_when_the_fetch_fails(fetches, monkeypatch):
+    _, segments = fetches
+    transcript_utils.get_transcript_text(URL)
+    segments[:] = [Exception("Too many requests")]
+    monkeypatch.setattr(transcript_utils, "TRANSCRIPT_CACHE_TTL_SECONDS", 0)
+    assert transcript_utils.get_transcript_text(URL) == "hola qué tal"
+    # Without a cached copy there is nothing to return
+    assert transcript_utils.get_transcript_text("https://youtu.be/other") is None
+
+def test_excerpt_stays_within_the_budget():
+    chunks = [f"trozo{i} " + "palabra " * 30 for i in range(20)]
+    for _ in range(20):
+        excerpt = transcript_utils.select_excerpt(chunks, 200)
+        assert transcript_utils.estimate_tokens(excerpt) <= 200 + len(chunks)
+        # A contiguous run of whole chunks
+        assert excerpt in " ".join(chunks)
+        assert sum(chunk in excerpt for chunk in chunks) == 3
+
+def test_excerpt_is_centred_on_the_query():
+    chunks = [f"trozo{i} " + "palabra " * 30 for i in range(20)]
+    chunks[12] = "el mercado de pescado " + "palabra " * 27
+    excerpt = transcript_utils.select_excerpt(chunks, 200, query="¿Qué compran en el mercado?")
+    assert excerpt.startswith(chunks[11]) and excerpt.endswith(chunks[13])
+
+def test_excerpt_of_no_chunks_is_empty():
+    assert transcript_utils.select_excerpt([], 100) == ""
+
+def test_excerpt_cuts_an_oversize_chunk_at_a_word():
+    excerpt = transcript_utils.select_excerpt(["uno dos tres cuatro cinco seis"], 4)
+    assert excerpt == "uno dos"
+
+def test_chunks_segments_by_tokens():
+    chunks = transcript_utils.chunk_segments(["a" * 40] * 5, chunk_tokens=20)
+    assert chunks == [" ".join(["a" * 40] * 2)] * 2 + ["a" * 40]
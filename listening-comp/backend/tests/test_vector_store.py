@@ -0,0 +1,90 @@
+import threading
+
+def reading(text):
+    return {"text": text, "questions": [{"question": "¿Qué?", "options": ["a", "b", "c"], "correctAnswer": 0}]}
+
+def listed_ids(store, limit):
+    # Every page of the listing, following the cursors
+    pages, cursor = [], None
+    while True:
+        practices, cursor = store.list_practices(limit, cursor)
+        pages.append([practice["id"] for practice in practices])
+        if cursor is None:
+            return pages
+
+def test_listing_pages_newest_first(store):
+    ids = [store.store_practice(reading(f"Texto número {i}"), "reading") for i in range(7)]
+    store.store_practice(reading("Texto reservado"), "reading", pooled=True)
+
+    pages = listed_ids(store, 3)
+    assert pages == [ids[6:3:-1], ids[3:0:-1], ids[:1]]
+    assert store.list_practices(10)[0][0]["title"] == f"Practice {ids[-1]}"
+
+def test_listing_sees_practices_stored_after_the_index_is_built(store):
+    first = store.store_practice(reading("Primero"), "reading")
+    assert listed_ids(store, 10) == [[first]]
+    second = store.store_practice(reading("Segundo"), "reading")
+    pooled = store.store_practice(reading("Tercero"), "reading", pooled=True)
+    assert listed_ids(store, 10) == [[second, first]]
+
+    store.claim_practice(pooled)
+    assert listed_ids(store, 10) == [[pooled, second, first]]
+
+def test_listing_sees_practices_stored_by_another_process(store):
+    from vector_store import VectorStore
+
+    # Another worker's store, on the same persist directory
+    other = VectorStore()
+    other.embedding_function.model = store.embedding_function.model
+    first = store.store_practice(reading("Primero"), "reading")
+    assert listed_ids(store, 10) == [[first]]
+
+    second = other.store_practice(reading("Segundo"), "reading")
+    pooled = other.store_practice(reading("Tercero"), "reading", pooled=True)
+    other.claim_practice(pooled)
+    assert listed_ids(store, 10) == [[pooled, second, first]]
+
+def test_claiming_takes_a_practice_out_of_the_pool_once(store):
+    practice_id = store.store_practice(reading("En reserva"), "reading", pooled=True)
+    assert store.get_pooled_ids("reading", "B2") == [practice_id]
+
+    claimed = []
+    threads = [threading.Thread(target=lambda: claimed.append(store.claim_practice(practice_id))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(content is not None for content in claimed) == 1
+    assert store.get_pooled_ids("reading", "B2") == []
+
+def test_claiming_keeps_the_stored_embedding(store):
+    practice_id = store.store_practice(reading("En reserva"), "reading", pooled=True, embedding=[1.0] + [0.0] * 63)
+    calls = []
+    model = store.embedding_function.model
+    store.embedding_function.model = lambda texts: calls.append(texts) or model(texts)
+
+    assert store.claim_practice(practice_id)["text"] == "En reserva"
+    assert calls == []
+    stored = store.practice_collection.get(ids=[practice_id], include=["embeddings"])["embeddings"][0]
+    assert list(stored) == [1.0] + [0.0] * 63
+
+def test_nearest_practice_of_the_same_type_and_level(store):
+    store.store_practice(reading("El tren sale de la estación a las ocho"), "reading", level="B2")
+    store.store_practice(reading("El tren sale de la estación a las nueve"), "reading", level="C1")
+    near_id, similarity, _ = store.nearest_practice(reading("El tren sale de la estación a las ocho"), "reading", "B2")
+    assert near_id.startswith("reading_")
+    assert similarity > 0.999
+
+    _, similarity, _ = store.nearest_practice(reading("Mi perro come pescado"), "reading", "B2")
+    assert similarity < 0.9
+    assert store.nearest_practice(reading("Nada"), "listening", "B2")[0] is None
+
+def test_similar_practices_skip_pooled_ones(store):
+    base = store.store_practice(reading("El tren sale de la estación"), "reading")
+    near = store.store_practice(reading("El tren sale de la estación pronto"), "reading")
+    store.store_practice(reading("El tren sale de la estación tarde"), "reading", pooled=True)
+    far = store.store_practice(reading("Mi perro come pescado"), "reading")
+
+    similar = store.get_similar_practices(base, k=2)
+    assert [practice["id"] for practice in similar] == [near, far]
+    assert store.get_similar_practices("missing") is None
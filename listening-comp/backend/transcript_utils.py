@@ -1,3 +1,11 @@
+import os
+import re
+import json
+import time
+import uuid
+import random
+import threading
+from typing import List, Optional
 from youtube_transcript_api import YouTubeTranscriptApi
 from urllib.parse import urlparse, parse_qs
 
@@ -10,14 +18,161 @@ def extract_video_id(url: str) -> str:
         return query_v[0]
     return ""
 
-def get_transcript_text(youtube_url: str, language="es") -> str:
+# Fetched transcripts are cached on disk by (video_id, language) for
+# TRANSCRIPT_CACHE_TTL_SECONDS, and kept in memory split into chunks of about
+# TRANSCRIPT_CHUNK_TOKENS, so prompts can carry a budgeted excerpt instead of
+# the whole transcript
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", "transcript_cache")
+TRANSCRIPT_CACHE_TTL_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TRANSCRIPT_CHUNK_TOKENS = 200
+# Rough token count of Spanish text for budgeting: about 4 characters a token
+CHARS_PER_TOKEN = 4
+
+_transcripts = {}  # (video_id, language) -> (fetched_at, chunks)
+# Held only to read or update the dicts; a fetch holds its key's lock
+# instead, so one slow fetch doesn't hold up other videos' cache hits
+_transcripts_lock = threading.Lock()
+_fetch_locks = {}  # (video_id, language) -> lock held while fetching it
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chunk_segments(segments: List[str], chunk_tokens: int = TRANSCRIPT_CHUNK_TOKENS) -> List[str]:
+    """Join transcript segments into chunks of about chunk_tokens tokens"""
+    chunks, current, tokens = [], [], 0
+    for segment in segments:
+        current.append(segment)
+        tokens += estimate_tokens(segment)
+        if tokens >= chunk_tokens:
+            chunks.append(" ".join(current))
+            current, tokens = [], 0
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _cache_path(video_id: str, language: str) -> str:
+    # Video ids are [A-Za-z0-9_-], safe as file names
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{video_id}.{language}.json")
+
+def _read_cached(video_id: str, language: str) -> Optional[tuple]:
     try:
-        video_id = extract_video_id(youtube_url)
-        transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
-        return " ".join([t["text"] for t in transcript])
-    except Exception as e:
-        print(f"Error fetching transcript: {e}")
+        with open(_cache_path(video_id, language), encoding="utf-8") as file:
+            cached = json.load(file)
+        return cached["fetched_at"], cached["segments"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_cached(video_id: str, language: str, fetched_at: float, segments: List[str]):
+    os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+    path = _cache_path(video_id, language)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({"fetched_at": fetched_at, "segments": segments}, file, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+def _fresh_chunks(key: tuple) -> Optional[List[str]]:
+    with _transcripts_lock:
+        entry = _transcripts.get(key)
+    if entry and time.time() - entry[0] < TRANSCRIPT_CACHE_TTL_SECONDS:
+        return entry[1]
+    return None
+
+def get_transcript_chunks(youtube_url: str, language="es") -> Optional[List[str]]:
+    """The video's transcript in chunks, from the cache while it is fresh"""
+    video_id = extract_video_id(youtube_url)
+    if not video_id:
+        print(f"Error fetching transcript: no video ID in {youtube_url}")
+        return None
+    key = (video_id, language)
+    chunks = _fresh_chunks(key)
+    if chunks is not None:
+        return chunks
+
+    with _transcripts_lock:
+        fetch_lock = _fetch_locks.setdefault(key, threading.Lock())
+    with fetch_lock:
+        # Fetched meanwhile by the thread that held the lock
+        chunks = _fresh_chunks(key)
+        if chunks is not None:
+            return chunks
+
+        cached = _read_cached(video_id, language)
+        if cached and time.time() - cached[0] < TRANSCRIPT_CACHE_TTL_SECONDS:
+            fetched_at, segments = cached
+        else:
+            try:
+                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
+            except Exception as e:
+                print(f"Error fetching transcript: {e}")
+                if not cached:
+                    return None
+                # Better a stale transcript than none
+                print("Using the expired cached transcript")
+                fetched_at, segments = cached
+            else:
+                fetched_at, segments = time.time(), [t["text"] for t in transcript]
+                try:
+                    _write_cached(video_id, language, fetched_at, segments)
+                except OSError as e:
+                    print(f"Warning: Could not cache transcript: {e}")
+
+        chunks = chunk_segments(segments)
+        with _transcripts_lock:
+            _transcripts[key] = (fetched_at, chunks)
+        return chunks
+
+def get_transcript_text(youtube_url: str, language="es") -> str:
+    chunks = get_transcript_chunks(youtube_url, language)
+    if chunks is None:
+        return None
+    return " ".join(chunks)
+
+def _words(text: str) -> set:
+    return set(re.findall(r"\w{4,}", text.lower()))
+
+def select_excerpt(chunks: List[str], token_budget: int, query: Optional[str] = None) -> str:
+    """A contiguous run of chunks within token_budget
+
+    Centred on the chunk sharing the most words with query, or on a random
+    chunk without one, so successive prompts draw on different parts of the
+    transcript. An anchor chunk over the budget on its own is cut short.
+    """
+    if not chunks:
+        return ""
+    if query:
+        query_words = _words(query)
+        anchor = max(range(len(chunks)), key=lambda i: len(query_words & _words(chunks[i])))
+    else:
+        anchor = random.randrange(len(chunks))
+
+    if estimate_tokens(chunks[anchor]) > token_budget:
+        # Cut at the last word boundary that fits
+        text = chunks[anchor][:max(0, token_budget - 1) * CHARS_PER_TOKEN]
+        return text.rsplit(" ", 1)[0] if " " in text else text
+
+    start, end = anchor, anchor + 1
+    tokens = estimate_tokens(chunks[anchor])
+    # Grow alternately after and before the anchor while the budget allows
+    while True:
+        grown = False
+        for index in (end, start - 1):
+            if 0 <= index < len(chunks) and tokens + estimate_tokens(chunks[index]) <= token_budget:
+                tokens += estimate_tokens(chunks[index])
+                if index == end:
+                    end += 1
+                else:
+                    start -= 1
+                grown = True
+        if not grown:
+            break
+    return " ".join(chunks[start:end])
+
+def get_transcript_excerpt(youtube_url: str, language="es", token_budget: int = 1500, query: Optional[str] = None) -> str:
+    """A slice of the video's transcript of at most about token_budget tokens"""
+    chunks = get_transcript_chunks(youtube_url, language)
+    if chunks is None:
         return None
+    return select_excerpt(chunks, token_budget, query)
 
 # Create test_transcript.py
 from transcript_utils import extract_video_id, get_transcript_text
@@ -1,8 +1,25 @@
 from chromadb import Client, Settings
 import chromadb
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import json
+import uuid
+import bisect
+import threading
 from datetime import datetime
+from embeddings import PracticeEmbeddingFunction
+
+def new_practice_id(practice_type: str) -> str:
+    # Timestamped for readability, with a random suffix so practices
+    # generated in the same second never collide
+    return f"{practice_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+# Practices fetched beyond k by get_similar_practices, to allow for pooled
+# ones being filtered out
+SIMILAR_EXTRA_RESULTS = 10
+# How far back each listing re-reads practices written since the index's
+# high-water mark, for writes by other processes that only became visible
+# after a later one was read
+INDEX_REFRESH_SLACK_SECONDS = 60
 
 class VectorStore:
     def __init__(self):
@@ -10,63 +27,116 @@ class VectorStore:
             persist_directory="db",
             is_persistent=True
         ))
-        # Create collection for practice exercises
+        # Create collection for practice exercises, embedded by their
+        # exercise text with a local model
+        self.embedding_function = PracticeEmbeddingFunction()
         self.practice_collection = self.client.get_or_create_collection(
             name="practice_exercises",
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embedding_function
         )
         # Create collection for YouTube transcripts (legacy support)
         self.transcript_collection = self.client.get_or_create_collection(
             name="spanish_content"
         )
+        # Listed (not pooled) practices by timestamp, as sorted (timestamp, id)
+        # pairs with their metadata, so a page of the listing costs a binary
+        # search instead of a scan of the collection. Built on first use, then
+        # brought up to date on every listing from the practices' updated_at,
+        # so practices stored or claimed by other processes show up too.
+        self.timestamp_index = None
+        self.index_metadata = {}
+        self.index_high_water = 0.0
+        self.index_lock = threading.Lock()
+        self.claim_lock = threading.Lock()
+
+    def store_practice(self, content: Dict, practice_type: str, level: str = "B2", pooled: bool = False, embedding: Optional[List[float]] = None) -> str:
+        """Store a practice exercise (reading or listening)
 
-    def store_practice(self, content: Dict, practice_type: str) -> str:
-        """Store a practice exercise (reading or listening)"""
+        Pooled practices are pre-generated and wait, unlisted, until
+        claim_practice hands them out. Keeps the content's id if it has one.
+        """
         try:
             # Add metadata
             content["type"] = practice_type
-            content["timestamp"] = datetime.now().isoformat()
-            content["id"] = f"{practice_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            content["level"] = level
+            now = datetime.now()
+            content["timestamp"] = now.isoformat()
+            content["id"] = content.get("id") or new_practice_id(practice_type)
+            if embedding is None:
+                embedding = self.embedding_function.embed_practice(content)
+            metadata = {
+                "type": practice_type,
+                "level": level,
+                "pooled": pooled,
+                "timestamp": content["timestamp"],
+                "updated_at": now.timestamp(),
+                "title": f"Practice {content['id']}"
+            }
 
             # Store in vector database
             self.practice_collection.add(
                 documents=[json.dumps(content)],
+                embeddings=[embedding],
                 ids=[content["id"]],
-                metadatas=[{
-                    "type": practice_type,
-                    "timestamp": content["timestamp"],
-                    "title": f"Practice {content['id']}"
-                }]
+                metadatas=[metadata]
             )
             return content["id"]
         except Exception as e:
             print(f"Error storing practice: {e}")
             return None
 
-    def get_all_practices(self) -> List[Dict]:
-        """Retrieve all practice exercises"""
-        try:
-            results = self.practice_collection.get()
+    def _index_practices(self, ids: List[str], metadatas: List[Dict]):
+        for practice_id, metadata in zip(ids, metadatas):
+            self.index_high_water = max(self.index_high_water, metadata.get("updated_at", 0.0))
+            if metadata.get("pooled"):
+                continue
+            indexed = self.index_metadata.get(practice_id)
+            if indexed is not None:
+                if indexed["timestamp"] == metadata["timestamp"]:
+                    continue
+                self.timestamp_index.remove((indexed["timestamp"], practice_id))
+            bisect.insort(self.timestamp_index, (metadata["timestamp"], practice_id))
+            self.index_metadata[practice_id] = metadata
+
+    def _refresh_timestamp_index(self):
+        # Metadata only: the documents are never read for the listing
+        if self.timestamp_index is None:
+            self.timestamp_index, self.index_metadata = [], {}
+            results = self.practice_collection.get(include=["metadatas"])
+        else:
+            results = self.practice_collection.get(
+                where={"updated_at": {"$gte": self.index_high_water - INDEX_REFRESH_SLACK_SECONDS}},
+                include=["metadatas"]
+            )
+        self._index_practices(results["ids"], results["metadatas"])
+
+    def list_practices(self, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """A page of practice summaries, newest first, and the cursor of the next page
+
+        The cursor is the opaque "timestamp|id" of the last practice returned.
+        """
+        with self.index_lock:
+            self._refresh_timestamp_index()
+            if cursor:
+                timestamp, _, practice_id = cursor.partition("|")
+                end = bisect.bisect_left(self.timestamp_index, (timestamp, practice_id))
+            else:
+                end = len(self.timestamp_index)
+            start = max(0, end - limit)
+            page = self.timestamp_index[start:end][::-1]
             practices = []
-            
-            for i, doc in enumerate(results["documents"]):
-                content = json.loads(doc)
-                metadata = results["metadatas"][i]
-                
+            for timestamp, practice_id in page:
+                metadata = self.index_metadata[practice_id]
                 practices.append({
-                    "id": results["ids"][i],
+                    "id": practice_id,
                     "type": metadata["type"],
+                    "level": metadata.get("level", "B2"),
                     "title": metadata["title"],
-                    "timestamp": metadata["timestamp"],
-                    "content": content
+                    "timestamp": timestamp
                 })
-            
-            # Sort by timestamp, newest first
-            practices.sort(key=lambda x: x["timestamp"], reverse=True)
-            return practices
-        except Exception as e:
-            print(f"Error retrieving practices: {e}")
-            return []
+        next_cursor = f"{page[-1][0]}|{page[-1][1]}" if page and start > 0 else None
+        return practices, next_cursor
 
     def get_practice_by_id(self, practice_id: str) -> Optional[Dict]:
         """Retrieve a specific practice by ID"""
@@ -81,6 +151,113 @@ class VectorStore:
             print(f"Error retrieving practice: {e}")
             return None
 
+    def get_pooled_ids(self, practice_type: str, level: str) -> List[str]:
+        """IDs of the pooled practices of a type and level, oldest first"""
+        try:
+            results = self.practice_collection.get(
+                where={"$and": [{"pooled": True}, {"type": practice_type}, {"level": level}]},
+                include=["metadatas"]
+            )
+            pooled = sorted(zip(results["ids"], results["metadatas"]), key=lambda x: x[1]["timestamp"])
+            return [practice_id for practice_id, _ in pooled]
+        except Exception as e:
+            print(f"Error retrieving pooled practices: {e}")
+            return []
+
+    def claim_practice(self, practice_id: str) -> Optional[Dict]:
+        """Take a practice out of the pool, dated now, and return it
+
+        Returns None if it is gone or no longer pooled, so of two callers
+        claiming the same practice only one gets it.
+        """
+        try:
+            # Held from the pooled check to the update, so a practice can't be
+            # claimed twice
+            with self.claim_lock:
+                # The stored embedding goes back with the updated document, which
+                # would otherwise be embedded again
+                result = self.practice_collection.get(
+                    ids=[practice_id],
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                if not result["documents"] or not result["metadatas"][0].get("pooled"):
+                    return None
+
+                content = json.loads(result["documents"][0])
+                now = datetime.now()
+                content["timestamp"] = now.isoformat()
+                metadata = dict(
+                    result["metadatas"][0], pooled=False, timestamp=content["timestamp"], updated_at=now.timestamp()
+                )
+                self.practice_collection.update(
+                    ids=[practice_id],
+                    documents=[json.dumps(content)],
+                    embeddings=[result["embeddings"][0]],
+                    metadatas=[metadata]
+                )
+            return content
+        except Exception as e:
+            print(f"Error claiming practice: {e}")
+            return None
+
+    def nearest_practice(self, content: Dict, practice_type: str, level: str) -> Tuple[Optional[str], float, List[float]]:
+        """The stored practice of the type and level most similar to content, as (id,
+        cosine similarity, content's embedding), or (None, 0.0, embedding) if
+        there is none. The embedding can be passed on to store_practice."""
+        embedding = self.embedding_function.embed_practice(content)
+        results = self.practice_collection.query(
+            query_embeddings=[embedding],
+            n_results=1,
+            where={"$and": [{"type": practice_type}, {"level": level}]},
+            include=["distances"]
+        )
+        if not results["ids"][0]:
+            return None, 0.0, embedding
+        # The collection uses cosine distance, 1 - cosine similarity
+        return results["ids"][0][0], 1 - results["distances"][0][0], embedding
+
+    def get_similar_practices(self, practice_id: str, k: int = 5) -> Optional[List[Dict]]:
+        """Summaries of the k listed practices most similar to the given one,
+        most similar first, or None if it doesn't exist"""
+        result = self.practice_collection.get(ids=[practice_id], include=["embeddings"])
+        if not result["ids"]:
+            return None
+        # Extra results make up for the practice itself and pooled ones
+        results = self.practice_collection.query(
+            query_embeddings=[result["embeddings"][0]],
+            n_results=k + 1 + SIMILAR_EXTRA_RESULTS,
+            include=["metadatas", "distances"]
+        )
+        similar = []
+        for similar_id, metadata, distance in zip(results["ids"][0], results["metadatas"][0], results["distances"][0]):
+            if similar_id == practice_id or metadata.get("pooled"):
+                continue
+            similar.append({
+                "id": similar_id,
+                "type": metadata["type"],
+                "level": metadata.get("level", "B2"),
+                "title": metadata["title"],
+                "timestamp": metadata["timestamp"],
+                "similarity": 1 - distance
+            })
+        return similar[:k]
+
+    def reembed_practices(self, batch_size: int = 64) -> int:
+        """Recompute the embedding of every stored practice, in batches.
+        Returns the number of practices re-embedded."""
+        count = 0
+        offset = 0
+        while True:
+            batch = self.practice_collection.get(limit=batch_size, offset=offset, include=["documents"])
+            if not batch["ids"]:
+                return count
+            self.practice_collection.update(
+                ids=batch["ids"],
+                embeddings=self.embedding_function(batch["documents"])
+            )
+            count += len(batch["ids"])
+            offset += batch_size
+
     def store_transcript(self, url: str, transcript: str, questions: str, audio_path: str) -> str:
         """Store YouTube transcript content (legacy support)"""
         try:
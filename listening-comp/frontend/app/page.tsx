@@ -7,16 +7,26 @@ import { Card } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { RadioGroup, RadioGroupItem } from "@/components/ui/radio-group";
 import ReactMarkdown from 'react-markdown';
-import { generatePractice, getSavedPractices, getPracticeById, Practice } from '@/lib/api';
+import { generatePractice, getSavedPractices, getPracticeById, Practice, GenerationJob } from '@/lib/api';
 import { format } from 'date-fns';
 
+const GENERATION_STAGES: { [stage: string]: string } = {
+  queued: 'Waiting...',
+  transcript: 'Fetching transcript...',
+  text: 'Writing questions...',
+  audio: 'Recording audio...',
+  stored: 'Saving...',
+};
+
 export default function Home() {
   const [practiceType, setPracticeType] = useState<string>('');
   const [practiceContent, setPracticeContent] = useState<any>(null);
   const [selectedAnswers, setSelectedAnswers] = useState<{ [key: number]: number }>({});
   const [showResults, setShowResults] = useState<{ [key: number]: boolean }>({});
   const [savedPractices, setSavedPractices] = useState<Practice[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [generationStage, setGenerationStage] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [isCreatingNew, setIsCreatingNew] = useState(true);
 
@@ -27,8 +37,20 @@ export default function Home() {
 
   const fetchSavedPractices = async () => {
     try {
-      const practices = await getSavedPractices();
-      setSavedPractices(practices);
+      const page = await getSavedPractices();
+      setSavedPractices(page.practices);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Failed to fetch saved practices:', error);
+      setError('Failed to load saved practices');
+    }
+  };
+
+  const fetchMoreSavedPractices = async () => {
+    try {
+      const page = await getSavedPractices(nextCursor);
+      setSavedPractices(prev => [...prev, ...page.practices]);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       console.error('Failed to fetch saved practices:', error);
       setError('Failed to load saved practices');
@@ -39,7 +61,10 @@ export default function Home() {
     setLoading(true);
     setError(null);
     try {
-      const content = await generatePractice(practiceType as 'listening' | 'reading');
+      const content = await generatePractice(
+        practiceType as 'listening' | 'reading',
+        (job: GenerationJob) => setGenerationStage(job.stage)
+      );
       setPracticeContent(content);
       setSelectedAnswers({});
       setShowResults({});
@@ -51,6 +76,7 @@ export default function Home() {
       setError('Failed to generate practice');
     } finally {
       setLoading(false);
+      setGenerationStage(null);
     }
   };
 
@@ -127,6 +153,11 @@ export default function Home() {
                   </p>
                 </Card>
               ))}
+              {nextCursor && (
+                <Button variant="ghost" className="w-full" onClick={fetchMoreSavedPractices}>
+                  Load more
+                </Button>
+              )}
             </div>
           </div>
         </div>
@@ -165,7 +196,7 @@ export default function Home() {
                       className="bg-blue-600 hover:bg-blue-700"
                       disabled={loading}
                     >
-                      {loading ? 'Generating...' : 'Generate Question'}
+                      {loading ? GENERATION_STAGES[generationStage ?? ''] ?? 'Generating...' : 'Generate Question'}
                     </Button>
                   )}
                 </div>
@@ -3,16 +3,74 @@ const API_BASE_URL = 'http://localhost:8000';
 export interface Practice {
   id: string;
   type: string;
+  level: string;
   title: string;
   timestamp: string;
-  content: any;
+}
+
+export interface PracticePage {
+  practices: Practice[];
+  next_cursor: string | null;
 }
 
 export function getFullAudioUrl(audioPath: string): string {
   return `${API_BASE_URL}${audioPath}`;
 }
 
-export async function generatePractice(type: 'listening' | 'reading'): Promise<any> {
+export interface GenerationJob {
+  job_id: string;
+  status: 'queued' | 'running' | 'done' | 'failed';
+  stage: string;
+  result?: any;
+  error?: string;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+async function getJob(jobId: string): Promise<GenerationJob> {
+  const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch generation status');
+  }
+
+  return response.json();
+}
+
+async function pollJob(jobId: string, onProgress?: (job: GenerationJob) => void): Promise<GenerationJob> {
+  while (true) {
+    const job = await getJob(jobId);
+    onProgress?.(job);
+    if (job.status === 'done' || job.status === 'failed') {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+}
+
+// Follows a generation job over server-sent events until it finishes,
+// falling back to polling if the event stream fails
+function waitForJob(jobId: string, onProgress?: (job: GenerationJob) => void): Promise<GenerationJob> {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+    source.onmessage = (event) => {
+      onProgress?.(JSON.parse(event.data));
+    };
+    source.addEventListener('end', (event) => {
+      source.close();
+      resolve(JSON.parse((event as MessageEvent).data));
+    });
+    source.onerror = () => {
+      source.close();
+      pollJob(jobId, onProgress).then(resolve, reject);
+    };
+  });
+}
+
+export async function generatePractice(
+  type: 'listening' | 'reading',
+  onProgress?: (job: GenerationJob) => void
+): Promise<any> {
   const response = await fetch(`${API_BASE_URL}/generate`, {
     method: 'POST',
     headers: {
@@ -25,15 +83,30 @@ export async function generatePractice(type: 'listening' | 'reading'): Promise<a
     throw new Error('Failed to generate practice');
   }
 
-  const data = await response.json();
+  // A practice ready in the pool comes back as an already finished job
+  let job: GenerationJob = await response.json();
+  onProgress?.(job);
+  if (job.status !== 'done' && job.status !== 'failed') {
+    job = await waitForJob(job.job_id, onProgress);
+  }
+  if (job.status !== 'done') {
+    throw new Error(job.error || 'Failed to generate practice');
+  }
+
+  const data = job.result;
   if (data.audioPath) {
     data.audioPath = getFullAudioUrl(data.audioPath);
   }
   return data;
 }
 
-export async function getSavedPractices(): Promise<Practice[]> {
-  const response = await fetch(`${API_BASE_URL}/saved_practices`);
+// One page of saved practices, newest first, without their content
+export async function getSavedPractices(cursor?: string | null, limit = 20): Promise<PracticePage> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  const response = await fetch(`${API_BASE_URL}/saved_practices?${params}`);
 
   if (!response.ok) {
     throw new Error('Failed to fetch saved practices');